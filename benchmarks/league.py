@@ -0,0 +1,65 @@
+"""
+Load time of a classic league from a local stand-in for the FPL API with a
+fixed latency per request, one manager at a time against the concurrent pool,
+then the league's effective ownership in bulk and after one manager changes
+
+    python -m benchmarks.league --managers 1000 --latency 0.05
+"""
+
+import argparse, tempfile, time
+from benchmarks.standin import StandIn, SyntheticAPI
+from src.cache import FPLCache
+from src.fetcher import FPLFetcher
+from src.ownership import EffectiveOwnership
+from src.querier import FPLQuerier
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--managers", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--rate", type=float, default=100)
+    args = parser.parse_args()
+    standin = StandIn(SyntheticAPI(700, args.managers), latency=args.latency)
+    FPLQuerier.configure(standin.start())
+    with tempfile.TemporaryDirectory() as directory:
+        cache = FPLCache(directory + "/responses.sqlite")
+        FPLQuerier.use(
+            league_fetcher=FPLFetcher(
+                workers=32, pool_size=32, per_host=32, cache=cache, rate=args.rate
+            )
+        )
+        sample = min(args.managers, 50)
+        t = time.perf_counter()
+        for entry in range(1, sample + 1):
+            FPLQuerier.league_fetcher().get(
+                FPLQuerier.FPL_MANAGER_TEAM_URL.format(entry, 1)
+            )
+        sequential = (time.perf_counter() - t) * args.managers / sample
+        cache.clear()
+        print(f"sequential: {sequential:8.2f} s (extrapolated from {sample})")
+        for name in ("pool", "cached"):
+            t = time.perf_counter()
+            table = FPLQuerier.get_league(1, 1, final=True)
+            elapsed = time.perf_counter() - t
+            print(
+                f"{name:>10}: {elapsed:8.2f} s, {int(table.loaded.sum())}/{len(table)}"
+                f" managers, picks table {table.picks.nbytes // 1024} KiB"
+            )
+    t = time.perf_counter()
+    ownership = EffectiveOwnership(table, range(1, 701))
+    print(f"{'ownership':>10}: {(time.perf_counter() - t) * 1000:8.2f} ms")
+    picks = [
+        {"element": int(e), "position": slot, "multiplier": int(m)}
+        for slot, (e, m) in enumerate(
+            zip(table.picks[0][::-1], table.multipliers[0]), 1
+        )
+    ]
+    t = time.perf_counter()
+    ownership.update(table.entries[0], {"picks": picks})
+    print(f"{'update':>10}: {(time.perf_counter() - t) * 1000:8.2f} ms")
+    standin.stop()
+
+
+if __name__ == "__main__":
+    main()
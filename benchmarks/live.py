@@ -0,0 +1,118 @@
+"""
+Cost of a live GW poll from a local stand-in for the FPL API, with a few
+players changing between polls, and of bringing a league's live totals up to
+date after it, for leagues of growing size
+
+    python -m benchmarks.live --managers 1000 10000 100000 --changing 5
+"""
+
+import argparse, random, tempfile, time
+import numpy as np
+from benchmarks.standin import StandIn, SyntheticAPI
+from src.cache import FPLCache
+from src.data import FPLData, FPLSnapshot
+from src.fetcher import FPLFetcher
+from src.league import LeagueTable
+from src.live import LiveGameweek, LiveLeague
+from src.ownership import EffectiveOwnership
+from src.querier import FPLQuerier
+from src.views import FPLViews
+
+
+def league(managers: int, ids: np.ndarray, seed=0):
+    """
+    A league of random 15-player squads, captain on the first pick
+    """
+    rng = np.random.default_rng(seed)
+    table = LeagueTable(
+        {"id": 1, "name": "Benchmark"},
+        [{"entry": entry, "total": 500} for entry in range(1, managers + 1)],
+    )
+    table.picks[:] = ids[rng.random((managers, len(ids))).argsort(axis=1)[:, :15]]
+    table.multipliers[:, :11] = 1
+    table.multipliers[:, 0] = 2
+    table.loaded[:] = True
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--players", type=int, default=700)
+    parser.add_argument(
+        "--managers", type=int, nargs="+", default=[1000, 10000, 100000]
+    )
+    parser.add_argument("--changing", type=int, default=5, help="players per poll")
+    parser.add_argument("--polls", type=int, default=50)
+    args = parser.parse_args()
+    rnd = random.Random(0)
+    source = SyntheticAPI(args.players, 0, 10)
+    standin = StandIn(source)
+    FPLQuerier.configure(standin.start())
+    with tempfile.TemporaryDirectory() as directory:
+        FPLCache.DEFAULT_DIR = directory
+        FPLQuerier.use(
+            fetcher=FPLFetcher(cache=FPLCache(directory + "/responses.sqlite"))
+        )
+        # The GW shown is the one the dashboard picks from a full snapshot
+        fpl = FPLData()
+        fpl.pin(FPLSnapshot(*FPLQuerier.build()))
+        gw, table = FPLViews.current_gw(fpl), fpl.table
+        teams = {e["id"]: e["team"] for e in fpl.data["elements"]}
+        # A GW in progress: one fixture per pair of teams, no bonus confirmed yet
+        payload = source.payloads[f"event/{gw}/live/"]
+        for element in payload["elements"]:
+            stats = element["stats"]
+            stats["total_points"] -= stats["bonus"]
+            stats["bonus"] = 0
+            element["explain"][0]["fixture"] = (teams[element["id"]] + 1) // 2
+        gameweek = LiveGameweek(gw, table)
+        gameweek.poll(max_age=0)
+        print(f"GW{gw}: {int((gameweek.points != 0).sum())} players with points")
+        leagues = []
+        for managers in args.managers:
+            ids = table.players.index
+            ownership = EffectiveOwnership(league(managers, ids.to_numpy()), ids)
+            t = time.perf_counter()
+            session = LiveLeague(gameweek, ownership)
+            session.update()
+            print(
+                f"{managers:>7} managers: first update"
+                f" {(time.perf_counter() - t) * 1000:8.2f} ms"
+            )
+            leagues.append(session)
+        t = time.perf_counter()
+        gameweek.poll(max_age=0)
+        print(f"unchanged poll: {(time.perf_counter() - t) * 1000:8.2f} ms")
+        polls, updates = [], np.zeros(len(leagues))
+        touched = np.zeros(len(leagues))
+        for _ in range(args.polls):
+            for element in rnd.sample(payload["elements"], args.changing):
+                stats = element["stats"]
+                stats["minutes"] += 1
+                stats["bps"] += rnd.randint(1, 6)
+                if rnd.random() < 0.2:
+                    stats["goals_scored"] += 1
+                    stats["total_points"] += 5
+            t = time.perf_counter()
+            gameweek.poll(max_age=0)
+            polls.append(time.perf_counter() - t)
+            for i, session in enumerate(leagues):
+                t = time.perf_counter()
+                _, _, managers = session.update()
+                updates[i] += time.perf_counter() - t
+                touched[i] += len(managers)
+        print(
+            f"changed poll: {np.mean(polls) * 1000:8.2f} ms"
+            f" ({args.changing} players changing, {len(payload['elements'])} sent)"
+        )
+        for managers, elapsed, count in zip(args.managers, updates, touched):
+            print(
+                f"{managers:>7} managers: update {elapsed / args.polls * 1000:8.2f} ms,"
+                f" {count / args.polls:9.0f} managers touched per poll"
+            )
+    print(standin.stats)
+    standin.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""
+Solve time of the squad optimiser on a synthetic player pool
+
+    python -m benchmarks.optimiser --players 700 --k 5
+"""
+
+import argparse, time
+from benchmarks.synthetic import build
+from src.optimiser import SquadOptimiser
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--players", type=int, default=700)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    _, _, table, _ = build(args.players)
+    scores = table.metrics["xPoints"]
+    for k in sorted({1, args.k}):
+        best = None
+        for _ in range(args.repeat):
+            t = time.perf_counter()
+            squads = SquadOptimiser.solve(table, scores, k=k)
+            elapsed = time.perf_counter() - t
+            best = elapsed if best is None else min(best, elapsed)
+        print(
+            f"k={k}: {best * 1000:8.1f} ms, {len(squads)} squads,"
+            f" best {squads[0]['score']:.1f} xPoints for {squads[0]['cost'] / 10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Parse throughput of the bootstrap and live GW payloads, schema driven parsing
+against the generic per-field coercion it replaced, with the live stats
+parsed in place or straight into field arrays. Blocks are the allocations
+the parsed payloads keep alive
+
+    python -m benchmarks.parse --players 700 --gw 38
+"""
+
+import argparse, json, time, tracemalloc
+from benchmarks.synthetic import season
+from src.schema import ELEMENT_FIELDS, LIVE_FIELDS, columns, loads, parse
+
+
+def coerce_all(records, default=None):
+    """
+    Try to turn every string of every record into a float
+    """
+    for record in records:
+        for k, v in record.items():
+            if type(v) == str and (v != "" or default is not None):
+                try:
+                    record[k] = round(float(v), 3)
+                except ValueError:
+                    if default is not None:
+                        record[k] = default
+    return records
+
+
+def measure(fn, bodies):
+    """
+    Decode bodies and run fn on them, timed without tracing
+    returns: seconds, allocated blocks still alive afterwards
+    """
+    t = time.perf_counter()
+    results = [fn(body) for body in bodies]
+    elapsed = time.perf_counter() - t
+    del results
+    tracemalloc.start()
+    before = sum(s.count for s in tracemalloc.take_snapshot().statistics("filename"))
+    results = [fn(body) for body in bodies]
+    after = sum(s.count for s in tracemalloc.take_snapshot().statistics("filename"))
+    tracemalloc.stop()
+    return elapsed, after - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--players", type=int, default=700)
+    parser.add_argument("--gw", type=int, default=38)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    bootstrap, _, live = season(args.players, args.gw)
+    bootstrap = json.dumps(bootstrap).encode()
+    live = [json.dumps(live[gw]).encode() for gw in range(1, args.gw + 1)]
+    records = args.players * (1 + args.gw)
+    stages = {
+        "generic": (
+            lambda b: coerce_all(json.loads(b)["elements"]),
+            lambda b: coerce_all([p["stats"] for p in json.loads(b)["elements"]], 0),
+        ),
+        "schema": (
+            lambda b: parse(loads(b)["elements"], ELEMENT_FIELDS),
+            lambda b: parse([p["stats"] for p in loads(b)["elements"]], LIVE_FIELDS, 0),
+        ),
+        "columns": (
+            lambda b: parse(loads(b)["elements"], ELEMENT_FIELDS),
+            lambda b: columns(
+                [p["stats"] for p in loads(b)["elements"]], LIVE_FIELDS, 0
+            ),
+        ),
+    }
+    print(f"{args.players} players, {args.gw} GWs, {records} records")
+    for name, (elements, stats) in stages.items():
+        best, blocks = None, 0
+        for _ in range(args.repeat):
+            e_time, e_blocks = measure(elements, [bootstrap])
+            s_time, s_blocks = measure(stats, live)
+            if best is None or e_time + s_time < best:
+                best, blocks = e_time + s_time, e_blocks + s_blocks
+        print(
+            f"{name:>8}: {best * 1000:8.1f} ms  {records / best:10.0f} records/s"
+            f"  {blocks:9d} blocks"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""
+Search time of the transfer planner on a synthetic player pool, from the best
+squad under a lower budget
+
+    python -m benchmarks.planner --horizon 4 --transfers 2
+"""
+
+import argparse
+import pandas as pd
+from benchmarks.synthetic import build
+from src.optimiser import SquadOptimiser
+from src.planner import TransferPlanner
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--players", type=int, default=700)
+    parser.add_argument("--horizon", type=int, default=4)
+    parser.add_argument("--transfers", type=int, default=2)
+    parser.add_argument("--pool", type=int, default=4)
+    args = parser.parse_args()
+    _, _, table, fixtures = build(args.players)
+    points = TransferPlanner.projections(table, fixtures, 11, args.horizon)
+    scores = pd.Series(table.players["total_points"].to_numpy(), table.players.index)
+    squad = SquadOptimiser.solve(table, scores, budget=980)[0]["ids"]
+    for transfers in range(1, args.transfers + 1):
+        planner = TransferPlanner(table, points, squad, args.pool, transfers)
+        result = planner.plan(bank=20, free_transfers=1)
+        print(
+            f"{transfers} per GW: {result['seconds'] * 1000:8.1f} ms,"
+            f" {result['nodes']} nodes, {100 * result['hit_rate']:.1f} % cache hits,"
+            f" {result['score']:.1f} points (hold {result['hold']:.1f})"
+        )
+
+
+if __name__ == "__main__":
+    main()
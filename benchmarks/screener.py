@@ -0,0 +1,76 @@
+"""
+Time of the top players filters as boolean masks over the metrics frame
+against the screener, with its index built, and with the result cached
+
+    python -m benchmarks.screener --players 700 --queries 500
+"""
+
+import argparse, random, time
+from benchmarks import synthetic
+from src.screener import PlayerScreener
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--players", type=int, default=700)
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+    _, _, table, _ = synthetic.build(args.players, 10, 0)
+    df = table.metrics
+    rnd = random.Random(0)
+    teams = sorted(df["Team"].unique())
+    queries = []
+    for _ in range(args.queries):
+        low, high = sorted(round(rnd.uniform(3.5, 14.5), 1) for _ in range(2))
+        queries.append(
+            (
+                (low, high),
+                rnd.choice(range(0, 101, 5)),
+                rnd.choice(range(0, 91, 5)),
+                rnd.sample(["GK", "DEF", "MID", "FWD"], rnd.randint(1, 4)),
+                rnd.sample(teams, rnd.randint(1, len(teams))),
+            )
+        )
+    t = time.perf_counter()
+    for price, team_gi, minutes, positions, names in queries:
+        df[
+            df["Position"].isin(positions)
+            & df["Price"].between(price[0], price[1])
+            & df["Team GI %"].between(team_gi, 100)
+            & df["Fixture Score"].between(0.0, 5.0)
+            & df["Minutes/Game"].between(minutes, 90)
+            & df["Bonus %"].between(0, 100)
+            & df["Team"].isin(names)
+            & df["Minutes/xGI"].between(0, 10000000)
+        ].sort_values(by=["xPoints"], ascending=False)
+    masks = (time.perf_counter() - t) / args.queries
+    t = time.perf_counter()
+    screener = PlayerScreener.for_table(table)
+    build = time.perf_counter() - t
+    screens = [
+        PlayerScreener.query(
+            ranges={
+                "Price": price,
+                "Team GI %": (team_gi, 100),
+                "Fixture Score": (0.0, 5.0),
+                "Minutes/Game": (minutes, 90),
+                "Bonus %": (0, 100),
+                "Minutes/xGI": (0, 10000000),
+            },
+            members={"Position": positions, "Team": names},
+            sort="xPoints",
+        )
+        for price, team_gi, minutes, positions, names in queries
+    ]
+    timings = {"index build": build, "masks": masks}
+    for name in ("screener", "cached"):
+        t = time.perf_counter()
+        for query in screens:
+            screener.run(query)
+        timings[name] = (time.perf_counter() - t) / args.queries
+    for name, elapsed in timings.items():
+        print(f"{name:>12}: {elapsed * 1000:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
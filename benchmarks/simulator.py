@@ -0,0 +1,65 @@
+"""
+Trials per second of the gameweek simulator on a synthetic season, for a
+squad alone and against the field of owned players
+
+    python -m benchmarks.simulator --trials 100000 --processes 4
+"""
+
+import argparse, tempfile, time
+import pandas as pd
+from benchmarks.synthetic import build, live
+from src.history import HistoryTensor
+from src.optimiser import SquadOptimiser
+from src.simulator import GameweekSimulator
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--players", type=int, default=700)
+    parser.add_argument("--trials", type=int, default=100_000)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument(
+        "--min-owned", type=float, default=30.0, help="field players, selected by %%"
+    )
+    args = parser.parse_args()
+    _, players, table, fixtures = build(args.players)
+    with tempfile.TemporaryDirectory() as directory:
+        history = HistoryTensor.build(
+            list(players), live(args.players), "bench", directory
+        )
+        scores = table.metrics["xPoints"]
+        squad = table.players.loc[SquadOptimiser.solve(table, scores)[0]["ids"]]
+        # Best GK, 4 DEF, 4 MID and 2 FWD by xPoints
+        ranked = squad.assign(score=scores).sort_values("score", ascending=False)
+        xi = pd.concat(
+            [
+                ranked[ranked["position"] == p].head(n)
+                for p, n in enumerate([1, 4, 4, 2])
+            ]
+        ).index
+        owned = table.players["selected_by_percent"]
+        owned = owned[owned >= args.min_owned] / 100
+        for name, effective in (("squad", None), ("field", owned)):
+            ids = xi if effective is None else xi.union(effective.index)
+            simulator = GameweekSimulator(table, fixtures, history, ids)
+            frames = []
+            # The pool is started on its first run and reused after
+            for processes in (1, args.processes, args.processes):
+                t = time.perf_counter()
+                frames.append(
+                    simulator.captaincy(
+                        xi, effective, args.trials, processes=processes, targets=(60,)
+                    )
+                )
+                elapsed = time.perf_counter() - t
+                print(
+                    f"{name} ({len(ids)} players), {processes} process(es):"
+                    f" {elapsed * 1000:8.1f} ms,"
+                    f" {args.trials / elapsed / 1000:.0f}k trials/s, best captain"
+                    f" {frames[-1].index[0]} {frames[-1]['xPts'].iloc[0]:.2f} xPts,"
+                    f" same as 1 process: {frames[-1].equals(frames[0])}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+"""
+Local stand-in for the FPL API, replaying recorded payloads or synthesising a
+season, with injected latency, errors and rate limits
+
+    python -m benchmarks.standin synthetic --players 700 --managers 1000
+    python -m benchmarks.standin record --out recordings --manager 1 --league 314
+    python -m benchmarks.standin replay --dir recordings --latency 0.05
+    FANTAPY_API_URL=http://127.0.0.1:8765/api/ streamlit run fantapy.py
+"""
+
+import argparse, hashlib, json, os, random, re, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, unquote
+from benchmarks import synthetic
+
+
+class Recording:
+    """
+    Payloads by API path (relative to the base URL, query included)
+    """
+
+    def __init__(self, payloads=None):
+        self.payloads = payloads or {}
+
+    def __call__(self, path: str):
+        return self.payloads.get(path)
+
+    @staticmethod
+    def load(directory: str):
+        payloads = {}
+        for name in os.listdir(directory):
+            if name.endswith(".json"):
+                with open(os.path.join(directory, name), "rb") as f:
+                    payloads[unquote(name[: -len(".json")])] = f.read()
+        return Recording(payloads)
+
+    def save(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        for path, body in self.payloads.items():
+            with open(
+                os.path.join(directory, quote(path, safe="") + ".json"), "wb"
+            ) as f:
+                f.write(body)
+
+    @staticmethod
+    def record(base_url: str, managers=(), leagues=(), league_pages=1):
+        """
+        Fetch the bootstrap, fixtures, every started GW's live data, and the
+        entries and current picks of managers and of the leagues' first pages
+        """
+        from src.fetcher import FPLFetcher
+
+        fetcher = FPLFetcher(rate=5)
+        recording = Recording()
+
+        def get(path):
+            body = fetcher._request(base_url + path).content
+            recording.payloads[path] = body
+            return json.loads(body)
+
+        bootstrap = get("bootstrap-static/")
+        get("fixtures/")
+        events = [
+            e["id"] for e in bootstrap["events"] if e["finished"] or e["is_current"]
+        ]
+        for gw in events:
+            get(f"event/{gw}/live/")
+        gw = events[-1] if len(events) > 0 else 1
+        managers = list(managers)
+        for league in leagues:
+            for page in range(1, league_pages + 1):
+                data = get(f"leagues-classic/{league}/standings/?page_standings={page}")
+                managers += [r["entry"] for r in data["standings"]["results"]]
+                if not data["standings"]["has_next"]:
+                    break
+        for manager in managers:
+            get(f"entry/{manager}/")
+            get(f"entry/{manager}/event/{gw}/picks/")
+        return recording
+
+
+class SyntheticAPI:
+    """
+    A season of N players, their element summaries and a league (id 1) of M
+    managers, payloads built on first request
+    """
+
+    def __init__(self, players=700, managers=1000, curr_gw=10, seed=0):
+        self.managers = managers
+        self.curr_gw = curr_gw
+        self.seed = seed
+        bootstrap, fixtures, live = synthetic.season(players, curr_gw, seed)
+        self.elements = bootstrap["elements"]
+        self.fixtures = fixtures
+        self.payloads = {
+            "bootstrap-static/": bootstrap,
+            "fixtures/": fixtures,
+            **{f"event/{gw}/live/": live[gw] for gw in live},
+        }
+        self._lock = threading.Lock()
+
+    def __call__(self, path: str):
+        with self._lock:
+            if path not in self.payloads:
+                self.payloads[path] = self.build(path)
+            data = self.payloads[path]
+        return None if data is None else json.dumps(data).encode()
+
+    def build(self, path: str):
+        match = re.fullmatch(r"entry/(\d+)/event/(\d+)/picks/", path)
+        if match and 0 < int(match.group(1)) <= self.managers:
+            entry, gw = int(match.group(1)), int(match.group(2))
+            return synthetic.picks(self.elements, entry, gw, self.seed)
+        match = re.fullmatch(r"element-summary/(\d+)/", path)
+        if match and 0 < int(match.group(1)) <= len(self.elements):
+            element = self.elements[int(match.group(1)) - 1]
+            return synthetic.summary(element, self.fixtures, self.seed)
+        match = re.fullmatch(r"entry/(\d+)/", path)
+        if match and 0 < int(match.group(1)) <= self.managers:
+            return synthetic.entry(int(match.group(1)), self.curr_gw)
+        match = re.fullmatch(
+            r"leagues-classic/1/standings/\?page_standings=(\d+)", path
+        )
+        if match:
+            return synthetic.standings(1, self.managers, int(match.group(1)))
+        return None
+
+
+class StandIn:
+    """
+    Threaded HTTP server answering API paths from a payload source, a
+    callable path -> body or None. Responses carry an ETag and honour
+    If-None-Match. Failures are injected with a fixed seed
+    """
+
+    def __init__(
+        self,
+        source,
+        latency=0.0,
+        error_rate=0.0,
+        rate_limit=None,
+        seed=0,
+        prefix="/api/",
+    ):
+        self.source = source
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.prefix = prefix
+        self.stats = {"requests": 0, "not_modified": 0, "errors": 0, "throttled": 0}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._tokens = rate_limit or 0
+        self._updated = time.monotonic()
+        self.server = None
+
+    def admit(self):
+        """
+        Count the request and decide its fate
+        returns: None to serve it, else the status to fail it with
+        """
+        with self._lock:
+            self.stats["requests"] += 1
+            if self.rate_limit is not None:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.rate_limit,
+                    self._tokens + (now - self._updated) * self.rate_limit,
+                )
+                self._updated = now
+                if self._tokens < 1:
+                    self.stats["throttled"] += 1
+                    return 429
+                self._tokens -= 1
+            if self._random.random() < self.error_rate:
+                self.stats["errors"] += 1
+                return 503
+        return None
+
+    def start(self, host="127.0.0.1", port=0):
+        """
+        Serve on a background thread
+        returns: the base URL to configure the querier with
+        """
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                if standin.latency > 0:
+                    time.sleep(standin.latency)
+                status = standin.admit()
+                body = None
+                if status is None and self.path.startswith(standin.prefix):
+                    body = standin.source(self.path[len(standin.prefix) :])
+                    status = 200 if body is not None else 404
+                if status != 200:
+                    self.reply(
+                        status, b"", {"Retry-After": "1"} if status == 429 else {}
+                    )
+                    return
+                etag = '"%s"' % hashlib.sha1(body).hexdigest()[:16]
+                if self.headers.get("If-None-Match") == etag:
+                    with standin._lock:
+                        standin.stats["not_modified"] += 1
+                    self.reply(304, b"", {"ETag": etag})
+                    return
+                self.reply(
+                    200, body, {"ETag": etag, "Content-Type": "application/json"}
+                )
+
+            def reply(self, status, body, headers):
+                self.send_response(status)
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return f"http://{host}:{self.server.server_port}{self.prefix}"
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    synth = commands.add_parser("synthetic", help="serve a synthetic season")
+    synth.add_argument("--players", type=int, default=700)
+    synth.add_argument("--managers", type=int, default=1000)
+    synth.add_argument("--gw", type=int, default=10)
+    synth.add_argument("--seed", type=int, default=0)
+    replay = commands.add_parser("replay", help="serve recorded payloads")
+    replay.add_argument("--dir", required=True)
+    record = commands.add_parser("record", help="record payloads from the API")
+    record.add_argument("--out", required=True)
+    record.add_argument("--base-url", default="https://fantasy.premierleague.com/api/")
+    record.add_argument("--manager", type=int, action="append", default=[])
+    record.add_argument("--league", type=int, action="append", default=[])
+    record.add_argument("--league-pages", type=int, default=1)
+    for command in (synth, replay):
+        command.add_argument("--port", type=int, default=8765)
+        command.add_argument("--latency", type=float, default=0.0)
+        command.add_argument("--error-rate", type=float, default=0.0)
+        command.add_argument("--rate-limit", type=float, default=None)
+    args = parser.parse_args()
+    if args.command == "record":
+        recording = Recording.record(
+            args.base_url, args.manager, args.league, args.league_pages
+        )
+        recording.save(args.out)
+        print(f"{len(recording.payloads)} payloads saved to {args.out}")
+        return
+    if args.command == "synthetic":
+        source = SyntheticAPI(args.players, args.managers, args.gw, args.seed)
+    else:
+        source = Recording.load(args.dir)
+    standin = StandIn(source, args.latency, args.error_rate, args.rate_limit)
+    print(f"Serving on {standin.start(port=args.port)}, Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        print(standin.stats)
+        standin.stop()
+
+
+if __name__ == "__main__":
+    main()
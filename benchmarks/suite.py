@@ -0,0 +1,296 @@
+"""
+End-to-end benchmark of the refresh and view stages against a stand-in API,
+wall time, peak memory and allocated blocks per stage, across player, GW and
+manager counts. Results are written as JSON and compared with a baseline,
+by default benchmarks/baseline.json, the default scenario on the reference
+machine. Refresh it from a clean checkout after an intended change in cost,
+on the machine the comparisons run on
+
+    python -m benchmarks.suite
+    python -m benchmarks.suite --out benchmarks/baseline.json --baseline ""
+    python -m benchmarks.suite --players 300 700 1500 --gws 5 38 --out now.json
+    python -m benchmarks.suite --baseline base.json --tolerance 0.25
+    python -m benchmarks.suite --replay recordings --league 314
+"""
+
+import argparse, itertools, json, math, multiprocessing, os, platform, sys
+import tempfile, time, tracemalloc
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+class StreamlitStub:
+    """
+    Stands in for streamlit in the visualiser: widgets answer their defaults
+    and output calls do nothing, so only the computation is timed
+    """
+
+    def checkbox(self, label, value=False, **kwargs):
+        return value
+
+    def button(self, label, **kwargs):
+        return False
+
+    def multiselect(self, label, options, default=None, **kwargs):
+        return list(default or [])
+
+    def select_slider(self, label, options=(), value=None, **kwargs):
+        return options[0] if value is None else value
+
+    def slider(self, label, min_value=None, max_value=None, value=None, **kwargs):
+        return min_value if value is None else value
+
+    def text_input(self, label, value="", **kwargs):
+        return value
+
+    def columns(self, spec, **kwargs):
+        return [self] * (spec if isinstance(spec, int) else len(spec))
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+def serve(source, queue):
+    """
+    Run a stand-in in this (child) process so its threads do not share the
+    GIL or the traced allocations with the stages, and report its URL
+    """
+    from benchmarks.standin import Recording, StandIn, SyntheticAPI
+
+    kind, options = source
+    if kind == "replay":
+        api = Recording.load(options["dir"])
+    else:
+        api = SyntheticAPI(options["players"], options["managers"], options["gws"])
+    standin = StandIn(api, latency=options["latency"])
+    queue.put(standin.start())
+    while True:
+        time.sleep(60)
+
+
+def measure(stage, setup, repeat):
+    """
+    Run stage on fresh arguments from setup, repeat times untraced for the
+    best wall time, then once traced
+    returns: seconds, peak KiB above the arguments, blocks still allocated
+        by the result
+    """
+    best = math.inf
+    for _ in range(repeat):
+        args = setup()
+        t = time.perf_counter()
+        stage(*args)
+        best = min(best, time.perf_counter() - t)
+    args = setup()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    before = sum(s.count for s in tracemalloc.take_snapshot().statistics("filename"))
+    result = stage(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    after = sum(s.count for s in tracemalloc.take_snapshot().statistics("filename"))
+    tracemalloc.stop()
+    del result
+    return best, (peak - start) / 1024, after - before
+
+
+def stages(league_id, root):
+    """
+    The stages of one scenario as (name, stage, setup), each setup building
+    the stage's inputs from the stand-in currently configured
+    """
+    from src import visualiser
+    from src.data import FPLData, FPLSnapshot
+    from src.history import HistoryTensor
+    from src.ownership import EffectiveOwnership
+    from src.querier import FPLQuerier
+    from src.schema import loads
+    from src.snapshot import PlayerTable
+
+    visualiser.st = StreamlitStub()
+    cache = FPLQuerier.cache()
+    urls = [FPLQuerier.FPL_GENERAL_URL, FPLQuerier.FPL_FIXTURES_URL]
+    raw = [FPLQuerier.fetcher()._request(url).content for url in urls]
+    data = loads(raw[0])
+    teams = FPLQuerier.get_teams(loads(raw[0]), loads(raw[1]))[0]
+    curr_gw, players, _ = FPLQuerier.get_players(loads(raw[0]), teams)
+    live = FPLQuerier.get_live(data)[1]
+    fpl = FPLData()
+    fpl.pin(FPLSnapshot(*FPLQuerier.build()))
+    fpl.manager_team = None
+    names = fpl.player_names
+    league = []
+
+    def cold(*args):
+        cache.clear()
+        return args
+
+    def parsed():
+        return loads(raw[0]), loads(raw[1])
+
+    def teamed():
+        bootstrap = loads(raw[0])
+        return cold(bootstrap, FPLQuerier.get_teams(bootstrap, loads(raw[1]))[0])
+
+    def directory():
+        season = HistoryTensor.season_of(data)
+        return (list(players), live, season, tempfile.mkdtemp(dir=root))
+
+    # Picks exist for the GW in progress or last played, not for curr_gw
+    gw = curr_gw - 1 if curr_gw > 0 else len(data["events"])
+    final = data["events"][gw - 1].get("data_checked", False)
+
+    def get_league():
+        league[:] = [FPLQuerier.get_league(league_id, gw, final=final)]
+        return league[0]
+
+    results = [
+        ("fetch", lambda: dict(FPLQuerier.fetcher().map(urls)), cold),
+        ("get_teams", FPLQuerier.get_teams, parsed),
+        ("get_players", FPLQuerier.get_players, teamed),
+        ("player_table", PlayerTable.from_players, lambda: (players, teams)),
+        ("history", HistoryTensor.build, directory),
+        ("run", FPLQuerier.build, cold),
+        ("top_players", visualiser.FPLVisualiser.top_players, lambda: (fpl,)),
+        ("team_metrics", visualiser.FPLVisualiser.team_metrics, lambda: (fpl,)),
+        (
+            "player_charts",
+            visualiser.FPLVisualiser.player_charts,
+            lambda: (fpl, names[0], names[-1]),
+        ),
+    ]
+    if league_id is not None:
+        results += [
+            ("league", get_league, cold),
+            ("ownership", EffectiveOwnership, lambda: (league[0], list(players))),
+        ]
+    return results
+
+
+def scenarios(args):
+    """
+    returns: list of (name, source, league id)
+    """
+    if args.replay is not None:
+        options = {"dir": args.replay, "latency": args.latency}
+        return [("replay", ("replay", options), args.league)]
+    results = []
+    for players, gws, managers in itertools.product(
+        args.players, args.gws, args.managers
+    ):
+        options = {"players": players, "gws": gws, "managers": managers}
+        options["latency"] = args.latency
+        name = f"players={players},gws={gws},managers={managers}"
+        results.append((name, ("synthetic", options), 1 if managers > 0 else None))
+    return results
+
+
+def compare(results, baseline, tolerance, floor):
+    """
+    Stages slower or heavier than the baseline by more than tolerance,
+    ignoring differences under floor seconds
+    returns: list of messages
+    """
+    previous = {(r["scenario"], r["stage"]): r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        base = previous.get((result["scenario"], result["stage"]))
+        if base is None:
+            continue
+        name = f"{result['stage']} [{result['scenario']}]"
+        slower = result["seconds"] - base["seconds"]
+        if slower > floor and slower > tolerance * base["seconds"]:
+            regressions.append(
+                f"{name}: {base['seconds'] * 1000:.1f} ms ->"
+                f" {result['seconds'] * 1000:.1f} ms"
+            )
+        if result["peak_kib"] > (1 + tolerance) * base["peak_kib"] + 64:
+            regressions.append(
+                f"{name}: peak {base['peak_kib']:.0f} KiB ->"
+                f" {result['peak_kib']:.0f} KiB"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--players", type=int, nargs="+", default=[700])
+    parser.add_argument("--gws", type=int, nargs="+", default=[10])
+    parser.add_argument("--managers", type=int, nargs="+", default=[200])
+    parser.add_argument("--replay", help="recorded payloads instead of synthetic")
+    parser.add_argument("--league", type=int, help="league id of the recording")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument(
+        "--league-rate",
+        type=float,
+        help="league requests per second, unthrottled by default as the"
+        " stand-in needs no politeness limit",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", help="write the results to this JSON file")
+    parser.add_argument(
+        "--baseline",
+        default=BASELINE,
+        help="compare against this results file, empty to skip",
+    )
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--floor", type=float, default=0.005)
+    args = parser.parse_args()
+    root = tempfile.mkdtemp(prefix="fantapy-bench-")
+    os.environ["FANTAPY_CACHE_DIR"] = root
+    from src import caching
+    from src.querier import FPLQuerier
+
+    caching.use(None)
+    FPLQuerier.league_fetcher().rate = args.league_rate
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for name, source, league_id in scenarios(args):
+        queue = context.Queue()
+        server = context.Process(target=serve, args=(source, queue), daemon=True)
+        server.start()
+        FPLQuerier.configure(queue.get(timeout=600))
+        print(name)
+        try:
+            for stage, fn, setup in stages(league_id, root):
+                seconds, peak, blocks = measure(fn, setup, args.repeat)
+                results.append(
+                    {
+                        "scenario": name,
+                        "stage": stage,
+                        "seconds": seconds,
+                        "peak_kib": peak,
+                        "blocks": blocks,
+                    }
+                )
+                print(
+                    f"{stage:>14}: {seconds * 1000:9.2f} ms,"
+                    f" peak {peak:9.0f} KiB, {blocks:8d} blocks"
+                )
+        finally:
+            server.terminate()
+    if args.out is not None:
+        with open(args.out, "w") as f:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "created": time.time(),
+                    "repeat": args.repeat,
+                    "results": results,
+                },
+                f,
+                indent=1,
+            )
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance, args.floor)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if len(regressions) > 0:
+            return 1
+        print("No regressions against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,379 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+TEAM_CODES = [
+    "ARS", "AVL", "BOU", "BRE", "BHA", "BUR", "CHE", "CRY", "EVE", "FUL",
+    "LIV", "LUT", "MCI", "MUN", "NEW", "NFO", "SHE", "TOT", "WHU", "WOL",
+]  # fmt: skip
+SEASON_START = datetime(2023, 8, 11, 19, tzinfo=timezone.utc)
+
+
+def timestamp(t: datetime):
+    return t.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def teams(rnd: random.Random):
+    return [
+        {
+            "id": i,
+            "code": i * 3,
+            "name": f"{code} FC",
+            "short_name": code,
+            "strength": rnd.randint(2, 5),
+            **{
+                f"strength_{k}_{where}": 1000 + rnd.randint(1000, 1350)
+                for k in ("overall", "attack", "defence")
+                for where in ("home", "away")
+            },
+        }
+        for i, code in enumerate(TEAM_CODES, 1)
+    ]
+
+
+def fixtures(rnd: random.Random, curr_gw: int):
+    """
+    A fixture list with a blank GW 7 for four teams and a double GW 9 for two
+    """
+    results, fixture_id = [], 1
+    for gw in range(1, 39):
+        ids = list(range(1, len(TEAM_CODES) + 1))
+        rnd.shuffle(ids)
+        pairs = [(ids[i], ids[i + 1]) for i in range(0, len(ids), 2)]
+        if gw == 7:
+            pairs = pairs[:-2]
+        if gw == 9:
+            pairs.append((ids[0], ids[3]))
+        for i, (team_h, team_a) in enumerate(pairs):
+            done = gw < curr_gw
+            started = done or (gw == curr_gw and i < len(pairs) // 2)
+            kickoff = SEASON_START + timedelta(days=7 * (gw - 1), hours=2 * i)
+            results.append(
+                {
+                    "id": fixture_id,
+                    "code": 2300000 + fixture_id,
+                    "event": gw,
+                    "kickoff_time": timestamp(kickoff),
+                    "team_h": team_h,
+                    "team_a": team_a,
+                    "team_h_score": rnd.randint(0, 4) if started else None,
+                    "team_a_score": rnd.randint(0, 3) if started else None,
+                    "started": started,
+                    "finished": done,
+                    "finished_provisional": done,
+                    "minutes": 90 if done else 0,
+                    "team_h_difficulty": rnd.randint(2, 5),
+                    "team_a_difficulty": rnd.randint(2, 5),
+                }
+            )
+            fixture_id += 1
+    results.append(
+        {
+            "id": fixture_id,
+            "event": None,
+            "kickoff_time": None,
+            "team_h": 1,
+            "team_a": 2,
+            "team_h_score": None,
+            "team_a_score": None,
+            "started": False,
+            "finished": False,
+        }
+    )
+    return results
+
+
+def live_stats(rnd: random.Random):
+    minutes = rnd.choice([0, 0, 15, 60, 90, 90, 90])
+    played = minutes > 0
+    goals = rnd.choice([0] * 8 + [1]) if played else 0
+    assists = rnd.choice([0] * 8 + [1]) if played else 0
+    bonus = rnd.choice([0] * 6 + [1, 2, 3]) if played else 0
+    xg = rnd.random() * 0.5 if played else 0.0
+    xa = rnd.random() * 0.3 if played else 0.0
+    return {
+        "minutes": minutes,
+        "goals_scored": goals,
+        "assists": assists,
+        "clean_sheets": int(minutes >= 60 and rnd.random() < 0.3),
+        "goals_conceded": rnd.randint(0, 3) if played else 0,
+        "own_goals": 0,
+        "penalties_saved": 0,
+        "penalties_missed": 0,
+        "yellow_cards": int(rnd.random() < 0.1) if played else 0,
+        "red_cards": 0,
+        "saves": 0,
+        "bonus": bonus,
+        "bps": bonus * 10 + (rnd.randint(0, 20) if played else 0),
+        "influence": f"{rnd.random() * 30:.1f}",
+        "creativity": f"{rnd.random() * 30:.1f}",
+        "threat": f"{rnd.random() * 30:.1f}",
+        "ict_index": f"{rnd.random() * 10:.1f}",
+        "starts": int(minutes >= 60),
+        "expected_goals": f"{xg:.2f}",
+        "expected_assists": f"{xa:.2f}",
+        "expected_goal_involvements": f"{xg + xa:.2f}",
+        "expected_goals_conceded": f"{rnd.random() * 2:.2f}",
+        "total_points": (2 if minutes >= 60 else int(played))
+        + 5 * goals
+        + 3 * assists
+        + bonus,
+        "in_dreamteam": False,
+    }
+
+
+def season(players=700, curr_gw=10, seed=0):
+    """
+    Synthesise the bootstrap, fixtures and live GW payloads of a season in
+    progress at curr_gw
+    returns: bootstrap, fixtures, live (gw -> payload)
+    """
+    rnd = random.Random(seed)
+    bootstrap_teams = teams(rnd)
+    events = [
+        {
+            "id": gw,
+            "name": f"Gameweek {gw}",
+            "deadline_time": timestamp(
+                SEASON_START + timedelta(days=7 * (gw - 1), hours=-1, minutes=-30)
+            ),
+            "finished": gw < curr_gw,
+            "data_checked": gw < curr_gw,
+            "is_previous": gw == curr_gw - 1,
+            "is_current": gw == curr_gw,
+            "is_next": gw == curr_gw + 1,
+        }
+        for gw in range(1, 39)
+    ]
+    live = {gw: {"elements": []} for gw in range(1, 39)}
+    elements = []
+    counted = ["minutes", "goals_scored", "assists", "clean_sheets", "bonus"]
+    counted += ["bps", "starts", "total_points", "goals_conceded", "yellow_cards"]
+    for pid in range(1, players + 1):
+        totals = dict.fromkeys(counted, 0)
+        xg = xa = 0.0
+        stats = {"total_points": 0}
+        for gw in range(1, curr_gw + 1):
+            stats = live_stats(rnd)
+            live[gw]["elements"].append(
+                {
+                    "id": pid,
+                    "stats": stats,
+                    "explain": [
+                        {
+                            "fixture": gw,
+                            "stats": [
+                                {
+                                    "identifier": "minutes",
+                                    "points": min(2, stats["minutes"]),
+                                    "value": stats["minutes"],
+                                }
+                            ],
+                        }
+                    ],
+                }
+            )
+            for k in counted:
+                totals[k] += stats[k]
+            xg += float(stats["expected_goals"])
+            xa += float(stats["expected_assists"])
+        elements.append(
+            {
+                "id": pid,
+                "code": 100000 + pid,
+                "web_name": f"Player{pid}",
+                "first_name": "First",
+                "second_name": f"Second{pid}",
+                "team": rnd.randint(1, len(TEAM_CODES)),
+                "element_type": rnd.choice([1, 2, 2, 3, 3, 3, 4]),
+                "status": "a",
+                "news": rnd.choice(["", "", "", "Knock - 75% chance of playing"]),
+                "news_added": None,
+                "photo": f"{100000 + pid}.jpg",
+                "now_cost": rnd.randint(40, 130),
+                "cost_change_event": 0,
+                "cost_change_start": 0,
+                "selected_by_percent": f"{rnd.random() * 40:.1f}",
+                "transfers_in_event": rnd.randint(0, 50000),
+                "transfers_out_event": rnd.randint(0, 50000),
+                "form": f"{rnd.random() * 8:.1f}",
+                "points_per_game": f"{totals['total_points'] / max(1, curr_gw):.1f}",
+                "ep_next": f"{rnd.random() * 6:.1f}",
+                "ep_this": f"{rnd.random() * 6:.1f}",
+                "value_form": f"{rnd.random():.1f}",
+                "value_season": f"{rnd.random() * 10:.1f}",
+                "influence": f"{rnd.random() * 300:.1f}",
+                "creativity": f"{rnd.random() * 300:.1f}",
+                "threat": f"{rnd.random() * 300:.1f}",
+                "ict_index": f"{rnd.random() * 100:.1f}",
+                "expected_goals": f"{xg:.2f}",
+                "expected_assists": f"{xa:.2f}",
+                "expected_goal_involvements": f"{xg + xa:.2f}",
+                "expected_goals_conceded": f"{rnd.random() * 10:.2f}",
+                "event_points": stats["total_points"],
+                **totals,
+            }
+        )
+    bootstrap = {
+        "events": events,
+        "teams": bootstrap_teams,
+        "elements": elements,
+        "element_types": [
+            {"id": i + 1, "singular_name_short": pos, "squad_select": n}
+            for i, (pos, n) in enumerate(
+                [("GKP", 2), ("DEF", 5), ("MID", 5), ("FWD", 3)]
+            )
+        ],
+        "total_players": 10000000,
+    }
+    return bootstrap, fixtures(rnd, curr_gw), live
+
+
+def build(players=700, curr_gw=10, seed=0):
+    """
+    Run the querier's parse and derive stages on a synthetic season without
+    touching the network
+    returns: teams, players, table, fixtures
+    """
+    from src.querier import FPLQuerier
+    from src.snapshot import PlayerTable
+
+    bootstrap, fixture_list, live = season(players, curr_gw, seed)
+    teams, _, matrix = FPLQuerier.get_teams(bootstrap, fixture_list)
+    players, _ = FPLQuerier.build_players(bootstrap, teams)
+    live = {gw: FPLQuerier.parse_live(live[gw]) for gw in range(1, curr_gw + 1)}
+    FPLQuerier.add_live(players, live)
+    FPLQuerier.derive_stats(players)
+    return teams, players, PlayerTable.from_players(players, teams), matrix
+
+
+def live(players=700, curr_gw=10, seed=0):
+    """
+    The parsed live GWs of the same synthetic season, as FPLQuerier.get_live
+    returns them
+    """
+    from src.querier import FPLQuerier
+
+    _, _, payloads = season(players, curr_gw, seed)
+    return {
+        gw: FPLQuerier.parse_live(payloads[gw]) for gw in range(1, curr_gw + 1)
+    }
+
+
+def picks(elements: list, entry: int, gw: int, seed=0):
+    """
+    A legal-looking 15-player squad of entry for gw, the same on every call
+    """
+    rnd = random.Random(seed * 1000003 + entry * 41 + gw)
+    squad = []
+    for element_type, count in ((1, 2), (2, 5), (3, 5), (4, 3)):
+        pool = [e["id"] for e in elements if e["element_type"] == element_type]
+        squad += rnd.sample(pool, min(count, len(pool)))
+    chip = rnd.choice([None] * 12 + ["3xc", "bboost"])
+    captain = rnd.randrange(2, 11)
+    return {
+        "active_chip": chip,
+        "entry_history": {
+            "event": gw,
+            "points": rnd.randint(20, 90),
+            "bank": rnd.randint(0, 40),
+            "value": 1000 + rnd.randint(0, 60),
+            "event_transfers": rnd.randint(0, 2),
+        },
+        "picks": [
+            {
+                "element": element,
+                "position": slot,
+                "multiplier": (
+                    (3 if chip == "3xc" else 2)
+                    if slot == captain + 1
+                    else int(slot <= 11 or chip == "bboost")
+                ),
+                "is_captain": slot == captain + 1,
+                "is_vice_captain": slot == captain + 2,
+            }
+            for slot, element in enumerate(squad, 1)
+        ],
+    }
+
+
+def entry(entry_id: int, curr_gw: int):
+    return {
+        "id": entry_id,
+        "name": f"Team {entry_id}",
+        "player_first_name": "Manager",
+        "player_last_name": str(entry_id),
+        "summary_overall_points": 50 * curr_gw,
+        "current_event": curr_gw,
+    }
+
+
+def standings(league_id: int, managers: int, page: int, per_page=50):
+    """
+    A page of a classic league made of entries 1..managers
+    """
+    first = (page - 1) * per_page + 1
+    last = min(first + per_page, managers + 1)
+    return {
+        "league": {"id": league_id, "name": f"League {league_id}"},
+        "standings": {
+            "has_next": last <= managers,
+            "page": page,
+            "results": [
+                {
+                    "entry": i,
+                    "entry_name": f"Team {i}",
+                    "player_name": f"Manager {i}",
+                    "rank": i,
+                    "total": 50 * (managers - i),
+                    "event_total": 50,
+                }
+                for i in range(first, last)
+            ],
+        },
+    }
+
+
+def summary(element: dict, fixture_list: list, seed=0):
+    """
+    Element summary of a bootstrap element: its team's unfinished fixtures
+    and up to three past seasons
+    """
+    rnd = random.Random(seed * 1000003 + element["id"])
+    team = element["team"]
+    return {
+        "fixtures": [
+            {
+                "id": f["id"],
+                "event": f["event"],
+                "kickoff_time": f["kickoff_time"],
+                "team_h": f["team_h"],
+                "team_a": f["team_a"],
+                "is_home": f["team_h"] == team,
+                "difficulty": f[
+                    "team_h_difficulty" if f["team_h"] == team else "team_a_difficulty"
+                ],
+                "finished": f["finished"],
+            }
+            for f in fixture_list
+            if not f["finished"] and team in (f["team_h"], f["team_a"]) and f["event"]
+        ],
+        "history": [],
+        "history_past": [
+            {
+                "season_name": f"{2024 - i}/{25 - i}",
+                "element_code": element["code"],
+                "start_cost": element["now_cost"] - rnd.randint(-5, 5),
+                "end_cost": element["now_cost"],
+                "total_points": (points := rnd.randint(0, 250)),
+                "minutes": rnd.randint(points * 10, 3420) if points else 0,
+                "goals_scored": rnd.randint(0, 20),
+                "assists": rnd.randint(0, 15),
+                "clean_sheets": rnd.randint(0, 15),
+                "bonus": rnd.randint(0, 30),
+                "expected_goals": f"{rnd.random() * 20:.2f}",
+                "expected_assists": f"{rnd.random() * 12:.2f}",
+                "expected_goal_involvements": f"{rnd.random() * 30:.2f}",
+            }
+            for i in reversed(range(rnd.randint(0, 3)))
+        ],
+    }
@@ -0,0 +1,69 @@
+"""
+Append and query times and size of the trend store over simulated refreshes
+of a synthetic bootstrap
+
+    python -m benchmarks.trends --refreshes 2000 --moving 0.3
+"""
+
+import argparse, os, random, tempfile, time
+from benchmarks.synthetic import season
+from src.schema import ELEMENT_FIELDS, parse
+from src.trends import TrendStore
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--players", type=int, default=700)
+    parser.add_argument("--refreshes", type=int, default=2000)
+    parser.add_argument(
+        "--moving", type=float, default=0.3, help="share of players changing"
+    )
+    parser.add_argument("--hours", type=float, default=1.0, help="between refreshes")
+    args = parser.parse_args()
+    rnd = random.Random(0)
+    elements = parse(season(args.players, seed=0)[0]["elements"], ELEMENT_FIELDS)
+    start = 1_700_000_000
+    with tempfile.TemporaryDirectory() as directory:
+        store = TrendStore(os.path.join(directory, "trends.sqlite"))
+        t, written = time.perf_counter(), 0
+        for i in range(args.refreshes):
+            for element in rnd.sample(elements, int(args.moving * len(elements))):
+                element["selected_by_percent"] = round(
+                    max(element["selected_by_percent"] + rnd.gauss(0, 0.1), 0), 1
+                )
+                element["transfers_in_event"] += rnd.randint(0, 500)
+                if rnd.random() < 0.01:
+                    element["now_cost"] += rnd.choice([-1, 1])
+            written += store.append(elements, start + int(i * args.hours * 3600))
+        elapsed = time.perf_counter() - t
+        size = os.path.getsize(store.path) + os.path.getsize(store.path + "-wal")
+        print(
+            f"{args.refreshes} appends: {elapsed / args.refreshes * 1000:.2f} ms each,"
+            f" {written} values, {size / 1024:.0f} KiB"
+            f" ({size / written:.1f} B per value,"
+            f" {size / args.refreshes / args.players:.2f} B per player and refresh)"
+        )
+        middle = start + int(args.refreshes / 2 * args.hours * 3600)
+        end = start + int(args.refreshes * args.hours * 3600)
+        queries = [
+            ("all players at a time", lambda: store.at(middle)),
+            ("ownership of one player", lambda: store.series(1, "selected_by_percent")),
+            (
+                "ownership over a week",
+                lambda: store.series(
+                    1, "selected_by_percent", middle, middle + 7 * 86400
+                ),
+            ),
+            ("price changes", lambda: store.changes("now_cost", start, end)),
+        ]
+        for name, query in queries:
+            t = time.perf_counter()
+            rows = len(query())
+            print(f"{name}: {(time.perf_counter() - t) * 1000:.1f} ms, {rows} rows")
+        t = time.perf_counter()
+        TrendStore(store.path)
+        print(f"reopen: {(time.perf_counter() - t) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,52 +1,70 @@
 import streamlit as st, pandas as pd
 import plotly.graph_objects as go
-import time
+import os, time
 from pprint import pprint
+from src import caching, metrics
 from src.querier import FPLQuerier
+from src.refresher import SnapshotRefresher
 from src.data import FPLData
 from src.visualiser import FPLVisualiser
 
 st.set_page_config(layout="wide")
+caching.use(caching.streamlit)
+if os.environ.get("FANTAPY_METRICS_PORT"):
+    metrics.enable()
+    metrics.serve(int(os.environ["FANTAPY_METRICS_PORT"]))
 
-if "last_refresh" not in st.session_state:
-    st.session_state["last_refresh"] = None
+if "fpl" not in st.session_state:
+    st.session_state["fpl"] = FPLData()
 
-fpl = FPLData()
-refresh = 0
+fpl = st.session_state["fpl"]
+refresher = SnapshotRefresher.shared()
 
 
+@metrics.timed("view", section="page")
 def main():
     # Initialize querier
     # TODO: Pick GW limit of data!
     # TODO: Pick your team and see how it performs
-    # TODO: Form should be a function of 2- GWs,
-    # add this to each player
     st.title("⚽️ FantaPy ⚽️")
     manager_id = st.text_input("Manager ID", "3177770")
     with st.sidebar:
         st.title("FantaPy!")
-        if st.session_state["last_refresh"] is None or (
-            (time.time() - st.session_state["last_refresh"]) > 3600 and refresh
-        ):
-            (
-                fpl.curr_gw,
-                fpl.data,
-                fpl.teams,
-                fpl.teams_by_name,
-                fpl.players,
-                fpl.players_by_name,
-            ) = FPLQuerier.run()
+        snapshot = refresher.current()
+        if snapshot is None:
+            st.write("Fetching data...")
+            time.sleep(1)
+            st.rerun()
+        # Pin one snapshot for the whole rerun, later ones apply on the next
+        if fpl.version != snapshot.version:
+            fpl.pin(snapshot)
             st.write("Data refreshed!")
         else:
             st.write("Using cached data")
-        if len(fpl.player_names) < 1:
-            fpl.player_names = sorted(list(fpl.players_by_name.keys()))
+        st.caption(
+            f"Snapshot v{snapshot.version},"
+            f" {int((time.time() - snapshot.built_at) / 60)} min old"
+        )
+        with st.expander("Next refreshes"):
+            for when, reason in refresher.planned():
+                st.write(
+                    f"{time.strftime('%a %d %b %H:%M', time.localtime(when))}: {reason}"
+                )
+        if st.button("Refresh now"):
+            refresher.refresh_now()
+        if metrics.enabled():
+            FPLVisualiser.metrics_panel()
         what_to_show = st.multiselect(
             "What to show?",
             [
                 "Top players",
                 "Player section",
                 "Team metrics",
+                "Squad optimiser",
+                "Transfer planner",
+                "Gameweek simulator",
+                "Mini-league",
+                "Live gameweek",
             ],
             ["Top players", "Player section", "Team metrics"],
         )
@@ -58,6 +76,16 @@ def main():
         FPLVisualiser.player_section(fpl)
     if "Team metrics" in what_to_show:
         FPLVisualiser.team_metrics(fpl)
+    if "Squad optimiser" in what_to_show:
+        FPLVisualiser.squad_optimiser(fpl)
+    if "Transfer planner" in what_to_show:
+        FPLVisualiser.transfer_planner(fpl)
+    if "Gameweek simulator" in what_to_show:
+        FPLVisualiser.gameweek_simulator(fpl)
+    if "Mini-league" in what_to_show:
+        FPLVisualiser.mini_league(fpl)
+    if "Live gameweek" in what_to_show:
+        FPLVisualiser.live_gameweek(fpl)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,140 @@
+import hashlib, os, sqlite3, threading, time
+
+
+class FPLCache:
+    """
+    Disk-backed response cache keyed by URL, evicted least recently used.
+    Hits are only noted in memory and written in one batch on the next write,
+    or every TOUCHES hits
+    """
+
+    TOUCHES = 256
+
+    DEFAULT_DIR = os.environ.get(
+        "FANTAPY_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "fantapy")
+    )
+
+    def __init__(self, path=None, max_bytes=256 * 1024 * 1024, max_age=3600):
+        self.path = path or os.path.join(FPLCache.DEFAULT_DIR, "responses.sqlite")
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._touched = {}
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                hash TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                immutable INTEGER NOT NULL DEFAULT 0
+            )
+            """)
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS responses_lru ON responses (accessed_at)"
+        )
+        self._db.commit()
+
+    def get(self, url: str):
+        """
+        Get the cached entry for url as a dict, None if missing
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT body, hash, fetched_at, etag, last_modified, immutable "
+                "FROM responses WHERE url = ?",
+                (url,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._touched[url] = time.time()
+            if len(self._touched) >= FPLCache.TOUCHES:
+                self._touch()
+                self._db.commit()
+        return {
+            "body": row[0],
+            "hash": row[1],
+            "fetched_at": row[2],
+            "etag": row[3],
+            "last_modified": row[4],
+            "immutable": bool(row[5]),
+        }
+
+    def is_fresh(self, entry, max_age=None):
+        max_age = self.max_age if max_age is None else max_age
+        return entry["immutable"] or time.time() - entry["fetched_at"] < max_age
+
+    def put(
+        self, url: str, body: bytes, etag=None, last_modified=None, immutable=False
+    ):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    url,
+                    body,
+                    hashlib.sha256(body).hexdigest(),
+                    len(body),
+                    now,
+                    now,
+                    etag,
+                    last_modified,
+                    int(immutable),
+                ),
+            )
+            self._touched.pop(url, None)
+            self._touch()
+            self._evict()
+            self._db.commit()
+
+    def revalidated(self, url: str, immutable=False):
+        """
+        Mark url as fetched now after the server confirmed it is unchanged
+        """
+        now = time.time()
+        with self._lock:
+            self._touched.pop(url, None)
+            self._touch()
+            self._db.execute(
+                "UPDATE responses SET fetched_at = ?, accessed_at = ?, "
+                "immutable = MAX(immutable, ?) WHERE url = ?",
+                (now, now, int(immutable), url),
+            )
+            self._db.commit()
+
+    def _touch(self):
+        """
+        Write the access times of the hits since the last write
+        """
+        if len(self._touched) > 0:
+            self._db.executemany(
+                "UPDATE responses SET accessed_at = ? WHERE url = ?",
+                [(accessed, url) for url, accessed in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def _evict(self):
+        total = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for url, size in self._db.execute(
+            "SELECT url, size FROM responses ORDER BY accessed_at"
+        ).fetchall():
+            self._db.execute("DELETE FROM responses WHERE url = ?", (url,))
+            if (total := total - size) <= self.max_bytes:
+                break
+
+    def clear(self):
+        with self._lock:
+            self._touched.clear()
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
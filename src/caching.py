@@ -0,0 +1,65 @@
+import functools, threading, time
+
+_backend = None
+
+
+def use(backend):
+    """
+    Install the caching backend used by functions decorated with cached,
+    a callable (fn, ttl) -> cached fn. None turns caching off
+    """
+    global _backend
+    _backend = backend
+
+
+def cached(ttl=None):
+    """
+    Cache a function through whichever backend is installed when it is
+    first called, so importing the core does not pull in a UI framework
+    """
+
+    def decorate(fn):
+        wrapped = {}
+
+        @functools.wraps(fn)
+        def call(*args, **kwargs):
+            backend = _backend
+            if backend is None:
+                return fn(*args, **kwargs)
+            if backend not in wrapped:
+                wrapped[backend] = backend(fn, ttl)
+            return wrapped[backend](*args, **kwargs)
+
+        return call
+
+    return decorate
+
+
+def memory(fn, ttl=None):
+    """
+    In-process backend keyed by the call arguments, for workers and scripts
+    """
+    entries, lock = {}, threading.Lock()
+
+    @functools.wraps(fn)
+    def call(*args, **kwargs):
+        key = (args, tuple(sorted(kwargs.items())))
+        with lock:
+            entry = entries.get(key)
+        if entry is not None and (ttl is None or time.time() - entry[0] < ttl):
+            return entry[1]
+        result = fn(*args, **kwargs)
+        with lock:
+            entries[key] = (time.time(), result)
+        return result
+
+    return call
+
+
+def streamlit(fn, ttl=None):
+    """
+    Streamlit's st.cache_data, imported only when this backend is installed
+    """
+    import streamlit as st
+
+    return st.cache_data(ttl=ttl)(fn)
@@ -0,0 +1,74 @@
+"""
+Build a snapshot of the FPL data without the dashboard and exit
+
+    python -m src.cli snapshot --out snapshot.pkl --csv top_players.csv
+"""
+
+import argparse, os, pickle, sys, time
+
+
+def snapshot(args):
+    if args.cache_dir is not None:
+        os.environ["FANTAPY_CACHE_DIR"] = args.cache_dir
+    from src import caching, metrics
+    from src.data import FPLData
+    from src.querier import FPLQuerier
+
+    caching.use(caching.memory)
+    metrics.enable(args.metrics is not None)
+    if args.api_url is not None:
+        FPLQuerier.configure(args.api_url)
+    t = time.perf_counter()
+    fpl = FPLData()
+    (
+        fpl.curr_gw,
+        fpl.data,
+        fpl.teams,
+        fpl.teams_by_name,
+        fpl.players,
+        fpl.players_by_name,
+        fpl.table,
+        fpl.fixtures,
+        fpl.history,
+    ) = FPLQuerier.run()
+    fpl.player_names = sorted(fpl.players_by_name.keys())
+    print(
+        f"GW{fpl.curr_gw}: {len(fpl.players)} players, {len(fpl.teams)} teams,"
+        f" snapshot {fpl.table.version} in {time.perf_counter() - t:.2f} s"
+    )
+    if args.out is not None:
+        with open(args.out + ".tmp", "wb") as f:
+            pickle.dump(fpl, f)
+        os.replace(args.out + ".tmp", args.out)
+    if args.csv is not None:
+        fpl.table.metrics.to_csv(args.csv)
+    if args.metrics is not None:
+        with open(args.metrics, "w") as f:
+            f.write(
+                metrics.to_json()
+                if args.metrics.endswith(".json")
+                else metrics.prometheus()
+            )
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="fantapy", description=__doc__.strip().splitlines()[0]
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("snapshot", help="fetch, parse and derive once")
+    build.add_argument("--out", help="pickle the snapshot to this path")
+    build.add_argument("--csv", help="write the top players table to this path")
+    build.add_argument("--cache-dir", help="response and history cache directory")
+    build.add_argument("--api-url", help="FPL API base URL, e.g. a local stand-in")
+    build.add_argument(
+        "--metrics", help="write stage timings, as JSON if the path ends in .json"
+    )
+    build.set_defaults(run=snapshot)
+    args = parser.parse_args(argv)
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,26 @@
+from typing import NamedTuple
+
+
+class FPLSnapshot(NamedTuple):
+    """
+    Immutable result of one refresh, shared by every session. Replaced as a
+    whole, never updated in place
+    """
+
+    curr_gw: int
+    data: dict
+    teams: dict
+    teams_by_name: dict
+    players: dict
+    players_by_name: dict
+    table: object
+    fixtures: object
+    history: object
+    version: int = 0
+    built_at: float = 0.0
+    summaries: object = None
+
+
 class FPLData:
     def __init__(self):
         self.players_by_name = (
@@ -6,3 +29,27 @@ class FPLData:
         self.curr_gw = 0
         self.player_names = []
         self.manager_team = []
+        self.table = self.fixtures = self.history = None
+        self.league = self.ownership = None
+        self.live = None
+        self.summaries = None
+        self.version = None
+
+    def pin(self, snapshot: FPLSnapshot):
+        """
+        Point this session at snapshot until it pins another one
+        """
+        (
+            self.curr_gw,
+            self.data,
+            self.teams,
+            self.teams_by_name,
+            self.players,
+            self.players_by_name,
+            self.table,
+            self.fixtures,
+            self.history,
+        ) = snapshot[:9]
+        self.version = snapshot.version
+        self.summaries = snapshot.summaries
+        self.player_names = sorted(list(self.players_by_name.keys()))
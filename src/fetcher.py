@@ -0,0 +1,190 @@
+import random, requests, threading, time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlsplit
+from src import metrics
+from src.schema import loads
+
+
+class RateLimiter:
+    """
+    Token bucket allowing rate requests per second after a burst of burst
+    """
+
+    def __init__(self, rate: float, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1, rate)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.burst, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait > 0:
+            time.sleep(wait)
+
+
+class FPLFetcher:
+    """
+    Shared keep-alive HTTP session with a bounded worker pool, optionally rate
+    limited per host. Throttled, failed and 5xx requests are retried with
+    exponential backoff
+    """
+
+    RETRY_STATUS = (429, 500, 502, 503, 504)
+
+    def __init__(
+        self,
+        workers=8,
+        pool_size=16,
+        timeout=10,
+        per_host=8,
+        cache=None,
+        rate=None,
+        burst=None,
+        retries=3,
+        backoff=0.5,
+    ):
+        self.workers = workers
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.per_host = per_host
+        self.cache = cache
+        self.rate = rate
+        self.burst = burst
+        self.retries = retries
+        self.backoff = backoff
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="fpl-fetch"
+        )
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _host_slots(self, url: str):
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._hosts:
+                limiter = RateLimiter(self.rate, self.burst) if self.rate else None
+                self._hosts[host] = (threading.BoundedSemaphore(self.per_host), limiter)
+            return self._hosts[host]
+
+    def _request(self, url: str, headers=None):
+        """
+        GET url, retrying connection errors and retryable statuses. The wait
+        doubles on each attempt, or follows Retry-After when the host sends it
+        """
+        slots, limiter = self._host_slots(url)
+        for attempt in range(self.retries + 1):
+            if limiter is not None:
+                limiter.acquire()
+            try:
+                with slots:
+                    response = self.session.get(
+                        url, timeout=self.timeout, headers=headers
+                    )
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.retries:
+                    raise
+                response = None
+            if response is not None and (
+                response.status_code not in FPLFetcher.RETRY_STATUS
+                or attempt == self.retries
+            ):
+                return response
+            metrics.count("fetch_retries", endpoint=metrics.endpoint(url))
+            wait = self.backoff * 2**attempt * (1 + random.random() / 2)
+            if response is not None and "Retry-After" in response.headers:
+                try:
+                    wait = float(response.headers["Retry-After"])
+                except ValueError:
+                    pass
+            time.sleep(wait)
+
+    def get(self, url: str, immutable=False, max_age=None):
+        """
+        Fetch a single url and decode its JSON body, going through the cache
+        if one is set. Immutable responses are never fetched again once cached
+        """
+        name = metrics.endpoint(url)
+        with metrics.span("fetch", {"url": url}, endpoint=name) as span:
+            body, outcome = self._body(url, immutable, max_age)
+            span.set(cache=outcome)
+            span.note(bytes=len(body))
+        metrics.count("fetch_bytes", len(body), endpoint=name)
+        with metrics.span("decode", endpoint=name):
+            return loads(body)
+
+    def poll(self, url: str):
+        """
+        Fetch url again and decode it only if it changed since the last
+        fetch: a 304 from the server, or the same body, gives None
+        """
+        name = metrics.endpoint(url)
+        entry = self.cache.get(url) if self.cache is not None else None
+        with metrics.span("fetch", {"url": url}, endpoint=name) as span:
+            body, outcome = self._body(url, max_age=0)
+            span.set(cache=outcome)
+            span.note(bytes=len(body) if outcome != "revalidated" else 0)
+        if outcome == "revalidated" or (entry is not None and entry["body"] == body):
+            return None
+        metrics.count("fetch_bytes", len(body), endpoint=name)
+        with metrics.span("decode", endpoint=name):
+            return loads(body)
+
+    def _body(self, url: str, immutable=False, max_age=None):
+        """
+        returns: the body of url, and whether it was a cache "hit", "miss",
+            "revalidated" with the server or "uncached"
+        """
+        if self.cache is None:
+            return self._request(url).content, "uncached"
+        entry = self.cache.get(url)
+        if entry is not None and self.cache.is_fresh(entry, max_age):
+            return entry["body"], "hit"
+        headers = {}
+        if entry is not None and entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry is not None and entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        response = self._request(url, headers)
+        if response.status_code == 304 and entry is not None:
+            self.cache.revalidated(url, immutable)
+            return entry["body"], "revalidated"
+        if response.status_code == 200:
+            self.cache.put(
+                url,
+                response.content,
+                response.headers.get("ETag"),
+                response.headers.get("Last-Modified"),
+                immutable,
+            )
+        return response.content, "miss"
+
+    def map(self, urls, immutable=(), max_age=None, skip_errors=False):
+        """
+        Fetch urls concurrently, yielding (url, data) as each response arrives.
+        With skip_errors, urls that still fail after retries yield None
+        """
+        futures = {
+            self.executor.submit(self.get, url, url in immutable, max_age): url
+            for url in urls
+        }
+        for future in as_completed(futures):
+            try:
+                data = future.result()
+            except (requests.RequestException, ValueError):
+                if not skip_errors:
+                    raise
+                data = None
+            yield futures[future], data
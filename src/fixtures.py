@@ -0,0 +1,166 @@
+from datetime import datetime
+import hashlib
+import numpy as np
+
+
+class FixtureMatrix:
+    """
+    Teams x gameweeks fixture difficulty, built once from the fixtures payload.
+    A blank GW has no fixtures for a team, a double GW has two
+    """
+
+    GWS = 38
+    WEIGHTS = [5, 3, 2, 1, 1]
+
+    def __init__(self, teams: dict, fixtures: list):
+        self.team_ids = np.array(sorted(teams), dtype=np.int16)
+        self.rows = {int(tid): row for row, tid in enumerate(self.team_ids)}
+        self.strength = np.array(
+            [teams[tid]["strength"] for tid in self.team_ids], dtype=np.int16
+        )
+        # Raw FPL strengths (around 1000-1400), at home then away
+        self.attack, self.defence = (
+            1000
+            + np.array(
+                [
+                    [
+                        teams[tid][f"strength_{kind}_{where}"]
+                        for where in ("home", "away")
+                    ]
+                    for tid in self.team_ids
+                ],
+                dtype=np.float64,
+            ).reshape(-1, 2)
+            for kind in ("attack", "defence")
+        )
+        shape = (len(self.team_ids), FixtureMatrix.GWS)
+        self.count = np.zeros(shape, dtype=np.int16)
+        self.home = np.zeros(shape, dtype=np.int16)
+        self.pending = np.zeros(shape, dtype=np.int16)
+        self.difficulty = np.zeros(shape, dtype=np.int16)
+        self.pending_difficulty = np.zeros(shape, dtype=np.int16)
+        fixtures = [
+            f
+            for f in fixtures
+            if f.get("event", None) is not None
+            and f.get("team_h", None) in self.rows
+            and f.get("team_a", None) in self.rows
+        ]
+        team_h = np.array([self.rows[f["team_h"]] for f in fixtures], dtype=np.intp)
+        team_a = np.array([self.rows[f["team_a"]] for f in fixtures], dtype=np.intp)
+        gw = np.array([f["event"] - 1 for f in fixtures], dtype=np.intp)
+        pending = np.array(
+            [not (f["finished"] is True or f["started"] is True) for f in fixtures],
+            dtype=np.int16,
+        )
+        # Per fixture: id, GW, home and away rows, kickoff (epoch seconds, NaN
+        # if unset), whether it is still to be played and whether it finished
+        self.ids = np.array([f.get("id", 0) for f in fixtures], dtype=np.int64)
+        self.events = gw + 1
+        self.home_rows = team_h
+        self.away_rows = team_a
+        self.unplayed = pending.astype(bool)
+        self.kickoffs = np.array(
+            [FixtureMatrix.epoch(f.get("kickoff_time")) for f in fixtures],
+            dtype=np.float64,
+        )
+        self.finished = np.array(
+            [
+                f.get("finished", False) is True
+                or f.get("finished_provisional", False) is True
+                for f in fixtures
+            ],
+            dtype=bool,
+        )
+        for team, opponent, home in ((team_h, team_a, 1), (team_a, team_h, 0)):
+            np.add.at(self.count, (team, gw), 1)
+            np.add.at(self.home, (team, gw), home)
+            np.add.at(self.difficulty, (team, gw), self.strength[opponent])
+            np.add.at(self.pending, (team, gw), pending)
+            np.add.at(
+                self.pending_difficulty, (team, gw), self.strength[opponent] * pending
+            )
+        digest = hashlib.sha1()
+        for array in (self.team_ids, gw, team_h, team_a, pending):
+            digest.update(array.tobytes())
+        for array in (self.strength, self.attack, self.defence):
+            digest.update(array.tobytes())
+        self.version = digest.hexdigest()[:16]
+
+    @staticmethod
+    def epoch(timestamp):
+        """
+        Seconds since the epoch of an API timestamp, NaN for None
+        """
+        if timestamp is None:
+            return np.nan
+        return datetime.fromisoformat(timestamp.replace("Z", "+00:00")).timestamp()
+
+    def _rows(self, team):
+        if np.ndim(team) == 0:
+            return self.rows[int(team)]
+        return np.array([self.rows[int(t)] for t in team], dtype=np.intp)
+
+    def next_fixtures(self, team, count=5):
+        """
+        Next count unplayed fixtures of team (an id), by GW then kickoff
+        returns: (GW, opponent id, whether team is at home) per fixture
+        """
+        row = self.rows[int(team)]
+        home = self.home_rows == row
+        fixtures = np.flatnonzero(self.unplayed & (home | (self.away_rows == row)))
+        fixtures = fixtures[
+            np.lexsort((self.kickoffs[fixtures], self.events[fixtures]))
+        ][:count]
+        opponents = np.where(
+            home[fixtures], self.away_rows[fixtures], self.home_rows[fixtures]
+        )
+        return [
+            (int(gw), int(self.team_ids[opponent]), bool(at_home))
+            for gw, opponent, at_home in zip(
+                self.events[fixtures], opponents, home[fixtures]
+            )
+        ]
+
+    def upcoming(self, team=None):
+        """
+        Mean difficulty of the unplayed fixtures per team and GW, NaN if none
+        """
+        rows = slice(None) if team is None else self._rows(team)
+        pending = self.pending[rows]
+        return np.divide(
+            self.pending_difficulty[rows],
+            pending,
+            out=np.full(pending.shape, np.nan),
+            where=pending > 0,
+        )
+
+    def fixture_scores(self):
+        """
+        Weighted difficulty of the next five GWs each team has a fixture in
+        """
+        upcoming = self.upcoming()
+        has_fixture = ~np.isnan(upcoming)
+        rank = np.cumsum(has_fixture, axis=1) * has_fixture
+        weights = np.zeros(FixtureMatrix.GWS + 1)
+        weights[1 : len(FixtureMatrix.WEIGHTS) + 1] = FixtureMatrix.WEIGHTS
+        score = (weights[rank] * np.nan_to_num(upcoming)).sum(axis=1)
+        return np.round(5 * score / (25 + 15.0 + 5 + 8), 2)
+
+    def matchups(self):
+        """
+        Overlapping fixture difficulty for every pair of teams
+        returns: overlapping (teams x teams x 6), score (teams x teams)
+        """
+        per_gw = np.divide(
+            self.difficulty,
+            self.count,
+            out=np.zeros(self.count.shape),
+            where=self.count > 0,
+        )
+        per_gw = np.rint(per_gw).astype(np.intp)
+        both = (self.count[:, None, :] > 0) & (self.count[None, :, :] > 0)
+        easiest = np.minimum(per_gw[:, None, :], per_gw[None, :, :])
+        overlapping = (np.eye(6, dtype=np.int16)[easiest] * both[..., None]).sum(axis=2)
+        score = overlapping @ np.arange(6)
+        return overlapping, score
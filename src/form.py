@@ -0,0 +1,88 @@
+from collections import OrderedDict
+import threading
+import numpy as np, pandas as pd
+from src import metrics
+from src.history import HistoryTensor
+from src.snapshot import PlayerTable
+
+
+class FormEngine:
+    """
+    Rolling form over the last N gameweeks for every player at once, read
+    from the history tensor. Results are cached per (snapshot, window, decay)
+    """
+
+    FIELDS = {
+        "points": "total_points",
+        "xgi": "expected_goal_involvements",
+        "minutes": "minutes",
+        "bonus": "bonus",
+    }
+    CACHE_SIZE = 32
+    _cache = OrderedDict()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def last_gw(history: HistoryTensor):
+        """
+        Last GW any player has data for, 0 before the season starts
+        """
+        played = np.flatnonzero(np.asarray(history.mask).any(axis=0))
+        return int(played[-1]) + 1 if len(played) > 0 else 0
+
+    @staticmethod
+    def weights(window: int, decay=None):
+        """
+        Weight of each GW in the window, oldest first. With decay the most
+        recent GW weighs 1, the one before decay, then decay ** 2, ...
+        """
+        if decay is None:
+            return np.ones(window)
+        return decay ** np.arange(window - 1, -1, -1, dtype=np.float64)
+
+    @staticmethod
+    @metrics.timed("stage", stage="form_window")
+    def window(history: HistoryTensor, table: PlayerTable, window: int, decay=None):
+        """
+        Windowed totals and per-GW averages over the last window GWs
+        returns: DataFrame indexed by player id
+        """
+        key = (history.version, table.version, window, decay)
+        with FormEngine._lock:
+            if key in FormEngine._cache:
+                FormEngine._cache.move_to_end(key)
+                return FormEngine._cache[key]
+        last = FormEngine.last_gw(history)
+        first = max(last - window, 0)
+        weights = FormEngine.weights(window, decay)[window - (last - first) :]
+        fields = [history.fields[f] for f in FormEngine.FIELDS.values()]
+        values = history.values[:, first:last][..., fields]
+        played = np.asarray(history.mask[:, first:last], dtype=np.float64)
+        totals = np.einsum("pgf,g->pf", values, weights)
+        games = played @ weights
+        averages = np.divide(
+            totals, games[:, None], out=np.zeros_like(totals), where=games[:, None] > 0
+        )
+        form = pd.DataFrame(
+            {
+                **{k: totals[:, i] for i, k in enumerate(FormEngine.FIELDS)},
+                **{
+                    f"{k}_per_game": averages[:, i]
+                    for i, k in enumerate(FormEngine.FIELDS)
+                },
+                "games": games,
+            },
+            index=pd.Index(history.ids, name="id"),
+        )
+        cost = table.players["now_cost"].reindex(form.index).to_numpy() / 10.0
+        form["points_per_cost"] = np.divide(
+            form["points_per_game"].to_numpy(),
+            cost,
+            out=np.zeros(len(form)),
+            where=cost > 0,
+        )
+        with FormEngine._lock:
+            FormEngine._cache[key] = form
+            if len(FormEngine._cache) > FormEngine.CACHE_SIZE:
+                FormEngine._cache.popitem(last=False)
+        return form
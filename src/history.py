@@ -0,0 +1,207 @@
+import glob, hashlib, json, os, tempfile, time, weakref
+import numpy as np, pandas as pd
+from src import metrics
+
+
+class HistoryTensor:
+    """
+    Dense players x gameweeks x stat fields history, memory-mapped from a file
+    per season so that several processes on a host share the same pages.
+    Missing GWs are zero with mask False
+    """
+
+    FIELDS = [
+        "minutes",
+        "goals_scored",
+        "assists",
+        "clean_sheets",
+        "goals_conceded",
+        "own_goals",
+        "penalties_saved",
+        "penalties_missed",
+        "yellow_cards",
+        "red_cards",
+        "saves",
+        "bonus",
+        "bps",
+        "starts",
+        "total_points",
+        "influence",
+        "creativity",
+        "threat",
+        "ict_index",
+        "expected_goals",
+        "expected_assists",
+        "expected_goal_involvements",
+        "expected_goals_conceded",
+    ]
+    GWS = 38
+    # Versions unused for less than this are never pruned, since other
+    # processes may still open them from a pickled snapshot
+    GRACE = 3600
+    # Tensors open in this process, whose versions prune leaves alone
+    _open = weakref.WeakSet()
+
+    def __init__(self, path: str, meta=None):
+        self.path = path
+        if meta is None:
+            with open(path) as f:
+                meta = json.load(f)
+        self.meta = meta
+        base = os.path.join(os.path.dirname(path), meta["file"])
+        self.season = meta["season"]
+        self.version = meta["version"]
+        self.fields = {name: i for i, name in enumerate(meta["fields"])}
+        self.ids = np.array(meta["ids"], dtype=np.int32)
+        self.rows = {int(pid): row for row, pid in enumerate(self.ids)}
+        self.values = np.load(base + ".npy", mmap_mode="r")
+        self.mask = np.load(base + ".mask.npy", mmap_mode="r")
+        HistoryTensor._open.add(self)
+        try:
+            # The mask's mtime is when the version was last opened
+            os.utime(base + ".mask.npy")
+        except OSError:
+            pass
+
+    def __getstate__(self):
+        # Pickle the location only, so caches do not copy the arrays
+        return {"path": self.path, "meta": self.meta}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"], state["meta"])
+
+    @staticmethod
+    def season_of(data):
+        events = data.get("events", [])
+        return events[0]["deadline_time"][:4] if len(events) > 0 else "season"
+
+    @staticmethod
+    @metrics.timed("stage", stage="history")
+    def build(ids, live: dict, season: str, directory: str, previous=None, gws=0):
+        """
+        Write the history of players ids to directory from parsed live GWs
+        (gw -> field arrays, as FPLQuerier.parse_live returns) and open it
+        read-only, taking the first gws GWs from a previous tensor. The
+        season's meta file is replaced last, so readers never see a partially
+        written tensor
+        """
+        ids = list(ids)
+        shape = (len(ids), HistoryTensor.GWS, len(HistoryTensor.FIELDS))
+        values = np.zeros(shape, dtype=np.float64)
+        mask = np.zeros(shape[:2], dtype=bool)
+        index = pd.Index(ids)
+        if previous is not None and gws > 0:
+            rows = index.get_indexer(previous.ids)
+            kept = rows >= 0
+            fields = [previous.fields[k] for k in HistoryTensor.FIELDS]
+            values[rows[kept], :gws] = previous.values[kept, :gws][..., fields]
+            mask[rows[kept], :gws] = previous.mask[kept, :gws]
+        for gw, parsed in live.items():
+            rows = index.get_indexer(parsed["id"])
+            known = rows >= 0
+            values[rows[known], gw - 1] = np.stack(
+                [parsed[k][known] for k in HistoryTensor.FIELDS], axis=1
+            )
+            mask[rows[known], gw - 1] = True
+        digest = hashlib.sha1(values.tobytes())
+        digest.update(mask.tobytes())
+        digest.update(np.array(ids, dtype=np.int32).tobytes())
+        version = digest.hexdigest()[:16]
+        name = f"history-{season}-{version}"
+        base = os.path.join(directory, name)
+        os.makedirs(directory, exist_ok=True)
+        if not os.path.exists(base + ".mask.npy"):
+            for path, array in ((base + ".npy", values), (base + ".mask.npy", mask)):
+                HistoryTensor._write(path, lambda f: np.save(f, array))
+        meta = os.path.join(directory, f"history-{season}.json")
+        content = {
+            "season": season,
+            "version": version,
+            "file": name,
+            "fields": HistoryTensor.FIELDS,
+            "ids": [int(pid) for pid in ids],
+        }
+        HistoryTensor._write(meta, lambda f: f.write(json.dumps(content).encode()))
+        HistoryTensor.prune(directory, season, keep=name)
+        return HistoryTensor(meta)
+
+    @staticmethod
+    def _write(path: str, write):
+        """
+        Write path through a temporary file of its own in the same directory,
+        moved into place once complete, so concurrent builds never share one
+        """
+        directory, name = os.path.split(path)
+        f = tempfile.NamedTemporaryFile(
+            dir=directory, prefix=name + ".", suffix=".tmp", delete=False
+        )
+        try:
+            with f:
+                write(f)
+            os.replace(f.name, path)
+        except BaseException:
+            if os.path.exists(f.name):
+                os.remove(f.name)
+            raise
+
+    @staticmethod
+    def prune(directory: str, season: str, keep: str, versions=2, grace=None):
+        """
+        Remove a season's tensors beyond the newest versions, leaving alone
+        the ones open in this process and the ones opened less than grace
+        seconds ago (GRACE by default) in any other. Processes that still map
+        a removed one keep their pages until they close it
+        """
+        grace = HistoryTensor.GRACE if grace is None else grace
+        pinned = {tensor.meta["file"] for tensor in list(HistoryTensor._open)}
+        pinned.add(keep)
+        used = {}
+        for mask in glob.glob(os.path.join(directory, f"history-{season}-*.mask.npy")):
+            try:
+                used[mask] = os.path.getmtime(mask)
+            except FileNotFoundError:
+                pass
+        now = time.time()
+        for mask in sorted(used, key=used.get, reverse=True)[versions:]:
+            name = os.path.basename(mask)[: -len(".mask.npy")]
+            if name in pinned or now - used[mask] < grace:
+                continue
+            for path in (mask, mask[: -len(".mask.npy")] + ".npy"):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def series(self, field: str, pid=None):
+        """
+        Time series of field for one player, or players x GWs for all of them.
+        Both are views into the mapped file
+        """
+        values = self.values[..., self.fields[field]]
+        return values if pid is None else values[self.rows[pid]]
+
+    def games(self, gws: int):
+        """
+        GWs among the first gws each player has data for, got bonus in and
+        started, as the querier's per-player accumulators
+        returns: pid -> {"games_played", "games_w_bonus", "games_started"}
+        """
+        mask = self.mask[:, :gws]
+        bonus = (self.series("bonus")[:, :gws] > 0) & mask
+        starts = (self.series("starts")[:, :gws] > 0) & mask
+        return {
+            int(pid): {
+                "games_played": int(played),
+                "games_w_bonus": int(with_bonus),
+                "games_started": int(started),
+            }
+            for pid, played, with_bonus, started in zip(
+                self.ids, mask.sum(axis=1), bonus.sum(axis=1), starts.sum(axis=1)
+            )
+        }
+
+    def played(self, pid):
+        """
+        GWs (1-based) the player has data for
+        """
+        return np.flatnonzero(self.mask[self.rows[pid]]) + 1
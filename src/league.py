@@ -0,0 +1,50 @@
+import numpy as np, pandas as pd
+
+
+class LeagueTable:
+    """
+    Picks of every manager of a classic league for one GW, managers x pick
+    slots. Rows are filled as the managers' picks arrive, element 0 while
+    missing
+    """
+
+    SLOTS = 15
+
+    def __init__(self, league: dict, standings: list):
+        self.league = league
+        self.entries = np.array([r["entry"] for r in standings], dtype=np.int32)
+        self.rows = {int(entry): row for row, entry in enumerate(self.entries)}
+        self.managers = pd.DataFrame(
+            {
+                "Manager": [r.get("player_name", "") for r in standings],
+                "Team": [r.get("entry_name", "") for r in standings],
+                "Rank": np.array([r.get("rank", 0) for r in standings], np.int32),
+                "Total": np.array([r.get("total", 0) for r in standings], np.int32),
+                "GW": np.array([r.get("event_total", 0) for r in standings], np.int16),
+            },
+            index=pd.Index(self.entries, name="entry"),
+        )
+        shape = (len(self.entries), LeagueTable.SLOTS)
+        self.picks = np.zeros(shape, dtype=np.int32)
+        self.multipliers = np.zeros(shape, dtype=np.int8)
+        self.bank = np.zeros(len(self.entries), dtype=np.int16)
+        self.chips = np.full(len(self.entries), "", dtype=object)
+        self.loaded = np.zeros(len(self.entries), dtype=bool)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, entry: int, data):
+        """
+        Fill the row of entry from its picks payload, None if it failed
+        """
+        picks = (data or {}).get("picks", [])
+        if len(picks) < 1:
+            return
+        row = self.rows[int(entry)]
+        slots = np.array([p["position"] for p in picks], dtype=np.intp) - 1
+        self.picks[row, slots] = [p["element"] for p in picks]
+        self.multipliers[row, slots] = [p.get("multiplier", 1) for p in picks]
+        self.bank[row] = data.get("entry_history", {}).get("bank", 0)
+        self.chips[row] = data.get("active_chip") or ""
+        self.loaded[row] = True
@@ -0,0 +1,306 @@
+import threading, time
+import numpy as np, pandas as pd
+from scipy.sparse import csr_matrix, hstack
+from src import metrics
+from src.ownership import EffectiveOwnership
+from src.querier import FPLQuerier
+from src.schema import LIVE_FIELDS
+from src.snapshot import PlayerTable
+
+
+class LiveGameweek:
+    """
+    Live stats of every player in one GW, shared by all sessions. A poll
+    fetches only the GW's live payload, revalidated with its ETag so an
+    unchanged one costs a 304 and no parsing, and diffs it against the last
+    one. Provisional bonus and team tallies are recomputed for the changed
+    players and their fixtures only, and each row records the version it
+    last changed in, so consumers can ask for the rows changed since theirs
+    """
+
+    FIELDS = list(LIVE_FIELDS)
+    COLUMNS = {
+        "Points": "total_points",
+        "Minutes": "minutes",
+        "Goals": "goals_scored",
+        "Assists": "assists",
+        "BPS": "bps",
+        "Bonus": "bonus",
+    }
+    POLL_INTERVAL = 30
+    SHARED = 2
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, gw: int, table: PlayerTable):
+        self.gw = gw
+        self.url = FPLQuerier.FPL_GW_LIVE_URL.format(gw)
+        self.ids = table.players.index
+        self.names = table.players["name_with_team"].to_numpy(dtype=object)
+        self.team_ids = table.teams.index
+        self.team_names = table.teams["name"].to_numpy(dtype=object)
+        self.team = self.team_ids.get_indexer(table.players["team"].to_numpy())
+        self.fields = {name: i for i, name in enumerate(LiveGameweek.FIELDS)}
+        self.values = np.zeros((len(self.ids), len(self.fields)))
+        self.bonus = np.zeros(len(self.ids), dtype=np.int16)  # provisional
+        self.points = np.zeros(len(self.ids), dtype=np.int32)
+        self.changed = np.zeros(len(self.ids), dtype=np.int64)
+        self.team_points = np.zeros(len(self.team_ids), dtype=np.int32)
+        self.team_goals = np.zeros(len(self.team_ids), dtype=np.int32)
+        self.team_changed = np.zeros(len(self.team_ids), dtype=np.int64)
+        # Rows playing in each fixture, and fixtures of each row with the
+        # row's minutes, BPS and bonus in them, from explain
+        self.fixture_rows = {}
+        self.row_fixtures = {}
+        self.row_stats = {}
+        self.provisional = {}  # fixture -> {row: bonus}
+        self.version = 0
+        self.fetched = False
+        self.polled_at = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def shared(gw: int, table: PlayerTable):
+        """
+        The process-wide live GW for a snapshot's players, replaced when the
+        GW moves on. The last SHARED snapshots keep theirs, so sessions not
+        yet on the newest one do not evict it
+        """
+        key = (gw, table.version)
+        with LiveGameweek._shared_lock:
+            live = LiveGameweek._shared.get(key)
+            if live is None:
+                live = LiveGameweek(gw, table)
+                shared = list(LiveGameweek._shared.items()) + [(key, live)]
+                shared = [item for item in shared if item[0][0] == gw]
+                LiveGameweek._shared = dict(shared[-LiveGameweek.SHARED :])
+            return live
+
+    def poll(self, max_age=POLL_INTERVAL):
+        """
+        Fetch the live payload unless it was polled less than max_age seconds
+        ago, and apply it if it changed
+        returns: the current version
+        """
+        with self._lock:
+            if time.time() - self.polled_at < max_age:
+                return self.version
+            self.polled_at = time.time()
+            # The first fetch must not be skipped by a 304 on a cached body
+            if self.fetched:
+                data = FPLQuerier.fetcher().poll(self.url)
+            else:
+                data = FPLQuerier.fetcher().get(self.url, max_age=0)
+            self.fetched = True
+            if data is not None:
+                self._apply(data.get("elements", []))
+            return self.version
+
+    def apply(self, elements: list):
+        """
+        Apply the elements of a live payload
+        returns: the new version
+        """
+        with self._lock:
+            self._apply(elements)
+            return self.version
+
+    @metrics.timed("stage", stage="live_apply")
+    def _apply(self, elements: list):
+        parsed = FPLQuerier.parse_live({"elements": elements})
+        if parsed is None:
+            return
+        rows = self.ids.get_indexer(parsed["id"])
+        known = np.flatnonzero(rows >= 0)
+        rows = rows[known]
+        incoming = np.stack(
+            [parsed[k][known] for k in LiveGameweek.FIELDS], axis=1
+        ).astype(np.float64)
+        differs = (incoming != self.values[rows]).any(axis=1)
+        changed = rows[differs]
+        if len(changed) == 0:
+            return
+        self.version += 1
+        goals = self.fields["goals_scored"]
+        goals_before = self.values[changed, goals].copy()
+        self.values[changed] = incoming[differs]
+        fixtures = set()
+        for i, row in zip(known[differs], changed):
+            self.row_stats[row] = self.split(row, elements[i].get("explain", []))
+            playing = tuple(self.row_stats[row])
+            if playing != self.row_fixtures.get(row, ()):
+                for fixture in self.row_fixtures.get(row, ()):
+                    self.fixture_rows[fixture].discard(row)
+                for fixture in playing:
+                    self.fixture_rows.setdefault(fixture, set()).add(row)
+                fixtures.update(self.row_fixtures.get(row, ()))
+                self.row_fixtures[row] = playing
+            fixtures.update(playing)
+        affected = set(changed.tolist())
+        for fixture in fixtures:
+            affected.update(self.provisional.get(fixture, {}))
+            self.provisional[fixture] = self.bonus_points(fixture)
+            affected.update(self.provisional[fixture])
+        affected = np.fromiter(affected, dtype=np.intp, count=len(affected))
+        self.bonus[affected] = [
+            sum(self.provisional[f].get(row, 0) for f in self.row_fixtures.get(row, ()))
+            for row in affected
+        ]
+        points = (
+            self.values[affected, self.fields["total_points"]] + self.bonus[affected]
+        ).astype(np.int32)
+        delta = points - self.points[affected]
+        self.points[affected] = points
+        self.changed[changed] = self.version
+        self.changed[affected[delta != 0]] = self.version
+        np.add.at(self.team_points, self.team[affected], delta)
+        np.add.at(
+            self.team_goals,
+            self.team[changed],
+            (self.values[changed, goals] - goals_before).astype(np.int32),
+        )
+        moved = np.concatenate([self.team[affected[delta != 0]], self.team[changed]])
+        self.team_changed[moved] = self.version
+
+    def split(self, row: int, explain: list):
+        """
+        Minutes, BPS and bonus of a player in each of their fixtures. With
+        one fixture these are the GW's. In a double GW they are read from
+        each fixture's explain entries, BPS falling back to the GW's total
+        when the payload does not break it down
+        returns: fixture -> (minutes, bps, bonus)
+        """
+        columns = [self.fields[k] for k in ("minutes", "bps", "bonus")]
+        totals = tuple(self.values[row, columns])
+        if len(explain) == 1:
+            return {explain[0]["fixture"]: totals}
+        split = {}
+        for entry in explain:
+            stats = {x["identifier"]: x.get("value", 0) for x in entry["stats"]}
+            split[entry["fixture"]] = (
+                stats.get("minutes", 0),
+                stats.get("bps", totals[1]),
+                stats.get("bonus", 0),
+            )
+        return split
+
+    def bonus_points(self, fixture):
+        """
+        Provisional bonus of the players of a fixture by their BPS in it,
+        until its confirmed bonus shows up: 3, 2 and 1 to the top three,
+        ties sharing the higher award (two first get 3 each, the next 1)
+        returns: row -> bonus, for the players who get any
+        """
+        rows = np.fromiter(self.fixture_rows.get(fixture, ()), dtype=np.intp)
+        stats = np.array(
+            [self.row_stats[row][fixture] for row in rows], dtype=np.float64
+        ).reshape(len(rows), 3)
+        played = stats[:, 0] > 0
+        rows, stats = rows[played], stats[played]
+        if len(rows) == 0 or stats[:, 2].any():
+            return {}
+        bps = stats[:, 1]
+        rank = 1 + (bps[None, :] > bps[:, None]).sum(axis=1)
+        return {int(row): int(4 - r) for row, r in zip(rows, rank) if r <= 3}
+
+    def since(self, version: int):
+        """
+        Rows of the players and teams changed after version
+        returns: current version, players frame, teams frame, and the rows
+            and points of the changed players
+        """
+        with self._lock:
+            rows = np.flatnonzero(self.changed > version)
+            teams = np.flatnonzero(self.team_changed > version)
+            return (
+                self.version,
+                self.players(rows),
+                self.teams(teams),
+                rows,
+                self.points[rows].copy(),
+            )
+
+    def players(self, rows=None):
+        """
+        Live stats per player id, all players by default
+        """
+        rows = np.arange(len(self.ids)) if rows is None else rows
+        return pd.DataFrame(
+            {
+                "Name": self.names[rows],
+                "Live Points": self.points[rows],
+                **{
+                    name: self.values[rows, self.fields[field]].astype(np.int32)
+                    for name, field in LiveGameweek.COLUMNS.items()
+                },
+                "Provisional Bonus": self.bonus[rows],
+            },
+            index=self.ids[rows],
+        )
+
+    def teams(self, rows=None):
+        """
+        Live points and goals per team id, all teams by default
+        """
+        rows = np.arange(len(self.team_ids)) if rows is None else rows
+        return pd.DataFrame(
+            {
+                "Team": self.team_names[rows],
+                "Live Points": self.team_points[rows],
+                "Goals": self.team_goals[rows],
+            },
+            index=self.team_ids[rows],
+        )
+
+
+class LiveLeague:
+    """
+    One session's view of a live GW: the live points of a league's managers
+    and the player and team tables, brought up to date from the changed rows
+    only. Manager totals move by the points difference of the changed
+    players, through the columns of the managers x players pick matrix, so
+    only the managers owning them are touched
+    """
+
+    def __init__(self, live: LiveGameweek, ownership: EffectiveOwnership = None):
+        self.live = live
+        self.ownership = ownership
+        self.seen = 0
+        self.players = live.players()
+        self.teams = live.teams()
+        self.managers = None
+        if ownership is not None:
+            # Players missing from the ownership map to an empty last column
+            matrix = ownership.matrix()
+            matrix = hstack([matrix, csr_matrix((matrix.shape[0], 1))]).tocsc()
+            self.matrix = matrix[:, ownership.ids.get_indexer(live.ids)]
+            self.points = np.zeros(len(live.ids), dtype=np.int32)
+            league = ownership.league.managers
+            self.managers = league[["Manager", "Team"]].assign(
+                **{"Live GW": 0, "Live Total": league["Total"] - league["GW"]}
+            )
+            self.base = self.managers["Live Total"].to_numpy().copy()
+            self.totals = np.zeros(len(league), dtype=np.float64)
+
+    def update(self):
+        """
+        Merge the rows changed since the last update
+        returns: changed players, teams and managers frames
+        """
+        self.seen, players, teams, rows, points = self.live.since(self.seen)
+        self.players.loc[players.index] = players
+        self.teams.loc[teams.index] = teams
+        if self.managers is None:
+            return players, teams, None
+        delta = points - self.points[rows]
+        moved = delta != 0
+        columns = self.matrix[:, rows[moved]]
+        self.totals += columns @ delta[moved]
+        self.points[rows] = points
+        touched = np.unique(columns.indices[columns.data != 0])
+        live = np.rint(self.totals[touched]).astype(np.int32)
+        self.managers.iloc[
+            touched, self.managers.columns.get_indexer(["Live GW", "Live Total"])
+        ] = np.stack([live, self.base[touched] + live], axis=1)
+        return players, teams, self.managers.iloc[touched]
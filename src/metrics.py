@@ -0,0 +1,262 @@
+import bisect, collections, functools, json, os, re, threading, time
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+RECENT = 100
+PREFIX = "fantapy_"
+
+_enabled = os.environ.get("FANTAPY_METRICS", "") not in ("", "0")
+_lock = threading.Lock()
+_histograms = {}  # (name, labels) -> [bucket counts, sum, count, max]
+_counters = {}  # (name, labels) -> value
+_recent = collections.deque(maxlen=RECENT)
+_server = None
+
+
+def enable(on=True):
+    """
+    Turn recording on or off. Off, spans and timed functions cost a flag check
+    """
+    global _enabled
+    _enabled = on
+
+
+def enabled():
+    return _enabled
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+        _recent.clear()
+
+
+def observe(name: str, seconds: float, **labels):
+    """
+    Add one duration to the histogram name{labels}
+    """
+    if not _enabled:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = [[0] * (len(BUCKETS) + 1), 0.0, 0, 0.0]
+        histogram[0][bisect.bisect_left(BUCKETS, seconds)] += 1
+        histogram[1] += seconds
+        histogram[2] += 1
+        histogram[3] = max(histogram[3], seconds)
+
+
+def count(name: str, value=1, **labels):
+    """
+    Add value to the counter name{labels}
+    """
+    if not _enabled:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def endpoint(url: str):
+    """
+    url without its host and ids, to label fetches without one series per
+    manager or player
+    """
+    path = re.sub(r"^[a-z]+://[^/]+", "", url)
+    return re.sub(r"\d+", "{}", path)
+
+
+class Span:
+    """
+    Times a block into the histogram name{labels}. Labels known only at the
+    end, like a cache outcome, can be set inside the block
+    """
+
+    __slots__ = ("name", "labels", "start", "detail")
+
+    def __init__(self, name: str, labels: dict, detail=None):
+        self.name = name
+        self.labels = labels
+        self.detail = detail
+
+    def set(self, **labels):
+        self.labels.update(labels)
+
+    def note(self, **detail):
+        if self.detail is not None:
+            self.detail.update(detail)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        if exc[0] is not None:
+            self.labels["error"] = exc[0].__name__
+        observe(self.name, seconds, **self.labels)
+        if self.detail is not None:
+            _recent.append(
+                {"name": self.name, "seconds": seconds, **self.detail, **self.labels}
+            )
+        return False
+
+
+class _Off:
+    def set(self, **labels):
+        pass
+
+    def note(self, **detail):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_OFF = _Off()
+
+
+def span(name: str, detail=None, **labels):
+    """
+    Context manager timing a block. With a detail dict (e.g. the URL) the
+    span is also kept among the recent ones
+    """
+    if not _enabled:
+        return _OFF
+    return Span(name, labels, detail)
+
+
+def timed(name: str, **labels):
+    """
+    Decorator timing every call of a function as span name{labels}
+    """
+
+    def decorate(fn):
+        @functools.wraps(fn)
+        def call(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with Span(name, dict(labels)):
+                return fn(*args, **kwargs)
+
+        return call
+
+    return decorate
+
+
+def quantile(counts: list, total: int, q: float):
+    """
+    Upper bound of the bucket holding the q quantile
+    """
+    seen = 0
+    for bound, n in zip(BUCKETS + (float("inf"),), counts):
+        seen += n
+        if seen >= q * total:
+            return bound
+    return float("inf")
+
+
+def dump():
+    """
+    Histograms, counters and recent detailed spans as JSON-ready dicts
+    """
+    with _lock:
+        histograms = [
+            {
+                "name": name,
+                "labels": dict(labels),
+                "count": h[2],
+                "sum": h[1],
+                "max": h[3],
+                "p50": quantile(h[0], h[2], 0.5),
+                "p95": quantile(h[0], h[2], 0.95),
+                "buckets": dict(zip(map(str, BUCKETS + ("+Inf",)), h[0])),
+            }
+            for (name, labels), h in sorted(_histograms.items())
+        ]
+        counters = [
+            {"name": name, "labels": dict(labels), "value": value}
+            for (name, labels), value in sorted(_counters.items())
+        ]
+        recent = list(_recent)
+    return {"histograms": histograms, "counters": counters, "recent": recent}
+
+
+def to_json():
+    return json.dumps(dump(), default=str)
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus():
+    """
+    The histograms and counters in the Prometheus text format
+    """
+
+    def series(labels: dict, **extra):
+        pairs = {**labels, **extra}
+        if len(pairs) == 0:
+            return ""
+        return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in pairs.items()) + "}"
+
+    data, lines, typed = dump(), [], set()
+    for h in data["histograms"]:
+        name = f"{PREFIX}{h['name']}_seconds"
+        if name not in typed:
+            lines.append(f"# TYPE {name} histogram")
+            typed.add(name)
+        cumulative = 0
+        for bound, n in h["buckets"].items():
+            cumulative += n
+            lines.append(f"{name}_bucket{series(h['labels'], le=bound)} {cumulative}")
+        lines.append(f"{name}_sum{series(h['labels'])} {h['sum']}")
+        lines.append(f"{name}_count{series(h['labels'])} {h['count']}")
+    for c in data["counters"]:
+        name = f"{PREFIX}{c['name']}_total"
+        if name not in typed:
+            lines.append(f"# TYPE {name} counter")
+            typed.add(name)
+        lines.append(f"{name}{series(c['labels'])} {c['value']}")
+    return "\n".join(lines) + "\n"
+
+
+def serve(port: int, host="127.0.0.1"):
+    """
+    Expose /metrics (Prometheus text) and /metrics.json on a background
+    thread, once per process
+    """
+    global _server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                body, kind = prometheus(), "text/plain; version=0.0.4"
+            elif self.path == "/metrics.json":
+                body, kind = to_json(), "application/json"
+            else:
+                self.send_error(404)
+                return
+            body = body.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", kind)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    with _lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), Handler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, daemon=True).start()
+    return _server
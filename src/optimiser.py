@@ -0,0 +1,121 @@
+import numpy as np, pandas as pd
+from scipy.optimize import Bounds, LinearConstraint, milp
+from src.snapshot import POSITIONS, PlayerTable
+
+
+class SquadOptimiser:
+    """
+    Best 15-player squads under the budget, position quotas and club limit,
+    solved as an integer linear program with branch and bound (HiGHS)
+    """
+
+    BUDGET = 1000  # now_cost is in tenths of a million
+    QUOTAS = [2, 5, 5, 3]
+    PER_CLUB = 3
+
+    @staticmethod
+    def constraints(table: PlayerTable, budget: int):
+        players = table.players
+        cost = players["now_cost"].to_numpy(dtype=np.float64)
+        position = players["position"].to_numpy()
+        team = players["team"].to_numpy()
+        clubs = np.unique(team)
+        rows = [cost[None, :]]
+        lower, upper = [-np.inf], [budget]
+        rows.append((position[None, :] == np.arange(len(POSITIONS))[:, None]) * 1.0)
+        lower += SquadOptimiser.QUOTAS
+        upper += SquadOptimiser.QUOTAS
+        rows.append((team[None, :] == clubs[:, None]) * 1.0)
+        lower += [0] * len(clubs)
+        upper += [SquadOptimiser.PER_CLUB] * len(clubs)
+        return np.vstack(rows), np.array(lower), np.array(upper)
+
+    @staticmethod
+    def dominated(table: PlayerTable, values, locked, k=1):
+        """
+        Players that can be left out of the search. A player is dominated by
+        another of the same position that costs no more and scores no less,
+        exact ties going to the lower player id so that one of a tied group
+        is always kept. With dominators in enough distinct clubs one of them
+        can always be swapped in, whatever the rest of the squad, so the
+        player is not needed for any of the top k squads
+        """
+        players = table.players
+        cost = players["now_cost"].to_numpy()
+        position = players["position"].to_numpy()
+        team = players["team"].to_numpy()
+        ids = players.index.to_numpy()
+        clubs = (team[:, None] == np.unique(team)[None, :]).astype(np.int32)
+        dominated = np.zeros(len(players), dtype=bool)
+        full_clubs = sum(SquadOptimiser.QUOTAS) // SquadOptimiser.PER_CLUB
+        for pos, quota in enumerate(SquadOptimiser.QUOTAS):
+            rows = np.flatnonzero(position == pos)
+            c, v = cost[rows], values[rows]
+            dominators = (
+                (c[:, None] <= c[None, :])
+                & (v[:, None] >= v[None, :])
+                & (
+                    (c[:, None] < c[None, :])
+                    | (v[:, None] > v[None, :])
+                    | (ids[rows][:, None] < ids[rows][None, :])
+                )
+            )
+            np.fill_diagonal(dominators, False)
+            distinct = ((dominators.T.astype(np.int32) @ clubs[rows]) > 0).sum(axis=1)
+            dominated[rows] = distinct >= quota + full_clubs + k
+        dominated[np.isin(players.index.to_numpy(), list(locked))] = False
+        return dominated
+
+    @staticmethod
+    def solve(
+        table: PlayerTable,
+        scores: pd.Series,
+        budget=BUDGET,
+        locked=(),
+        excluded=(),
+        k=1,
+        time_limit=5.0,
+    ):
+        """
+        Top k squads maximising the sum of scores (a Series indexed by player
+        id). Each squad after the first is found by cutting off all previous
+        ones, so the squads are returned best first
+        returns: list of {"ids", "score", "cost"}
+        """
+        ids = table.players.index.to_numpy()
+        values = scores.reindex(ids).fillna(0).to_numpy(dtype=np.float64, copy=True)
+        values[np.isin(ids, list(excluded))] = -np.inf
+        keep = ~SquadOptimiser.dominated(table, values, locked, k)
+        keep &= np.isfinite(values)
+        table = PlayerTable(table.players[keep], table.teams)
+        ids, values = ids[keep], values[keep]
+        A, lower, upper = SquadOptimiser.constraints(table, budget)
+        lb, ub = np.zeros(len(ids)), np.ones(len(ids))
+        lb[np.isin(ids, list(locked))] = 1
+        size = sum(SquadOptimiser.QUOTAS)
+        squads, cuts = [], []
+        for _ in range(k):
+            constraints = [LinearConstraint(A, lower, upper)]
+            if len(cuts) > 0:
+                constraints.append(LinearConstraint(np.vstack(cuts), -np.inf, size - 1))
+            result = milp(
+                -values,
+                constraints=constraints,
+                integrality=np.ones(len(ids)),
+                bounds=Bounds(lb, ub),
+                options={"time_limit": time_limit},
+            )
+            if result.x is None or result.status not in (0, 1):
+                break
+            chosen = np.flatnonzero(result.x > 0.5)
+            squads.append(
+                {
+                    "ids": ids[chosen].tolist(),
+                    "score": float(values[chosen].sum()),
+                    "cost": int(table.players["now_cost"].to_numpy()[chosen].sum()),
+                }
+            )
+            cut = np.zeros(len(ids))
+            cut[chosen] = 1
+            cuts.append(cut)
+        return squads
@@ -0,0 +1,94 @@
+import numpy as np, pandas as pd
+from scipy.sparse import csr_matrix
+from src.league import LeagueTable
+
+
+class EffectiveOwnership:
+    """
+    Ownership, captaincy and effective ownership of every player across a
+    league, from a sparse managers x players matrix of pick multipliers. The
+    multipliers already carry triple captain (3) and bench boost (bench at 1).
+    Totals are kept as sums so a manager's new picks update them in place
+    """
+
+    def __init__(self, league: LeagueTable, ids):
+        self.league = league
+        self.ids = pd.Index(ids)
+        self.build()
+
+    def columns(self, picks: np.ndarray):
+        return self.ids.get_indexer(picks.ravel()).reshape(picks.shape)
+
+    def matrix(self):
+        """
+        Managers x players pick multipliers, bench picks stored as explicit
+        zeros so the sparsity pattern is the ownership
+        """
+        columns = self.columns(self.league.picks)
+        rows, slots = np.nonzero(columns >= 0)
+        return csr_matrix(
+            (
+                self.league.multipliers[rows, slots].astype(np.float64),
+                (rows, columns[rows, slots]),
+            ),
+            shape=(len(self.league), len(self.ids)),
+        )
+
+    def build(self):
+        multipliers = self.matrix()
+        picked = multipliers.copy()
+        picked.data = np.ones_like(picked.data)
+        captained = multipliers.copy()
+        captained.data = (captained.data >= 2).astype(np.float64)
+        managers = np.ones(len(self.league))
+        self.owners = picked.T @ managers
+        self.captains = captained.T @ managers
+        self.effective = multipliers.T @ managers
+        self.managers = int(self.league.loaded.sum())
+        self.version = 0
+
+    def _apply(self, row: int, sign: int):
+        columns = self.columns(self.league.picks[row])
+        known = columns >= 0
+        multipliers = self.league.multipliers[row][known]
+        np.add.at(self.owners, columns[known], sign)
+        np.add.at(self.captains, columns[known], sign * (multipliers >= 2))
+        np.add.at(self.effective, columns[known], sign * multipliers)
+        self.managers += sign * int(self.league.loaded[row])
+
+    def update(self, entry: int, data):
+        """
+        Replace the picks of one manager, adjusting the totals by the
+        difference only
+        """
+        row = self.league.rows[int(entry)]
+        before = self.league.picks[row].copy(), self.league.multipliers[row].copy()
+        self._apply(row, -1)
+        self.league.add(entry, data)
+        self._apply(row, 1)
+        after = self.league.picks[row], self.league.multipliers[row]
+        if not all(np.array_equal(b, a) for b, a in zip(before, after)):
+            self.version += 1
+
+    def frame(self, mine=None, points=None):
+        """
+        Percentages per player id. Rank risk is the points per game the
+        league gains on a manager through each player this GW, given the
+        manager's multipliers (mine, player id -> multiplier)
+        """
+        managers = max(self.managers, 1)
+        effective = self.effective / managers
+        own = np.zeros(len(self.ids))
+        if mine is not None:
+            columns = self.ids.get_indexer(list(mine.keys()))
+            own[columns[columns >= 0]] = np.array(list(mine.values()))[columns >= 0]
+        points = np.zeros(len(self.ids)) if points is None else points
+        return pd.DataFrame(
+            {
+                "League Own %": np.round(100 * self.owners / managers, 1),
+                "League Capt %": np.round(100 * self.captains / managers, 1),
+                "League EO %": np.round(100 * effective, 1),
+                "Rank Risk": np.round(points * (effective - own), 2),
+            },
+            index=self.ids,
+        )
@@ -0,0 +1,345 @@
+import itertools, time
+import numpy as np
+from src.fixtures import FixtureMatrix
+from src.optimiser import SquadOptimiser
+from src.projection import ProjectionEngine
+from src.snapshot import PlayerTable
+
+
+class TransferPlanner:
+    """
+    Best transfer sequence over the next gameweeks, by depth-first search over
+    (squad, GW, free transfers) with memoised subproblems. The bank follows
+    from the squad, so move orders reaching the same squad share an entry.
+    Moves at each node are tried best bound first and cut off once their
+    upper bound cannot beat the best move found, so every stored value is
+    exact. Incoming players are limited to the pool best per position, so a
+    plan is only the best among those
+    """
+
+    HIT = 4
+    MAX_FREE = 5
+
+    @staticmethod
+    def projections(table: PlayerTable, fixtures: FixtureMatrix, first_gw, horizon):
+        """
+        Projected points per player and GW from the shared projection of the
+        snapshot. Blank GWs project 0
+        returns: players x GWs, in the order of table.players
+        """
+        return ProjectionEngine.upcoming(table, fixtures, first_gw, horizon)
+
+    def __init__(
+        self, table: PlayerTable, points: np.ndarray, squad, pool=4, max_transfers=1
+    ):
+        """
+        Plan over the squad and the pool best other players per position by
+        projected points (as returned by projections). Players outside the
+        pool are never bought: a larger pool finds more plans, but the moves
+        at each node grow with its square when making two transfers
+        """
+        if max_transfers not in (0, 1, 2):
+            raise ValueError("max_transfers must be 0, 1 or 2")
+        rows = {int(pid): row for row, pid in enumerate(table.players.index)}
+        squad = np.array([rows[int(pid)] for pid in squad], dtype=np.intp)
+        position = table.players["position"].to_numpy()
+        total = points.sum(axis=1)
+        outside = np.setdiff1d(np.arange(len(position)), squad)
+        candidates = []
+        for pos in range(len(SquadOptimiser.QUOTAS)):
+            players = outside[position[outside] == pos]
+            candidates.append(
+                players[np.argsort(-total[players], kind="stable")][:pool]
+            )
+        # Sorted by position, so every sorted squad is 2 GK, 5 DEF, 5 MID, 3 FWD
+        members = np.concatenate([squad, *candidates])
+        members = members[np.lexsort((members, position[members]))]
+        self.ids = table.players.index.to_numpy()[members]
+        self.position = position[members]
+        self.cost = table.players["now_cost"].to_numpy()[members].astype(np.int64)
+        self.team = table.players["team"].to_numpy()[members].astype(np.intp)
+        self.points = points[members]
+        self.squad = tuple(int(i) for i in np.flatnonzero(np.isin(members, squad)))
+        self.max_transfers = max_transfers
+        self.horizon = points.shape[1]
+        self.swaps()
+        self.memo = {}
+        self.nodes = self.lookups = self.cache_hits = 0
+
+    def swaps(self):
+        """
+        Every transfer between the players of the pool, as out and in
+        players, squad mask changes and price changes, once. Pairs of
+        transfers changing the same players are kept once, and only if
+        max_transfers allows them. Also the spreads of new players over the
+        positions that refine tries
+        """
+        outs, ins = np.nonzero(self.position[:, None] == self.position[None, :])
+        keep = outs != ins
+        outs, ins = outs[keep], ins[keep]
+        flip = np.zeros((len(outs), len(self.ids)), dtype=bool)
+        flip[np.arange(len(outs)), outs] = flip[np.arange(len(outs)), ins] = True
+        self.outs, self.ins, self.flip = outs, ins, flip
+        self.spend = self.cost[ins] - self.cost[outs]
+        a, b = np.triu_indices(len(outs) if self.max_transfers >= 2 else 0, k=1)
+        # A swap of two players for two others of their position pairs them
+        # up twice, kept where both sides are in the same order
+        valid = (
+            (outs[a] != outs[b])
+            & (ins[a] != ins[b])
+            & (outs[a] != ins[b])
+            & (ins[a] != outs[b])
+            & (
+                (self.position[outs[a]] != self.position[outs[b]])
+                | ((outs[a] < outs[b]) == (ins[a] < ins[b]))
+            )
+        )
+        a, b = a[valid], b[valid]
+        self.pairs = (a, b)
+        self.pair_flip = flip[a] | flip[b]
+        self.pair_spend = self.spend[a] + self.spend[b]
+        # Change to the club count of each incoming player's club
+        team_o1, team_i1 = self.team[outs[a]], self.team[ins[a]]
+        team_o2, team_i2 = self.team[outs[b]], self.team[ins[b]]
+        self.pair_clubs = (
+            1
+            + (team_i2 == team_i1).astype(np.int64)
+            - (team_o1 == team_i1)
+            - (team_o2 == team_i1),
+            1
+            + (team_i1 == team_i2).astype(np.int64)
+            - (team_o1 == team_i2)
+            - (team_o2 == team_i2),
+        )
+        # New players per position of each way to spread the transfers of
+        # the horizon, at most the quota and the other players of the pool
+        limits = [
+            min(quota, int((self.position == pos).sum()) - quota)
+            for pos, quota in enumerate(SquadOptimiser.QUOTAS)
+        ]
+        self.spreads = np.array(
+            [
+                spread
+                for spread in itertools.product(*(range(n + 1) for n in limits))
+                if sum(spread) <= self.max_transfers * self.horizon
+            ]
+        )
+
+    @staticmethod
+    def lineup(points: np.ndarray):
+        """
+        Score of the best XI (1 GK, 3+ DEF, 2+ MID, 1+ FWD) with the captain
+        doubled, for squads sorted by position along the last axis
+        """
+        gk = points[..., 0:2].max(axis=-1)
+        defs = np.sort(points[..., 2:7], axis=-1)
+        mids = np.sort(points[..., 7:12], axis=-1)
+        fwds = np.sort(points[..., 12:15], axis=-1)
+        base = defs[..., -3:].sum(-1) + mids[..., -2:].sum(-1) + fwds[..., -1]
+        rest = np.concatenate([defs[..., :-3], mids[..., :-2], fwds[..., :-1]], -1)
+        rest = np.sort(rest, axis=-1)[..., -4:].sum(-1)
+        return gk + base + rest + points.max(axis=-1)
+
+    def bound(self, squads: np.ndarray, gw: int, free=None):
+        """
+        Upper bound on the lineup scores of squads from GW gw to the horizon,
+        less hits. With k transfers in all, by GW j at most
+        min(max_transfers * (j - gw + 1), k) players are new, so the best GKs
+        and outfield players of the pool may join for free and the formation
+        limits are dropped. Given the free transfers of each squad at gw (one
+        more each GW after), transfers beyond them cost a hit. The best k wins
+        """
+        most = self.max_transfers * (self.horizon - gw)
+        totals = np.zeros((len(squads), most + 1))
+        members = np.zeros((len(squads), len(self.ids)), dtype=bool)
+        members[np.arange(len(squads))[:, None], squads] = True
+        gk = self.position == 0
+        for j in range(gw, self.horizon):
+            allowed = self.max_transfers * (j - gw + 1)
+            points = self.points[squads, j]
+            # Best players outside each squad, GKs and outfield apart
+            others = np.where(members, -np.inf, self.points[:, j])
+            top_gk = others[:, gk].max(axis=1)
+            joining = -np.sort(-others[:, ~gk], axis=1)[:, :allowed]
+            for new in range(min(allowed, most) + 1):
+                best_gk = points[:, :2].max(axis=1)
+                if new > 0:
+                    best_gk = np.maximum(best_gk, top_gk)
+                outfield = np.sort(
+                    np.concatenate([points[:, 2:], joining[:, :new]], 1), axis=1
+                )
+                outfield = outfield[:, -10:]
+                score = (
+                    best_gk
+                    + outfield.sum(axis=1)
+                    + np.maximum(best_gk, outfield[:, -1])
+                )
+                # Every k from new up (from allowed on, all of them) gets it
+                if new < allowed:
+                    totals[:, new] += score
+                else:
+                    totals[:, new:] += score[:, None]
+        if free is None:
+            return totals[:, -1]
+        available = np.asarray(free) + (self.horizon - gw - 1)
+        hits = TransferPlanner.HIT * np.maximum(
+            np.arange(most + 1)[None, :] - available[:, None], 0
+        )
+        return (totals - hits).max(axis=1)
+
+    def refine(self, squads: np.ndarray, gw: int, free: np.ndarray):
+        """
+        Tighter bound than bound, position by position: by GW j the best XI
+        after each spread over the positions of the new players allowed by
+        then, bank and club limits aside. The best players of a position in
+        the pool replace its worst in the squad
+        """
+        most = self.max_transfers * (self.horizon - gw)
+        spreads = self.spreads[self.spreads.sum(axis=1) <= most]
+        new = spreads.sum(axis=1)
+        members = np.zeros((len(squads), len(self.ids)), dtype=bool)
+        members[np.arange(len(squads))[:, None], squads] = True
+        totals = np.zeros((len(squads), most + 1))
+        for j in range(gw, self.horizon):
+            others = np.where(members, -np.inf, self.points[:, j])
+            points = np.empty((len(squads), len(spreads), squads.shape[1]))
+            start = 0
+            for pos, quota in enumerate(SquadOptimiser.QUOTAS):
+                own = np.sort(self.points[squads[:, start : start + quota], j], axis=1)
+                best = -np.sort(-others[:, self.position == pos], axis=1)
+                best = np.concatenate(
+                    [best, np.full((len(squads), quota), -np.inf)], axis=1
+                )[:, :quota]
+                joining = np.where(
+                    np.arange(quota) < spreads[:, pos : pos + 1],
+                    best[:, None, :],
+                    -np.inf,
+                )
+                points[..., start : start + quota] = np.maximum(
+                    own[:, None, :], joining
+                )
+                start += quota
+            scores = TransferPlanner.lineup(points)
+            allowed = self.max_transfers * (j - gw + 1)
+            for k in range(most + 1):
+                totals[:, k] += scores[:, new <= min(allowed, k)].max(axis=1)
+        hits = TransferPlanner.HIT * np.maximum(
+            np.arange(most + 1)[None, :]
+            - (np.asarray(free) + (self.horizon - gw - 1))[:, None],
+            0,
+        )
+        return (totals - hits).max(axis=1)
+
+    def moves(self, squad: np.ndarray):
+        """
+        Squads one GW of transfers away: same position swaps within the bank
+        and club limits, the squad itself first
+        returns: squad masks (n x players of the pool), transfers made (n)
+        """
+        bank = self.budget - self.cost[squad].sum()
+        clubs = np.bincount(self.team[squad], minlength=self.team.max() + 1)
+        full = clubs >= SquadOptimiser.PER_CLUB
+        flips, transfers = [np.zeros((1, len(squad)), dtype=bool)], [[0]]
+        if self.max_transfers >= 1:
+            open_ = squad[self.outs] & ~squad[self.ins]
+            fits = (
+                open_
+                & (self.spend <= bank)
+                & (
+                    (self.team[self.ins] == self.team[self.outs])
+                    | ~full[self.team[self.ins]]
+                )
+            )
+            flips.append(self.flip[fits])
+            transfers.append(np.full(fits.sum(), 1))
+        if self.max_transfers >= 2:
+            a, b = self.pairs
+            pick = np.flatnonzero(open_[a] & open_[b])
+            pick = pick[self.pair_spend[pick] <= bank]
+            first, second = self.pair_clubs
+            fits = (
+                clubs[self.team[self.ins[a[pick]]]] + first[pick]
+                <= SquadOptimiser.PER_CLUB
+            ) & (
+                clubs[self.team[self.ins[b[pick]]]] + second[pick]
+                <= SquadOptimiser.PER_CLUB
+            )
+            flips.append(self.pair_flip[pick[fits]])
+            transfers.append(np.full(fits.sum(), 2))
+        return squad[None, :] ^ np.concatenate(flips), np.concatenate(transfers)
+
+    def search(self, squad: np.ndarray, gw: int, free: int):
+        """
+        Best score from GW gw to the horizon for a squad mask
+        returns: score, squads picked for each GW
+        """
+        if gw >= self.horizon:
+            return 0.0, []
+        key = (squad.tobytes(), gw, free)
+        self.lookups += 1
+        if key in self.memo:
+            self.cache_hits += 1
+            return self.memo[key]
+        self.nodes += 1
+        masks, transfers = self.moves(squad)
+        squads = np.nonzero(masks)[1].reshape(len(masks), -1)
+        hits = TransferPlanner.HIT * np.maximum(transfers - free, 0)
+        now = TransferPlanner.lineup(self.points[squads, gw]) - hits
+        left = np.minimum(np.maximum(free - transfers, 0) + 1, TransferPlanner.MAX_FREE)
+        if gw + 1 == self.horizon:
+            m = int(np.argmax(now))
+            self.memo[key] = (float(now[m]), [tuple(squads[m].tolist())])
+            return self.memo[key]
+        bounds = now + self.bound(squads, gw + 1, left)
+        order = np.argsort(-bounds, kind="stable")
+        best, plan, refined = -np.inf, [], False
+        while len(order) > 0 and bounds[order[0]] > best:
+            m, order = order[0], order[1:]
+            score, rest = self.search(masks[m], gw + 1, int(left[m]))
+            if now[m] + score > best:
+                best, plan = now[m] + score, [tuple(squads[m].tolist())] + rest
+            if not refined:
+                # The children that may still beat the first are bounded
+                # position by position, tighter, and tried in that order
+                order = order[bounds[order] > best]
+                bounds[order] = now[order] + self.refine(
+                    squads[order], gw + 1, left[order]
+                )
+                order = order[np.argsort(-bounds[order], kind="stable")]
+                refined = True
+        self.memo[key] = (float(best), plan)
+        return self.memo[key]
+
+    def plan(self, bank: int, free_transfers=1):
+        """
+        Best transfers for each GW of the horizon, from the squad and bank
+        (in tenths of a million, like now_cost). Players sell at now_cost
+        returns: {"score", "hold", "transfers", "nodes", "cache_hits",
+            "hit_rate", "seconds"}, transfers being per GW (out ids, in ids,
+            hit) tuples
+        """
+        t = time.perf_counter()
+        self.memo = {}
+        self.nodes = self.lookups = self.cache_hits = 0
+        self.budget = self.cost[list(self.squad)].sum() + bank
+        squad = np.zeros(len(self.ids), dtype=bool)
+        squad[list(self.squad)] = True
+        score, squads = self.search(squad, 0, free_transfers)
+        transfers, previous, free = [], set(self.squad), free_transfers
+        for squad in squads:
+            out = sorted(previous - set(squad))
+            new = sorted(set(squad) - previous)
+            hit = TransferPlanner.HIT * max(len(out) - free, 0)
+            free = min(max(free - len(out), 0) + 1, TransferPlanner.MAX_FREE)
+            transfers.append((self.ids[out].tolist(), self.ids[new].tolist(), hit))
+            previous = set(squad)
+        hold = TransferPlanner.lineup(self.points[list(self.squad)].T).sum()
+        return {
+            "score": score,
+            "hold": float(hold),
+            "transfers": transfers,
+            "nodes": self.nodes,
+            "cache_hits": self.cache_hits,
+            "hit_rate": self.cache_hits / max(self.lookups, 1),
+            "seconds": time.perf_counter() - t,
+        }
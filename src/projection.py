@@ -0,0 +1,148 @@
+from collections import OrderedDict
+import threading
+import numpy as np, pandas as pd
+from src import metrics
+from src.fixtures import FixtureMatrix
+from src.snapshot import PlayerTable
+
+
+class ProjectionEngine:
+    """
+    Expected points of every player in every GW from their per 90 rates and
+    the strength of each unplayed fixture, home or away. Blank GWs project 0
+    and double GWs sum both fixtures. Computed in one batched pass and cached
+    per (table, fixtures) snapshot, so every consumer shares one matrix
+    """
+
+    GOAL_POINTS = np.array([6, 6, 5, 4], dtype=np.float64)  # GK, DEF, MID, FWD
+    ASSIST_POINTS = 3
+    CLEAN_SHEET_POINTS = np.array([4, 4, 1, 0], dtype=np.float64)
+    CONCEDED_POINTS = np.array([0.5, 0.5, 0, 0], dtype=np.float64)  # lost per goal
+    GOALS_PER_TEAM = 1.4  # league average goals per team per match
+    CACHE_SIZE = 8
+    _cache = OrderedDict()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def expected_goals(fixtures: FixtureMatrix):
+        """
+        Goals expected of the home and the away side of every fixture: the
+        league average scaled by own attack against the opponent's defence,
+        each at its venue
+        returns: fixtures x 2
+        """
+        attack = fixtures.attack / fixtures.attack.mean()
+        defence = fixtures.defence / fixtures.defence.mean()
+        home, away = fixtures.home_rows, fixtures.away_rows
+        return ProjectionEngine.GOALS_PER_TEAM * np.stack(
+            [attack[home, 0] / defence[away, 1], attack[away, 1] / defence[home, 0]],
+            axis=1,
+        )
+
+    @staticmethod
+    def team_rates(fixtures: FixtureMatrix):
+        """
+        Per team and GW, summed over its unplayed fixtures: the fixture count,
+        its attack multiplier (goals expected over the league average, 1 for
+        an average matchup), goals expected against it and clean sheet chance
+        returns: count, attack, conceded, clean_sheets (teams x GWs each)
+        """
+        unplayed = fixtures.unplayed
+        goals = ProjectionEngine.expected_goals(fixtures)[unplayed]
+        gw = fixtures.events[unplayed] - 1
+        home, away = fixtures.home_rows[unplayed], fixtures.away_rows[unplayed]
+        shape = (len(fixtures.team_ids), FixtureMatrix.GWS)
+        rates = [np.zeros(shape) for _ in range(4)]
+        for team, side in ((home, 0), (away, 1)):
+            scoring = goals[:, side] / ProjectionEngine.GOALS_PER_TEAM
+            conceded = goals[:, 1 - side]
+            for rate, values in zip(rates, (1.0, scoring, conceded, np.exp(-conceded))):
+                np.add.at(rate, (team, gw), values)
+        return rates
+
+    @staticmethod
+    def player_rates(table: PlayerTable):
+        """
+        Per player: share of each fixture expected to be played, chance of an
+        appearance, of 60+ minutes, and attacking points and bonus per 90
+        """
+        players = table.players
+        played = players["games_played"].to_numpy().astype(np.float64)
+        minutes = players["minutes"].to_numpy().astype(np.float64)
+        position = players["position"].to_numpy()
+        appears = played / max(played.max(), 1)
+        share = appears * np.minimum(players["minutes_per_game"].to_numpy(), 90) / 90
+        long_game = appears * players["starts_per_game"].to_numpy()
+        per_90 = np.divide(90, minutes, out=np.zeros(len(minutes)), where=minutes > 0)
+        goals = players["expected_goals"].to_numpy() * per_90
+        assists = players["expected_assists"].to_numpy() * per_90
+        bonus = players["bonus"].to_numpy() * per_90
+        scoring = ProjectionEngine.GOAL_POINTS[position] * goals
+        scoring += ProjectionEngine.ASSIST_POINTS * assists
+        return share, appears, long_game, scoring, bonus
+
+    @staticmethod
+    @metrics.timed("stage", stage="projection")
+    def project(table: PlayerTable, fixtures: FixtureMatrix):
+        """
+        Expected points per player and GW over the season, 0 for played
+        fixtures. Read-only, shared by every caller of the same snapshot
+        returns: players x 38, in the order of table.players
+        """
+        key = (table.version, fixtures.version)
+        with ProjectionEngine._lock:
+            if key in ProjectionEngine._cache:
+                ProjectionEngine._cache.move_to_end(key)
+                return ProjectionEngine._cache[key]
+        count, attack, conceded, clean_sheets = ProjectionEngine.team_rates(fixtures)
+        share, appears, long_game, scoring, bonus = ProjectionEngine.player_rates(table)
+        position = table.players["position"].to_numpy()
+        rows = fixtures._rows(table.players["team"].to_numpy())
+        appearance = appears + long_game  # 1 point to play, 1 more for 60+
+        points = (
+            (share * scoring)[:, None] * attack[rows]
+            + (share * bonus + appearance)[:, None] * count[rows]
+            + (long_game * ProjectionEngine.CLEAN_SHEET_POINTS[position])[:, None]
+            * clean_sheets[rows]
+            - (share * ProjectionEngine.CONCEDED_POINTS[position])[:, None]
+            * conceded[rows]
+        )
+        points.setflags(write=False)
+        with ProjectionEngine._lock:
+            ProjectionEngine._cache[key] = points
+            if len(ProjectionEngine._cache) > ProjectionEngine.CACHE_SIZE:
+                ProjectionEngine._cache.popitem(last=False)
+        return points
+
+    @staticmethod
+    def next_gw(fixtures: FixtureMatrix):
+        """
+        First GW with an unplayed fixture, 0 once the season is over
+        """
+        gws = fixtures.events[fixtures.unplayed]
+        return int(gws.min()) if len(gws) > 0 else 0
+
+    @staticmethod
+    def upcoming(table: PlayerTable, fixtures: FixtureMatrix, first_gw, horizon):
+        """
+        returns: players x GWs first_gw..first_gw + horizon - 1 (up to 38)
+        """
+        last_gw = min(first_gw + horizon - 1, FixtureMatrix.GWS)
+        return ProjectionEngine.project(table, fixtures)[:, first_gw - 1 : last_gw]
+
+    @staticmethod
+    def frame(table: PlayerTable, fixtures: FixtureMatrix, horizon=5):
+        """
+        Projected points of the next GW and the next horizon GWs per player id
+        """
+        first_gw = ProjectionEngine.next_gw(fixtures)
+        points = ProjectionEngine.upcoming(table, fixtures, max(first_gw, 1), horizon)
+        if first_gw == 0:
+            points = np.zeros_like(points)
+        return pd.DataFrame(
+            {
+                "xPts Next GW": np.round(points[:, 0], 2),
+                f"xPts Next {horizon}": np.round(points.sum(axis=1), 2),
+            },
+            index=table.players.index,
+        )
@@ -1,41 +1,247 @@
-import requests, streamlit as st
+import os, threading
+import numpy as np, pandas as pd
+from src.cache import FPLCache
+from src.caching import cached
 from src.data import FPLData
+from src.fetcher import FPLFetcher
+from src.fixtures import FixtureMatrix
+from src.history import HistoryTensor
+from src import metrics
+from src.schema import (
+    ELEMENT_FIELDS,
+    FIXTURE_FIELDS,
+    LIVE_FIELDS,
+    TEAM_FIELDS,
+    columns,
+    parse,
+)
 from pprint import pprint
 
 
 class FPLQuerier:
-    FPL_GENERAL_URL = "https://fantasy.premierleague.com/api/bootstrap-static/"
-    FPL_FIXTURES_URL = "https://fantasy.premierleague.com/api/fixtures/"
-    FPL_ENTRY_URL = "https://fantasy.premierleague.com/api/entry/"
-    FPL_ENTRY_HISTORY_URL = "https://fantasy.premierleague.com/api/entry/{}/history/"
-    FPL_MANAGER_TEAM_URL = (
-        "https://fantasy.premierleague.com/api/entry/{}/event/{}/picks/"
+    BASE_URL = (
+        os.environ.get(
+            "FANTAPY_API_URL", "https://fantasy.premierleague.com/api/"
+        ).rstrip("/")
+        + "/"
     )
-    FPL_ELEMENT_SUMMARY_URL = (
-        "https://fantasy.premierleague.com/api/element-summary/{}/"
-    )
-    FPL_GW_LIVE_URL = "https://fantasy.premierleague.com/api/event/{}/live/"
+    FPL_GENERAL_URL = BASE_URL + "bootstrap-static/"
+    FPL_FIXTURES_URL = BASE_URL + "fixtures/"
+    FPL_ENTRY_URL = BASE_URL + "entry/"
+    FPL_ENTRY_HISTORY_URL = BASE_URL + "entry/{}/history/"
+    FPL_MANAGER_TEAM_URL = BASE_URL + "entry/{}/event/{}/picks/"
+    FPL_ELEMENT_SUMMARY_URL = BASE_URL + "element-summary/{}/"
+    FPL_GW_LIVE_URL = BASE_URL + "event/{}/live/"
+    FPL_LEAGUE_URL = BASE_URL + "leagues-classic/{}/standings/?page_standings={}"
+    LEAGUE_PAGES_AHEAD = 4
 
     teams = {}
     teams_by_name = {}
     data = {}
+    # Response cache and fetchers by name, created on first use so importing
+    # the querier opens no database and starts no threads
+    clients = {}
+    _clients_lock = threading.Lock()
+
+    @staticmethod
+    def use(**clients):
+        """
+        Install the cache or fetchers to use from now on, by accessor name,
+        e.g. use(fetcher=FPLFetcher(...)). None drops one, to be created again
+        on next use
+        """
+        with FPLQuerier._clients_lock:
+            for name, client in clients.items():
+                if client is None:
+                    FPLQuerier.clients.pop(name, None)
+                else:
+                    FPLQuerier.clients[name] = client
+
+    @staticmethod
+    def _client(name: str, create):
+        with FPLQuerier._clients_lock:
+            if name not in FPLQuerier.clients:
+                FPLQuerier.clients[name] = create()
+            return FPLQuerier.clients[name]
+
+    @staticmethod
+    def cache() -> FPLCache:
+        """
+        Disk cache of API responses shared by the fetchers
+        """
+        return FPLQuerier._client("cache", FPLCache)
+
+    @staticmethod
+    def fetcher() -> FPLFetcher:
+        """
+        Fetcher for the bootstrap, fixtures and live GWs
+        """
+        cache = FPLQuerier.cache()
+        return FPLQuerier._client("fetcher", lambda: FPLFetcher(cache=cache))
+
+    @staticmethod
+    def league_fetcher() -> FPLFetcher:
+        """
+        Leagues fan out to one request per manager, so more workers but
+        throttled
+        """
+        cache = FPLQuerier.cache()
+        return FPLQuerier._client(
+            "league_fetcher",
+            lambda: FPLFetcher(
+                workers=32, pool_size=32, per_host=32, cache=cache, rate=100
+            ),
+        )
+
+    @staticmethod
+    def summary_fetcher() -> FPLFetcher:
+        """
+        Element summaries are one request per player too, kept on disk per
+        player rather than in the response cache
+        """
+        return FPLQuerier._client(
+            "summary_fetcher",
+            lambda: FPLFetcher(workers=16, pool_size=16, per_host=16, rate=50),
+        )
+
+    @staticmethod
+    def configure(base_url: str):
+        """
+        Point every API URL under the current base at base_url, e.g. a local
+        stand-in server. URLs overridden one by one are left alone
+        """
+        base_url = base_url if base_url.endswith("/") else base_url + "/"
+        for name in dir(FPLQuerier):
+            url = getattr(FPLQuerier, name)
+            if name.startswith("FPL_") and name.endswith("_URL"):
+                if url.startswith(FPLQuerier.BASE_URL):
+                    path = url[len(FPLQuerier.BASE_URL) :]
+                    setattr(FPLQuerier, name, base_url + path)
+        FPLQuerier.BASE_URL = base_url
 
     @staticmethod
-    @st.cache_data(ttl=3600)
+    @cached(ttl=3600)
     def get_manager_data(manager_id: int, gw: int):
         """
         Get manager data from previous seasons
         """
-        manager = requests.get(FPLQuerier.FPL_ENTRY_URL + str(manager_id)).json()
-        data = requests.get(
-            FPLQuerier.FPL_MANAGER_TEAM_URL.format(manager_id, gw)
-        ).json()
+        entry_url = FPLQuerier.FPL_ENTRY_URL + str(manager_id)
+        picks_url = FPLQuerier.FPL_MANAGER_TEAM_URL.format(manager_id, gw)
+        results = dict(FPLQuerier.fetcher().map([entry_url, picks_url]))
+        manager, data = results[entry_url], results[picks_url]
         return {
             "name": manager["name"],
             "gw": gw,
             "team": data.get("picks", {}),
+            "bank": data.get("entry_history", {}).get("bank", 0),
         }
 
+    @staticmethod
+    def get_league_standings(league_id: int, limit=None, max_age=None):
+        """
+        Walk the paginated standings of a classic league, a few pages at a
+        time, up to limit managers
+        returns: league, standings rows
+        """
+        league, rows, page = {}, [], 1
+        while limit is None or len(rows) < limit:
+            urls = [
+                FPLQuerier.FPL_LEAGUE_URL.format(league_id, p)
+                for p in range(page, page + FPLQuerier.LEAGUE_PAGES_AHEAD)
+            ]
+            pages = dict(FPLQuerier.league_fetcher().map(urls, max_age=max_age))
+            for url in urls:
+                standings = pages[url].get("standings", {})
+                league = pages[url].get("league", league)
+                rows += standings.get("results", [])
+                if not standings.get("has_next", False):
+                    return league, rows[:limit]
+            page += FPLQuerier.LEAGUE_PAGES_AHEAD
+        return league, rows[:limit]
+
+    @staticmethod
+    def stream_league(table, gw: int, final=False, add=None):
+        """
+        Fetch the picks of every manager of table concurrently, passing each
+        to add (table.add by default) as it arrives. Picks of a final GW
+        never change
+        yields: entry ids, None for the ones that failed
+        """
+        urls = {
+            FPLQuerier.FPL_MANAGER_TEAM_URL.format(entry, gw): int(entry)
+            for entry in table.entries
+        }
+        for url, data in FPLQuerier.league_fetcher().map(
+            urls, immutable=urls if final else (), skip_errors=True
+        ):
+            (add or table.add)(urls[url], data)
+            yield urls[url] if data is not None else None
+
+    @staticmethod
+    def get_league(league_id: int, gw: int, final=False, limit=None):
+        """
+        Standings and picks of a classic league for gw
+        """
+        from src.league import LeagueTable
+
+        table = LeagueTable(*FPLQuerier.get_league_standings(league_id, limit))
+        for _ in FPLQuerier.stream_league(table, gw, final):
+            pass
+        return table
+
+    @staticmethod
+    @metrics.timed("stage", stage="get_summaries")
+    def get_summaries(data, fixtures: FixtureMatrix, previous=None, directory=None):
+        """
+        Element summaries of every player of the bootstrap, fetching only the
+        players whose status, news or finished team fixtures changed since
+        previous, or since their summary was written to disk
+        returns: ElementSummaries, previous itself when nothing changed
+        """
+        from src.summaries import ElementSummaries
+
+        directory = os.path.join(
+            directory or FPLCache.DEFAULT_DIR,
+            "summaries-" + HistoryTensor.season_of(data),
+        )
+        if previous is not None and previous.directory != directory:
+            previous = None
+        summaries = ElementSummaries(directory, previous)
+        elements = data.get("elements", [])
+        stale = summaries.stale(elements, fixtures)
+        urls = {FPLQuerier.FPL_ELEMENT_SUMMARY_URL.format(pid): pid for pid in stale}
+        fetched = 0
+        for url, summary in FPLQuerier.summary_fetcher().map(urls, skip_errors=True):
+            if summary is not None:
+                summaries.add(urls[url], stale[urls[url]], summary)
+                fetched += 1
+        summaries.retain(element["id"] for element in elements)
+        if previous is not None and fetched == 0 and len(summaries) == len(previous):
+            return previous
+        summaries.version += 1
+        return summaries
+
+    @staticmethod
+    def get_trends(data, directory=None):
+        """
+        The season's price, ownership, transfers and news history
+        returns: TrendStore
+        """
+        from src.trends import TrendStore
+
+        season = HistoryTensor.season_of(data)
+        directory = directory or FPLCache.DEFAULT_DIR
+        return TrendStore.open(os.path.join(directory, f"trends-{season}.sqlite"))
+
+    @staticmethod
+    @metrics.timed("stage", stage="record_trends")
+    def record_trends(data, directory=None):
+        """
+        Append the fields of the (parsed) bootstrap elements that changed
+        since the last refresh to the season's trend store
+        """
+        return FPLQuerier.get_trends(data, directory).append(data.get("elements", []))
+
     @staticmethod
     def get_team_difficulty(team_code: str):
         team_code = team_code.upper()
@@ -51,14 +257,30 @@ class FPLQuerier:
             return 3
 
     @staticmethod
-    def get_players(data, teams):
+    @metrics.timed("stage", stage="parse_live")
+    def parse_live(data):
         """
-        TODO: Run the querier and cache the results
-              - Should run EACH gameweek and parse all the data
-        returns: curr_gw, players
+        Parse the stats of a live GW payload into one array per field, None
+        if the GW has no data yet
+        returns: {"id": player ids, field: values, ...}
+        """
+        if data is None or len(data.get("elements", [])) == 0:
+            return None
+        elements = data["elements"]
+        return {
+            "id": np.array([player["id"] for player in elements], dtype=np.int64),
+            **columns([player["stats"] for player in elements], LIVE_FIELDS, 0),
+        }
+
+    @staticmethod
+    @metrics.timed("stage", stage="build_players")
+    def build_players(data, teams):
+        """
+        Build players from the bootstrap elements
+        returns: players, players_by_name
         """
-        curr_gw, players, players_by_name = 0, {}, {}
-        for player in data.get("elements", []):
+        players, players_by_name = {}, {}
+        for player in parse(data.get("elements", []), ELEMENT_FIELDS):
             id = player["id"]
             team = teams.get(player["team"], {})
             player_name = player["web_name"]
@@ -66,12 +288,6 @@ class FPLQuerier:
                 float(player["goals_scored"] + player["assists"]) / team["goals_scored"]
             )
             name = f"{player_name} ({team['code']})"
-            for k, v in player.items():
-                if type(v) == str and v != "":
-                    try:
-                        player[k] = round(float(v), 3)
-                    except ValueError:
-                        pass
             players[id] = {
                 "id": id,
                 "name": player_name,
@@ -87,33 +303,71 @@ class FPLQuerier:
                 "stats": player,
             }
             players_by_name[name] = players[id]
-        for gw in range(1, 39):
-            data = requests.get(FPLQuerier.FPL_GW_LIVE_URL.format(gw)).json()
-            if data is None or len(data.get("elements", [])) == 0:
+        return players, players_by_name
+
+    @staticmethod
+    @metrics.timed("stage", stage="get_live")
+    def get_live(data, first_gw=1, max_age=None):
+        """
+        Fetch live GWs from first_gw up to the first GW without data
+        returns: curr_gw, live
+        """
+        curr_gw, live = 0, {}
+        started = [
+            e["id"]
+            for e in data.get("events", [])
+            if e.get("finished") or e.get("is_current")
+        ]
+        batches = [range(first_gw, min(max(started, default=37) + 2, 39))]
+        batches.append(range(max(batches[0].stop, first_gw), 39))
+        finished = {
+            FPLQuerier.FPL_GW_LIVE_URL.format(e["id"])
+            for e in data.get("events", [])
+            if e.get("finished") and e.get("data_checked")
+        }
+        for batch in batches:
+            urls = {FPLQuerier.FPL_GW_LIVE_URL.format(gw): gw for gw in batch}
+            for url, gw_data in FPLQuerier.fetcher().map(
+                urls, immutable=finished, max_age=max_age
+            ):
+                live[urls[url]] = FPLQuerier.parse_live(gw_data)
+            if any(elements is None for elements in live.values()):
+                break
+        for gw in range(first_gw, 39):
+            if live.get(gw) is None:
                 curr_gw = gw
                 break
-            for player in data["elements"]:
-                pid = player["id"]
-                for k, v in player["stats"].items():
-                    if type(v) == str:
-                        try:
-                            player["stats"][k] = round(float(v), 3)
-                        except ValueError:
-                            player["stats"][k] = 0
-                if pid not in players:
-                    raise Exception(f"Player {pid} not found")
-                if "history" not in players[pid]:
-                    players[pid]["history"] = {}
-                pdict = players[pid]
-                stats = pdict["stats"]
-                pdict["history"][gw] = player["stats"]
-                stats["games_played"] = stats.get("games_played", 0) + 1
-                stats["games_w_bonus"] = stats.get("games_w_bonus", 0) + (
-                    1 if player["stats"]["bonus"] > 0 else 0
-                )
-                stats["games_started"] = stats.get("games_started", 0) + (
-                    1 if player["stats"]["starts"] > 0 else 0
-                )
+        return curr_gw, {
+            gw: parsed
+            for gw, parsed in sorted(live.items())
+            if curr_gw == 0 or gw < curr_gw
+        }
+
+    @staticmethod
+    @metrics.timed("stage", stage="add_live")
+    def add_live(players, live):
+        """
+        Add the GWs of live to the per-player accumulators: games played, with
+        bonus and started, on top of the counts already in their stats
+        """
+        ids = pd.Index(list(players))
+        counts = np.zeros((3, len(ids)), dtype=np.int64)
+        for gw, parsed in live.items():
+            rows = ids.get_indexer(parsed["id"])
+            if (rows < 0).any():
+                raise Exception(f"Player {parsed['id'][rows < 0][0]} not found")
+            counts[0, rows] += 1
+            counts[1, rows] += parsed["bonus"] > 0
+            counts[2, rows] += parsed["starts"] > 0
+        for player, played, bonus, started in zip(players.values(), *counts):
+            stats = player["stats"]
+            stats["games_played"] = stats.get("games_played", 0) + int(played)
+            stats["games_w_bonus"] = stats.get("games_w_bonus", 0) + int(bonus)
+            stats["games_started"] = stats.get("games_started", 0) + int(started)
+
+    @staticmethod
+    @metrics.timed("stage", stage="derive_stats")
+    def derive_stats(players):
         for player in players.values():
             stats = player["stats"]
             games_played = stats["games_played"]
@@ -137,12 +391,40 @@ class FPLQuerier:
                 if stats["expected_goal_involvements"] > 0
                 else 0
             )
+
+    @staticmethod
+    @metrics.timed("stage", stage="get_players")
+    def get_players(data, teams):
+        """
+        TODO: Run the querier and cache the results
+              - Should run EACH gameweek and parse all the data
+        returns: curr_gw, players
+        """
+        players, players_by_name = FPLQuerier.build_players(data, teams)
+        curr_gw, live = FPLQuerier.get_live(data)
+        FPLQuerier.add_live(players, live)
+        FPLQuerier.derive_stats(players)
         return curr_gw, players, players_by_name
 
     @staticmethod
-    def get_teams(data):
+    def finished_gws(data, curr_gw):
+        """
+        Number of leading GWs that are finished, checked and can not change
+        """
+        finished = 0
+        for event in sorted(data.get("events", []), key=lambda e: e["id"]):
+            if event["id"] != finished + 1 or (0 < curr_gw <= event["id"]):
+                break
+            if not (event.get("finished") and event.get("data_checked")):
+                break
+            finished = event["id"]
+        return finished
+
+    @staticmethod
+    @metrics.timed("stage", stage="get_teams")
+    def get_teams(data, fixtures=None):
         teams, teams_by_name = {}, {}
-        for team in data.get("teams", []):
+        for team in parse(data.get("teams", []), TEAM_FIELDS):
             teams[team["id"]] = {
                 "id": team["id"],
                 "info": team,
@@ -163,7 +445,9 @@ class FPLQuerier:
                 "strength_defence_away": team["strength_defence_away"] - 1000,
             }
             teams_by_name[team["name"]] = teams[team["id"]]
-        fixtures = requests.get(FPLQuerier.FPL_FIXTURES_URL).json()
+        if fixtures is None:
+            fixtures = FPLQuerier.fetcher().get(FPLQuerier.FPL_FIXTURES_URL)
+        parse(fixtures, FIXTURE_FIELDS)
         for fixture in fixtures:
             if fixture.get("event", None) is None:
                 continue
@@ -201,56 +485,118 @@ class FPLQuerier:
                     "difficulty": teams[team_a]["strength"],
                     "done": done_fixture,
                 }
-        # Generate fixture score
-        for team in teams.values():
-            count = fixture_score = 0
-            factor = [5, 3, 2, 1, 1]
-            upcoming = sorted(
-                [i for i in team["fixtures"] if not team["fixtures"][i]["done"]][:5]
-            )
-            for gw in upcoming:
-                fixture = team["fixtures"][gw]
-                fixture_score += fixture["difficulty"] * factor.pop(0)
-                if (count := count + 1) >= 5:
-                    break
-            team["fixture_score"] = round(
-                5 * fixture_score / (25 + 15.0 + 5 + 8), 2
-            )  # 38 is the max difficulty
-            for other in teams.values():
-                if other["id"] in team["matchups"]:
-                    continue
-                if other["name"] == team["name"]:
-                    continue
-                overlapping = [0] * 6
-                for i in range(0, 38):
-                    if i >= len(other["fixtures"]):
-                        break
-                    if i not in team["fixtures"] or i not in other["fixtures"]:
+        # Generate fixture score and matchups
+        with metrics.span("stage", stage="get_teams.matchups"):
+            matrix = FixtureMatrix(teams, fixtures)
+            fixture_scores = matrix.fixture_scores()
+            overlapping, scores = matrix.matchups()
+            for row, team_id in enumerate(matrix.team_ids):
+                team = teams[int(team_id)]
+                team["fixture_score"] = float(fixture_scores[row])
+                for other_row, other_id in enumerate(matrix.team_ids):
+                    if other_row == row:
                         continue
-                    tdiff = team["fixtures"][i]["difficulty"]
-                    odiff = other["fixtures"][i]["difficulty"]
-                    mindiff = min(tdiff, odiff)
-                    overlapping[mindiff] += 1
-                score = sum([i * overlapping[i] for i in range(0, len(overlapping))])
-                team["matchups"][other["name"]] = {
-                    "id": other["id"],
-                    "score": score,
-                    "overlapping": overlapping,
-                }
-                other["matchups"][team["name"]] = {
-                    "id": team["id"],
-                    "score": score,
-                    "overlapping": overlapping,
-                }
-        return teams, teams_by_name
+                    team["matchups"][teams[int(other_id)]["name"]] = {
+                        "id": int(other_id),
+                        "score": int(scores[row, other_row]),
+                        "overlapping": overlapping[row, other_row].tolist(),
+                    }
+        return teams, teams_by_name, matrix
 
     @staticmethod
-    @st.cache_data(ttl=3600)
+    @cached(ttl=3600)
     def run():
         """
-        placeholder for streamlit caching
+        Build a full snapshot, cached by the installed caching backend
+        """
+        return FPLQuerier.build()
+
+    @staticmethod
+    @metrics.timed("stage", stage="build")
+    def build():
         """
-        data = requests.get(FPLQuerier.FPL_GENERAL_URL).json()
-        teams, teams_by_name = FPLQuerier.get_teams(data)
-        curr_gw, players, players_by_name = FPLQuerier.get_players(data, teams)
-        return curr_gw, data, teams, teams_by_name, players, players_by_name
+        Fetch and build a full snapshot
+        returns: curr_gw, data, teams, teams_by_name, players, players_by_name,
+            table, fixtures, history
+        """
+        from src.snapshot import PlayerTable
+
+        results = dict(
+            FPLQuerier.fetcher().map(
+                [FPLQuerier.FPL_GENERAL_URL, FPLQuerier.FPL_FIXTURES_URL]
+            )
+        )
+        data = results[FPLQuerier.FPL_GENERAL_URL]
+        teams, teams_by_name, fixtures = FPLQuerier.get_teams(
+            data, results[FPLQuerier.FPL_FIXTURES_URL]
+        )
+        players, players_by_name = FPLQuerier.build_players(data, teams)
+        curr_gw, live = FPLQuerier.get_live(data)
+        FPLQuerier.add_live(players, live)
+        FPLQuerier.derive_stats(players)
+        FPLQuerier.record_trends(data)
+        table = PlayerTable.from_players(players, teams)
+        history = HistoryTensor.build(
+            list(players), live, HistoryTensor.season_of(data), FPLCache.DEFAULT_DIR
+        )
+        return (
+            curr_gw,
+            data,
+            teams,
+            teams_by_name,
+            players,
+            players_by_name,
+            table,
+            fixtures,
+            history,
+        )
+
+    @staticmethod
+    @metrics.timed("stage", stage="refresh")
+    def refresh(fpl: FPLData):
+        """
+        Incrementally refresh a previous snapshot. Finished GWs are reused from
+        fpl and only the bootstrap, fixtures and unfinished live GWs are fetched
+        returns: the same as run
+        """
+        from src.snapshot import PlayerTable
+
+        results = dict(
+            FPLQuerier.fetcher().map(
+                [FPLQuerier.FPL_GENERAL_URL, FPLQuerier.FPL_FIXTURES_URL], max_age=0
+            )
+        )
+        data = results[FPLQuerier.FPL_GENERAL_URL]
+        teams, teams_by_name, fixtures = FPLQuerier.get_teams(
+            data, results[FPLQuerier.FPL_FIXTURES_URL]
+        )
+        players, players_by_name = FPLQuerier.build_players(data, teams)
+        FPLQuerier.record_trends(data)
+        finished = FPLQuerier.finished_gws(fpl.data, fpl.curr_gw)
+        games = fpl.history.games(finished)
+        for pid, player in players.items():
+            if pid in games:
+                player["stats"].update(games[pid])
+        curr_gw, live = FPLQuerier.get_live(data, finished + 1, max_age=0)
+        FPLQuerier.add_live(players, live)
+        FPLQuerier.derive_stats(players)
+        table = PlayerTable.from_players(players, teams)
+        history = HistoryTensor.build(
+            list(players),
+            live,
+            HistoryTensor.season_of(data),
+            FPLCache.DEFAULT_DIR,
+            fpl.history,
+            finished,
+        )
+        return (
+            curr_gw,
+            data,
+            teams,
+            teams_by_name,
+            players,
+            players_by_name,
+            table,
+            fixtures,
+            history,
+        )
@@ -0,0 +1,147 @@
+import logging, threading, time
+import numpy as np
+from src.data import FPLSnapshot
+from src.querier import FPLQuerier
+from src.scheduler import RefreshScheduler
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotRefresher:
+    """
+    Builds snapshots on a background thread and publishes each one by
+    swapping a single reference, so readers see either the old snapshot or
+    the new one and never wait on the network. Refreshes follow the
+    RefreshScheduler calendar
+    """
+
+    RETRY = 60
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, retry=RETRY):
+        self.retry = retry
+        self._current = None
+        self.checked_at = None
+        self._wake = threading.Event()
+        self._ready = threading.Event()
+        self._thread = None
+        self.error = None
+
+    @staticmethod
+    def shared():
+        """
+        The process-wide refresher, started on first use
+        """
+        with SnapshotRefresher._shared_lock:
+            if SnapshotRefresher._shared is None:
+                SnapshotRefresher._shared = SnapshotRefresher()
+                SnapshotRefresher._shared.start()
+            return SnapshotRefresher._shared
+
+    def current(self):
+        """
+        The latest published snapshot, None until the first build finishes
+        """
+        return self._current
+
+    def wait(self, timeout=None):
+        """
+        Wait for the first snapshot, for scripts that need one
+        """
+        self._ready.wait(timeout)
+        return self._current
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._loop, name="fpl-refresh", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def refresh_now(self):
+        """
+        Ask for a refresh without waiting for it
+        """
+        self._wake.set()
+
+    def next_run(self):
+        """
+        returns: time, reason of the next refresh
+        """
+        snapshot = self._current
+        if snapshot is None:
+            return time.time() + self.retry, "retry"
+        return RefreshScheduler.next_run(snapshot.data, snapshot.fixtures)
+
+    def planned(self, count=5):
+        """
+        The next count refreshes of the current calendar, as (time, reason)
+        """
+        snapshot = self._current
+        if snapshot is None:
+            return []
+        return RefreshScheduler.plan(snapshot.data, snapshot.fixtures, count=count)
+
+    @staticmethod
+    def unchanged(previous: FPLSnapshot, snapshot: FPLSnapshot):
+        """
+        Whether snapshot holds the same players, history, calendar and
+        element summaries
+        """
+        return (
+            previous.curr_gw == snapshot.curr_gw
+            and previous.summaries is snapshot.summaries
+            and previous.table.version == snapshot.table.version
+            and previous.history.version == snapshot.history.version
+            and previous.data.get("events") == snapshot.data.get("events")
+            and np.array_equal(previous.fixtures.finished, snapshot.fixtures.finished)
+            and np.array_equal(
+                previous.fixtures.kickoffs, snapshot.fixtures.kickoffs, equal_nan=True
+            )
+        )
+
+    def build(self):
+        """
+        Build the next snapshot, incrementally from the current one if any.
+        When nothing changed upstream the current one is kept, so sessions
+        do not re-pin. The first snapshot is published before its element
+        summaries are fetched, so the dashboard does not wait for them
+        """
+        previous = self._current
+        if previous is None:
+            results = FPLQuerier.build()
+            self.publish(FPLSnapshot(*results, version=1, built_at=time.time()))
+            summaries = FPLQuerier.get_summaries(results[1], results[7])
+        else:
+            results = FPLQuerier.refresh(previous)
+            summaries = FPLQuerier.get_summaries(
+                results[1], results[7], previous.summaries
+            )
+        version = 2 if previous is None else previous.version + 1
+        snapshot = FPLSnapshot(
+            *results, version=version, built_at=time.time(), summaries=summaries
+        )
+        self.checked_at = time.time()
+        if previous is not None and SnapshotRefresher.unchanged(previous, snapshot):
+            return previous
+        return snapshot
+
+    def publish(self, snapshot: FPLSnapshot):
+        self._current = snapshot
+        self._ready.set()
+
+    def _loop(self):
+        while True:
+            try:
+                self.publish(self.build())
+                self.error = None
+                when, _ = self.next_run()
+                wait = max(when - time.time(), 0)
+            except Exception as e:
+                logger.exception("Snapshot refresh failed")
+                self.error, wait = e, self.retry
+            self._wake.wait(wait)
+            self._wake.clear()
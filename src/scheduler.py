@@ -0,0 +1,90 @@
+import time
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from src.fixtures import FixtureMatrix
+
+
+class RefreshScheduler:
+    """
+    When the data upstream can change, from the event calendar and fixtures
+    of the latest snapshot: every minute while matches are on, every few
+    minutes while a finished GW is settling, after each deadline and once a
+    day for prices. Idle otherwise
+    """
+
+    LIVE_INTERVAL = 60
+    MATCH_WINDOW = 2.5 * 3600  # kickoff to final whistle, with stoppages
+    SETTLE_INTERVAL = 15 * 60
+    SETTLE_WINDOW = 2 * 24 * 3600  # bonus and data checks after the last match
+    DEADLINE_DELAY = 2 * 60
+    PRICE_TIME = (1, 45)  # UTC, shortly after the nightly price changes
+
+    @staticmethod
+    def candidates(data: dict, fixtures: FixtureMatrix, now: float):
+        """
+        Earliest run after now for each reason
+        returns: list of (time, reason)
+        """
+        runs = []
+        kickoffs = fixtures.kickoffs
+        playing = (
+            ~fixtures.finished
+            & (kickoffs <= now)
+            & (now < kickoffs + RefreshScheduler.MATCH_WINDOW)
+        )
+        if playing.any():
+            runs.append((now + RefreshScheduler.LIVE_INTERVAL, "live"))
+        upcoming = kickoffs[~fixtures.finished & (kickoffs > now)]
+        if len(upcoming) > 0:
+            runs.append((float(upcoming.min()), "kickoff"))
+        for event in data.get("events", []):
+            deadline = FixtureMatrix.epoch(event.get("deadline_time"))
+            if deadline + RefreshScheduler.DEADLINE_DELAY > now:
+                runs.append((deadline + RefreshScheduler.DEADLINE_DELAY, "deadline"))
+            in_event = fixtures.events == event["id"]
+            if event.get("data_checked", False) or not in_event.any():
+                continue
+            if not fixtures.finished[in_event].all() or playing[in_event].any():
+                continue
+            # Without kickoffs there is no telling when it settles, so it is
+            # left to the daily price run
+            if np.isnan(kickoffs[in_event]).all():
+                continue
+            last = np.nanmax(kickoffs[in_event]) + RefreshScheduler.MATCH_WINDOW
+            if now < last + RefreshScheduler.SETTLE_WINDOW:
+                runs.append((now + RefreshScheduler.SETTLE_INTERVAL, "settle"))
+        runs.append((RefreshScheduler.next_price_change(now), "prices"))
+        return runs
+
+    @staticmethod
+    def next_price_change(now: float):
+        today = datetime.fromtimestamp(now, timezone.utc).replace(
+            hour=RefreshScheduler.PRICE_TIME[0],
+            minute=RefreshScheduler.PRICE_TIME[1],
+            second=0,
+            microsecond=0,
+        )
+        if today.timestamp() <= now:
+            today += timedelta(days=1)
+        return today.timestamp()
+
+    @staticmethod
+    def next_run(data: dict, fixtures: FixtureMatrix, now=None):
+        """
+        returns: time, reason of the next refresh
+        """
+        now = time.time() if now is None else now
+        return min(RefreshScheduler.candidates(data, fixtures, now))
+
+    @staticmethod
+    def plan(data: dict, fixtures: FixtureMatrix, now=None, count=5):
+        """
+        The next count refreshes, assuming the calendar does not change
+        returns: list of (time, reason)
+        """
+        now = time.time() if now is None else now
+        runs = []
+        for _ in range(count):
+            now, reason = RefreshScheduler.next_run(data, fixtures, now)
+            runs.append((now, reason))
+        return runs
@@ -0,0 +1,153 @@
+import json
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Field -> (type, rounding). The API sends most decimals as strings, e.g. "0.45"
+DECIMAL = (float, 3)
+INTEGER = (int, None)
+
+ELEMENT_FIELDS = {
+    "now_cost": INTEGER,
+    "total_points": INTEGER,
+    "event_points": INTEGER,
+    "minutes": INTEGER,
+    "goals_scored": INTEGER,
+    "assists": INTEGER,
+    "clean_sheets": INTEGER,
+    "goals_conceded": INTEGER,
+    "bonus": INTEGER,
+    "bps": INTEGER,
+    "starts": INTEGER,
+    "transfers_in_event": INTEGER,
+    "transfers_out_event": INTEGER,
+    "selected_by_percent": DECIMAL,
+    "form": DECIMAL,
+    "points_per_game": DECIMAL,
+    "ep_next": DECIMAL,
+    "ep_this": DECIMAL,
+    "value_form": DECIMAL,
+    "value_season": DECIMAL,
+    "influence": DECIMAL,
+    "creativity": DECIMAL,
+    "threat": DECIMAL,
+    "ict_index": DECIMAL,
+    "expected_goals": DECIMAL,
+    "expected_assists": DECIMAL,
+    "expected_goal_involvements": DECIMAL,
+    "expected_goals_conceded": DECIMAL,
+}
+
+LIVE_FIELDS = {
+    "minutes": INTEGER,
+    "goals_scored": INTEGER,
+    "assists": INTEGER,
+    "clean_sheets": INTEGER,
+    "goals_conceded": INTEGER,
+    "own_goals": INTEGER,
+    "penalties_saved": INTEGER,
+    "penalties_missed": INTEGER,
+    "yellow_cards": INTEGER,
+    "red_cards": INTEGER,
+    "saves": INTEGER,
+    "bonus": INTEGER,
+    "bps": INTEGER,
+    "starts": INTEGER,
+    "total_points": INTEGER,
+    "influence": DECIMAL,
+    "creativity": DECIMAL,
+    "threat": DECIMAL,
+    "ict_index": DECIMAL,
+    "expected_goals": DECIMAL,
+    "expected_assists": DECIMAL,
+    "expected_goal_involvements": DECIMAL,
+    "expected_goals_conceded": DECIMAL,
+}
+
+TEAM_FIELDS = {
+    "strength": INTEGER,
+    "strength_overall_home": INTEGER,
+    "strength_overall_away": INTEGER,
+    "strength_attack_home": INTEGER,
+    "strength_attack_away": INTEGER,
+    "strength_defence_home": INTEGER,
+    "strength_defence_away": INTEGER,
+}
+
+FIXTURE_FIELDS = {
+    "event": INTEGER,
+    "team_h": INTEGER,
+    "team_a": INTEGER,
+    "team_h_score": INTEGER,
+    "team_a_score": INTEGER,
+    "team_h_difficulty": INTEGER,
+    "team_a_difficulty": INTEGER,
+}
+
+
+def loads(body):
+    """
+    Decode a JSON body, with orjson when it is installed
+    """
+    return orjson.loads(body) if orjson is not None else json.loads(body)
+
+
+def parse(records, fields, default=None):
+    """
+    Convert the declared fields of records that were sent as strings, in one
+    pass. Values that do not parse are kept, or replaced with default if one
+    is given. Fields that are not declared are left as they are
+    """
+    fields = list((k, kind, places) for k, (kind, places) in fields.items())
+    for record in records:
+        for k, kind, places in fields:
+            v = record.get(k)
+            if type(v) != str:
+                continue
+            try:
+                record[k] = round(kind(v), places) if places else kind(v)
+            except ValueError:
+                if default is not None:
+                    record[k] = default
+    return records
+
+
+def number(value):
+    """
+    A value as a float, NaN if it is missing or does not parse
+    """
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def columns(records, fields, default=None):
+    """
+    Parse the declared fields of records straight into one array per field,
+    without building a record per row. Fields that are not declared are
+    dropped. Numeric strings are converted by numpy in bulk, and a field
+    falls back to one value at a time only if some of its values do not
+    parse. Missing or unparsable values become default, or NaN if none is
+    given, and integer fields without NaNs come back as int64
+    returns: field -> array, in the order of records
+    """
+    parsed = {}
+    for k, (kind, places) in fields.items():
+        values = [record.get(k) for record in records]
+        try:
+            array = np.array(values, dtype=np.float64)
+        except (TypeError, ValueError):
+            array = np.array([number(v) for v in values], dtype=np.float64)
+        missing = np.isnan(array)
+        if default is not None:
+            array[missing] = default
+        if places:
+            array = np.round(array, places)
+        elif kind is int and (default is not None or not missing.any()):
+            array = array.astype(np.int64)
+        parsed[k] = array
+    return parsed
@@ -0,0 +1,189 @@
+from collections import OrderedDict
+from typing import NamedTuple
+import threading
+import numpy as np, pandas as pd
+from src import metrics
+from src.snapshot import PlayerTable
+
+
+class ScreenerQuery(NamedTuple):
+    """
+    Declarative player query, hashable so results can be cached. Built with
+    PlayerScreener.query
+    """
+
+    ranges: tuple = ()  # (column, low, high), inclusive, None for open
+    members: tuple = ()  # (column, frozenset of values)
+    ids: frozenset = None  # player ids to screen, None for all
+    sort: tuple = ()  # (column, ascending)
+    top: int = None
+
+
+class PlayerScreener:
+    """
+    Queries over the top players metrics of a snapshot. Every sortable
+    column is argsorted once, so a range filter is two binary searches, and
+    the categorical columns are held as one bitmap per value, so a membership
+    filter is a union of a few of them. The most selective range picks the
+    candidates and the other filters only check those. Screeners are kept
+    per snapshot and results per (snapshot, query)
+    """
+
+    CATEGORIES = ("Position", "Team")
+    SCREENERS = 4
+    CACHE_SIZE = 64
+    _screeners = OrderedDict()
+    _lock = threading.Lock()
+
+    def __init__(self, frame: pd.DataFrame):
+        self.ids = frame.index
+        self.values, self.order, self.sorted = {}, {}, {}
+        self.rank, self.missing = {}, {}
+        for column in frame.columns:
+            if column in PlayerScreener.CATEGORIES:
+                continue
+            values = frame[column].to_numpy()
+            if values.dtype == object and column != "Name":
+                continue
+            missing = pd.isna(values)
+            order = np.argsort(values, kind="stable")
+            self.values[column] = values
+            self.order[column] = order
+            self.sorted[column] = values[order]
+            self.missing[column] = missing
+            # Equal values share a rank, so sorts keep frame order among them
+            rank = np.zeros(len(values), dtype=np.intp)
+            rank[~missing] = np.searchsorted(
+                self.sorted[column][: (~missing).sum()], values[~missing]
+            )
+            self.rank[column] = rank
+        self.bitmaps = {}
+        for column in PlayerScreener.CATEGORIES:
+            values = frame[column].to_numpy()
+            self.bitmaps[column] = {
+                value: values == value for value in pd.unique(values)
+            }
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def query(
+        ranges=None, members=None, ids=None, sort=None, ascending=False, top=None
+    ):
+        """
+        Normalise a query
+        ranges: column -> (low, high), None for an open end
+        members: column -> allowed values, None to allow all
+        ids: player ids to screen, None for all
+        sort: column or list of columns, ascending applies to all
+        top: number of rows to keep, None for all
+        """
+        sort = [] if sort is None else [sort] if isinstance(sort, str) else sort
+        return ScreenerQuery(
+            tuple(
+                (column, low, high)
+                for column, (low, high) in sorted((ranges or {}).items())
+                if low is not None or high is not None
+            ),
+            tuple(
+                (column, frozenset(values))
+                for column, values in sorted((members or {}).items())
+                if values is not None
+            ),
+            None if ids is None else frozenset(int(pid) for pid in ids),
+            tuple((column, ascending) for column in sort),
+            top,
+        )
+
+    @staticmethod
+    def for_table(table: PlayerTable):
+        """
+        The screener of a snapshot's top players metrics, built once
+        """
+        with PlayerScreener._lock:
+            if table.version in PlayerScreener._screeners:
+                PlayerScreener._screeners.move_to_end(table.version)
+                return PlayerScreener._screeners[table.version]
+        screener = PlayerScreener(table.metrics)
+        with PlayerScreener._lock:
+            PlayerScreener._screeners[table.version] = screener
+            if len(PlayerScreener._screeners) > PlayerScreener.SCREENERS:
+                PlayerScreener._screeners.popitem(last=False)
+        return screener
+
+    @staticmethod
+    def screen(table: PlayerTable, query: ScreenerQuery):
+        """
+        Ids of the players of a snapshot matching query
+        """
+        return PlayerScreener.for_table(table).run(query)
+
+    def span(self, column: str, low, high):
+        """
+        Rows with low <= column <= high, in the column's order
+        """
+        values = self.sorted[column]
+        start = 0 if low is None else np.searchsorted(values, low, "left")
+        end = (
+            len(values) - self.missing[column].sum()
+            if high is None
+            else np.searchsorted(values, high, "right")
+        )
+        return self.order[column][start:end]
+
+    def run(self, query: ScreenerQuery):
+        """
+        returns: Index of the matching player ids, in frame order unless
+            the query sorts them
+        """
+        with self._lock:
+            if query in self._results:
+                self._results.move_to_end(query)
+                return self._results[query]
+        ids = self.ids[self.rows(query)]
+        with self._lock:
+            self._results[query] = ids
+            if len(self._results) > PlayerScreener.CACHE_SIZE:
+                self._results.popitem(last=False)
+        return ids
+
+    @metrics.timed("stage", stage="screen")
+    def rows(self, query: ScreenerQuery):
+        spans = sorted(
+            (
+                (self.span(column, low, high), column)
+                for column, low, high in query.ranges
+            ),
+            key=lambda span: len(span[0]),
+        )
+        rows = np.sort(spans[0][0]) if spans else np.arange(len(self.ids))
+        for column, low, high in query.ranges:
+            if column == spans[0][1]:
+                continue
+            values = self.values[column][rows]
+            keep = ~self.missing[column][rows]
+            if low is not None:
+                keep &= values >= low
+            if high is not None:
+                keep &= values <= high
+            rows = rows[keep]
+        for column, allowed in query.members:
+            bitmaps = self.bitmaps[column]
+            keep = np.zeros(len(rows), dtype=bool)
+            for value in allowed & bitmaps.keys():
+                keep |= bitmaps[value][rows]
+            rows = rows[keep]
+        if query.ids is not None:
+            rows = rows[self.ids[rows].isin(query.ids)]
+        if query.sort:
+            # Ranks sort like the values, missing values last either way
+            keys = [
+                np.where(
+                    self.missing[column][rows],
+                    len(self.ids),
+                    self.rank[column][rows] if ascending else -self.rank[column][rows],
+                )
+                for column, ascending in reversed(query.sort)
+            ]
+            rows = rows[np.lexsort(keys)]
+        return rows if query.top is None else rows[: query.top]
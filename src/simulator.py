@@ -0,0 +1,285 @@
+from concurrent.futures import ProcessPoolExecutor
+import itertools, multiprocessing, threading
+import numpy as np, pandas as pd
+from scipy.stats import binom
+from src import metrics
+from src.fixtures import FixtureMatrix
+from src.history import HistoryTensor
+from src.projection import ProjectionEngine
+from src.snapshot import PlayerTable
+
+
+class GameweekSimulator:
+    """
+    Monte Carlo points of a set of players in one GW. Each trial draws the
+    goals of every fixture from the sides' strengths, then per player an
+    appearance, 60+ minutes, goals and assists as a share of the team's
+    goals, and bonus, at the player's per GW rates so far, and scores them
+    by the FPL rules. Trials run in fixed-size chunks, each seeded from one
+    root seed, so results do not depend on how chunks are spread over
+    processes. A player scores or assists at most 3 times per fixture
+    """
+
+    ASSIST_POINTS = 3
+    CONCEDED_PENALTY = np.array([1, 1, 0, 0])  # lost per 2 goals conceded
+    MAX_GOALS = 10  # team goals per fixture, more count as this many
+    MAX_EVENTS = 3  # goals or assists of one player per fixture
+    CHUNK = 10_000
+    _pools = {}
+    _lock = threading.Lock()
+
+    def __init__(
+        self,
+        table: PlayerTable,
+        fixtures: FixtureMatrix,
+        history: HistoryTensor,
+        ids,
+        gw=None,
+    ):
+        self.ids = pd.Index(ids)
+        self.gw = ProjectionEngine.next_gw(fixtures) if gw is None else gw
+        players = table.players.loc[self.ids]
+        self.position = players["position"].to_numpy()
+        rows = fixtures._rows(players["team"].to_numpy())
+        # Unplayed fixtures of the GW, and each player's (up to two) of them
+        selected = np.flatnonzero(fixtures.unplayed & (fixtures.events == self.gw))
+        self.goals = ProjectionEngine.expected_goals(fixtures)[selected]
+        home = fixtures.home_rows[selected][None, :] == rows[:, None]
+        away = fixtures.away_rows[selected][None, :] == rows[:, None]
+        playing = home | away
+        slots = int(playing.sum(axis=1).max()) if playing.size > 0 else 0
+        order = np.argsort(~playing, axis=1, kind="stable")[:, :slots]
+        self.fixture = order
+        self.side = np.take_along_axis(away, order, axis=1).astype(np.intp)
+        self.valid = np.take_along_axis(playing, order, axis=1)
+        (
+            self.appear,
+            self.long_game,
+            self.goal_share,
+            self.assist_share,
+            self.bonus,
+        ) = GameweekSimulator.rates(history, self.ids, self.gw)
+        # Points so far in the GW, of players whose team has kicked off in it
+        self.banked = GameweekSimulator.banked(history, self.ids, self.gw)
+        if self.gw > 0:
+            column = self.gw - 1
+            self.banked *= fixtures.count[rows, column] > fixtures.pending[rows, column]
+        self.goal_tails = GameweekSimulator.tails(self.goal_share)
+        self.assist_tails = GameweekSimulator.tails(self.assist_share)
+
+    @staticmethod
+    def rates(history: HistoryTensor, ids, gw: int):
+        """
+        Per player from the GWs before gw: chance of an appearance, of 60+
+        minutes once on, expected share of the team's goals and assists when
+        on (against the league average team), and chances of at least 1, 2
+        and 3 bonus points when on. Players without history never appear
+        """
+        known = np.array([int(pid) in history.rows for pid in ids], dtype=bool)
+        rows = [history.rows[int(pid)] for pid in np.asarray(ids)[known]]
+        last = max(gw - 1, 0)
+        values = np.asarray(history.values[rows, :last])
+
+        def field(name):
+            return values[..., history.fields[name]]
+
+        minutes = field("minutes")
+        games = np.asarray(history.mask[rows, :last]).sum(axis=1)
+        on = minutes > 0
+        appeared = on.sum(axis=1)
+
+        def per(counts, total):
+            return np.divide(counts, total, out=np.zeros(len(counts)), where=total > 0)
+
+        average = ProjectionEngine.GOALS_PER_TEAM
+        rates = [
+            per(appeared, games),
+            per((minutes >= 60).sum(axis=1), appeared),
+            np.minimum(per(field("expected_goals").sum(axis=1), appeared) / average, 1),
+            np.minimum(
+                per(field("expected_assists").sum(axis=1), appeared) / average, 1
+            ),
+            np.stack(
+                [
+                    per((on & (field("bonus") >= k)).sum(axis=1), appeared)
+                    for k in (1, 2, 3)
+                ],
+                axis=1,
+            ),
+        ]
+        full = [np.zeros((len(ids),) + rate.shape[1:]) for rate in rates]
+        for rate, values in zip(full, rates):
+            rate[known] = values
+        return full
+
+    @staticmethod
+    def banked(history: HistoryTensor, ids, gw: int):
+        """
+        Points already scored in gw per player, as far as the history has it
+        """
+        points = np.zeros(len(ids), dtype=np.int16)
+        if gw < 1:
+            return points
+        for i, pid in enumerate(ids):
+            if int(pid) in history.rows:
+                points[i] = history.series("total_points", int(pid))[gw - 1]
+        return points
+
+    @staticmethod
+    def tails(share: np.ndarray):
+        """
+        Chances of a player getting at least 1, 2, ... MAX_EVENTS of n team
+        goals at share each, for n = 0..MAX_GOALS
+        returns: MAX_EVENTS x (MAX_GOALS + 1) * players, n major
+        """
+        goals = np.arange(GameweekSimulator.MAX_GOALS + 1)[:, None]
+        return np.stack(
+            [
+                binom.sf(k - 1, goals, share[None, :]).ravel()
+                for k in range(1, GameweekSimulator.MAX_EVENTS + 1)
+            ]
+        ).astype(np.float32)
+
+    @staticmethod
+    def count(draw: np.ndarray, tails: np.ndarray, cells: np.ndarray):
+        """
+        Events per draw, given the chances of at least 1, 2, ... of them
+        (rows of tails) for each cell. The chances are nested, so each level
+        only checks the draws that reached the one before
+        """
+        draw, cells = draw.ravel(), cells.ravel()
+        total = (draw < tails[0].take(cells)).astype(np.int16)
+        hit = np.flatnonzero(total)
+        for tail in tails[1:]:
+            hit = hit[draw[hit] < tail.take(cells[hit])]
+            total[hit] += 1
+        return total
+
+    def sample(self, trials: int, rng: np.random.Generator):
+        """
+        Points of every player in each of trials draws, on top of those
+        banked. Binomial draws are read off the tail tables with one uniform
+        draw each
+        returns: trials x players
+        """
+        shape = (trials, len(self.ids))
+        columns = np.arange(len(self.ids), dtype=np.int32)
+        points = np.repeat(self.banked[None, :], trials, axis=0)
+        goals = rng.poisson(self.goals, size=(trials,) + self.goals.shape)
+        goals = np.minimum(goals, GameweekSimulator.MAX_GOALS).astype(np.int16)
+        appear = self.appear.astype(np.float32)
+        long_game = (self.appear * self.long_game).astype(np.float32)
+        bonus = self.bonus.T.astype(np.float32)
+        goal_points = ProjectionEngine.GOAL_POINTS.astype(np.int16)[self.position]
+        clean_sheet_points = ProjectionEngine.CLEAN_SHEET_POINTS.astype(np.int16)[
+            self.position
+        ]
+        penalty = GameweekSimulator.CONCEDED_PENALTY.astype(np.int16)[self.position]
+        for slot in range(self.fixture.shape[1]):
+            fixture, side = self.fixture[:, slot], self.side[:, slot]
+            scored = goals[:, fixture, side]
+            conceded = goals[:, fixture, 1 - side]
+            cells = scored.astype(np.int32) * len(self.ids) + columns
+            draw = rng.random(shape, dtype=np.float32)
+            on = draw < appear
+            played_long = draw < long_game
+            own, assists, bonuses = (
+                GameweekSimulator.count(
+                    rng.random(shape, dtype=np.float32), tails, where
+                ).reshape(shape)
+                for tails, where in (
+                    (self.goal_tails, cells),
+                    (self.assist_tails, cells),
+                    (bonus, np.broadcast_to(columns, shape)),
+                )
+            )
+            score = (
+                own * goal_points
+                + assists * GameweekSimulator.ASSIST_POINTS
+                + bonuses
+                + 1
+            ) * on
+            score += played_long * (
+                1 + clean_sheet_points * (conceded == 0) - penalty * (conceded // 2)
+            )
+            points += score * self.valid[:, slot]
+        return points
+
+    def _chunk(self, weights: np.ndarray, trials: int, seed: np.random.SeedSequence):
+        points = self.sample(trials, np.random.default_rng(seed))
+        return points @ weights
+
+    @staticmethod
+    def pool(processes: int):
+        """
+        Worker processes shared by all simulations, started once per size.
+        Spawned rather than forked, as the dashboard runs threads
+        """
+        with GameweekSimulator._lock:
+            if processes not in GameweekSimulator._pools:
+                GameweekSimulator._pools[processes] = ProcessPoolExecutor(
+                    processes, mp_context=multiprocessing.get_context("spawn")
+                )
+            return GameweekSimulator._pools[processes]
+
+    @metrics.timed("stage", stage="simulate")
+    def run(self, weights, trials=100_000, seed=0, processes=None):
+        """
+        Weighted sums of the players' points per trial, e.g. a squad's total
+        for each captain choice. With processes > 1 the chunks are spread over
+        a pool of that many processes, with the same results
+        weights: players x K
+        returns: trials x K
+        """
+        weights = np.asarray(weights, dtype=np.float64)
+        chunk = GameweekSimulator.CHUNK
+        sizes = [min(chunk, trials - start) for start in range(0, trials, chunk)]
+        seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+        if processes is None or processes <= 1:
+            parts = list(map(self._chunk, itertools.repeat(weights), sizes, seeds))
+        else:
+            pool = GameweekSimulator.pool(processes)
+            parts = list(pool.map(self._chunk, itertools.repeat(weights), sizes, seeds))
+        return (
+            np.concatenate(parts)
+            if len(parts) > 0
+            else np.zeros((0,) + weights.shape[1:])
+        )
+
+    def captaincy(
+        self, xi, effective=None, trials=100_000, seed=0, processes=None, targets=()
+    ):
+        """
+        Distribution of the XI's points for each captain in it, and the
+        points gained on a field of managers owning each player (effective,
+        player id -> mean multiplier, e.g. 1.3 if all own and 30 % captain).
+        The XI is taken as picked, without automatic substitutions
+        returns: DataFrame per captain id, best expected gain (or points
+        without a field) first
+        """
+        xi = pd.Index(xi)
+        columns = self.ids.get_indexer(xi)
+        weights = np.zeros((len(self.ids), len(xi) + 1))
+        weights[columns, : len(xi)] = 1
+        weights[columns, np.arange(len(xi))] += 1
+        if effective is not None:
+            weights[:, -1] = effective.reindex(self.ids).fillna(0).to_numpy()
+        totals = self.run(weights, trials, seed, processes)
+        mine = totals[:, :-1]
+        frame = pd.DataFrame(
+            {
+                "xPts": mine.mean(axis=0),
+                "Std": mine.std(axis=0),
+                "P10": np.percentile(mine, 10, axis=0),
+                "Median": np.median(mine, axis=0),
+                "P90": np.percentile(mine, 90, axis=0),
+                **{f"P(≥{x})": (mine >= x).mean(axis=0) for x in targets},
+            },
+            index=pd.Index(xi, name="id"),
+        )
+        if effective is None:
+            return frame.sort_values(by=["xPts"], ascending=False).round(3)
+        gain = mine - totals[:, -1:]
+        frame["xGain"] = gain.mean(axis=0)
+        frame["P(Gain > 0)"] = (gain > 0).mean(axis=0)
+        return frame.sort_values(by=["xGain"], ascending=False).round(3)
@@ -0,0 +1,165 @@
+import numpy as np, pandas as pd
+from src import metrics
+
+POSITIONS = ["GK", "DEF", "MID", "FWD"]
+
+
+class PlayerTable:
+    """
+    Columnar snapshot of all players, one row per player id
+    """
+
+    STATS = {
+        "now_cost": np.int16,
+        "total_points": np.int16,
+        "minutes": np.int32,
+        "bps": np.int32,
+        "bonus": np.int16,
+        "goals_scored": np.int16,
+        "assists": np.int16,
+        "starts": np.int16,
+        "games_played": np.int16,
+        "games_w_bonus": np.int16,
+        "games_started": np.int16,
+        "selected_by_percent": np.float64,
+        "points_per_game": np.float64,
+        "ict_index": np.float64,
+        "expected_goals": np.float64,
+        "expected_assists": np.float64,
+        "expected_goal_involvements": np.float64,
+        "gi_per_goal_scored": np.float64,
+        "minutes_per_game": np.float64,
+        "bonus_per_game": np.float64,
+        "bonus_chance": np.float64,
+        "starts_per_game": np.float64,
+        "form_per_cost": np.float64,
+        "minutes_per_xgi": np.float64,
+    }
+    TEAM_STATS = {
+        "goals_scored": np.int16,
+        "goals_conceded": np.int16,
+        "clean_sheets": np.int16,
+        "fixture_score": np.float64,
+    }
+
+    def __init__(self, players: pd.DataFrame, teams: pd.DataFrame):
+        self.players = players
+        self.teams = teams
+        self.rows = {name: row for row, name in enumerate(players["name_with_team"])}
+        self.version = "%016x" % (
+            pd.util.hash_pandas_object(players).sum()
+            ^ pd.util.hash_pandas_object(teams).sum()
+        )
+        self.metrics = self.derive()
+        self.metric_names = players["name_with_team"].reindex(self.metrics.index)
+
+    def __len__(self):
+        return len(self.players)
+
+    @staticmethod
+    @metrics.timed("stage", stage="player_table")
+    def from_players(players: dict, teams: dict):
+        """
+        Build the table from the players and teams dicts of FPLQuerier
+        """
+        stats = [player["stats"] for player in players.values()]
+        columns = {
+            "name": pd.array([p["name"] for p in players.values()], dtype="string"),
+            "name_with_team": pd.array(
+                [p["name_with_team"] for p in players.values()], dtype="string"
+            ),
+            "team": np.array([s["team"] for s in stats], dtype=np.int8),
+            "position": np.clip(
+                np.array([s["element_type"] - 1 for s in stats], dtype=np.int8), 0, 3
+            ),
+            "news": pd.array([s.get("news", "") for s in stats], dtype="string"),
+        }
+        for name, dtype in PlayerTable.STATS.items():
+            columns[name] = np.array([s.get(name, 0) for s in stats], dtype=dtype)
+        players = pd.DataFrame(
+            columns,
+            index=pd.Index(np.fromiter(players.keys(), dtype=np.int32), name="id"),
+        )
+        team_columns = {
+            "name": pd.array([t["name"] for t in teams.values()], dtype="string"),
+            "code": pd.array([t["code"] for t in teams.values()], dtype="string"),
+        }
+        for name, dtype in PlayerTable.TEAM_STATS.items():
+            team_columns[name] = np.array(
+                [t.get(name, 0) for t in teams.values()], dtype=dtype
+            )
+        teams = pd.DataFrame(
+            team_columns,
+            index=pd.Index(np.fromiter(teams.keys(), dtype=np.int8), name="id"),
+        )
+        return PlayerTable(players, teams)
+
+    def take(self, names):
+        """
+        Rows of the players with the given names (name_with_team)
+        """
+        return self.players.iloc[
+            [self.rows[name] for name in names if name in self.rows]
+        ]
+
+    def team_column(self, name: str, players: pd.DataFrame = None):
+        """
+        Team attribute aligned with the rows of players
+        """
+        players = self.players if players is None else players
+        return self.teams[name].reindex(players["team"]).to_numpy()
+
+    def position_names(self, players: pd.DataFrame = None):
+        players = self.players if players is None else players
+        return np.array(POSITIONS, dtype=object)[players["position"].to_numpy()]
+
+    def derive(self):
+        """
+        Derived metrics shown in the top players table, sorted by name
+        """
+        players = self.players
+        total_pts = players["total_points"].to_numpy()
+        minutes = players["minutes"].to_numpy()
+        selected_by = players["selected_by_percent"].to_numpy()
+        cost = np.round(players["now_cost"].to_numpy() / 10.0, 3)
+        points_per_min = np.divide(
+            total_pts, minutes, out=np.zeros(len(players)), where=minutes > 0
+        )
+        minutes_per_game = players["minutes_per_game"].round(3).to_numpy()
+        xpoints = points_per_min * 38 * minutes_per_game
+        metrics = pd.DataFrame(
+            {
+                "Name": players["name"].to_numpy(dtype=object),
+                "Team": self.team_column("name"),
+                "Points": total_pts,
+                "Minutes/Game": minutes_per_game,
+                "xPoints": xpoints,
+                "xPoints/Cost": xpoints / cost,
+                "BPS": players["bps"].to_numpy(),
+                "Selected By": selected_by,
+                "Differential": total_pts * (1 - (selected_by / 100.0)),
+                "Team Clean Sheets": self.team_column("clean_sheets"),
+                "Fixture Score": self.team_column("fixture_score"),
+                "Position": self.position_names(),
+                "Price": cost,
+                "Bonus/Game": players["bonus_per_game"].round(2).to_numpy(),
+                "Bonus %": (100 * players["bonus_chance"]).astype(int).to_numpy(),
+                "Goals": players["goals_scored"].to_numpy(),
+                "xG": players["expected_goals"].to_numpy(),
+                "Assists": players["assists"].to_numpy(),
+                "xA": players["expected_assists"].to_numpy(),
+                "GI": (players["goals_scored"] + players["assists"]).to_numpy(),
+                "xGI": players["expected_goal_involvements"].to_numpy(),
+                "Team Goals": self.team_column("goals_scored"),
+                "Team GI %": (100 * players["gi_per_goal_scored"]).round(1).to_numpy(),
+                "ICT": players["ict_index"].round(2).to_numpy(),
+                "Minutes": minutes,
+                "Minutes/xGI": players["minutes_per_xgi"].round(2).to_numpy(),
+                "Form": players["points_per_game"].to_numpy(),
+                "Form/Cost": players["form_per_cost"].to_numpy(),
+                "Starts/Game": players["starts_per_game"].to_numpy(),
+                "News": players["news"].to_numpy(dtype=object),
+            },
+            index=players.index,
+        )
+        return metrics.sort_values(by=["Name"], ascending=True)
@@ -0,0 +1,148 @@
+import hashlib, json, os
+import numpy as np, pandas as pd
+from src.fixtures import FixtureMatrix
+
+
+class ElementSummaries:
+    """
+    Past seasons of every player from the element summaries, one file per
+    player on disk. A player is fetched again only when their status or news
+    change, or when another of their team's fixtures finishes
+    """
+
+    FINGERPRINT_FIELDS = ("code", "team", "status", "news")
+    PAST_FIELDS = (
+        "season_name",
+        "start_cost",
+        "end_cost",
+        "total_points",
+        "minutes",
+        "goals_scored",
+        "assists",
+        "clean_sheets",
+        "bonus",
+        "expected_goals",
+        "expected_assists",
+        "expected_goal_involvements",
+    )
+
+    def __init__(self, directory: str, previous=None):
+        self.directory = directory
+        self.fingerprints = dict(previous.fingerprints) if previous else {}
+        self.past = dict(previous.past) if previous else {}
+        self.version = previous.version if previous else 0
+        self._baselines = None
+
+    def __len__(self):
+        return len(self.fingerprints)
+
+    @staticmethod
+    def finished(fixtures: FixtureMatrix):
+        """
+        Ids of the finished fixtures per team id
+        """
+        return {
+            int(tid): fixtures.ids[
+                fixtures.finished
+                & ((fixtures.home_rows == row) | (fixtures.away_rows == row))
+            ].tolist()
+            for row, tid in enumerate(fixtures.team_ids)
+        }
+
+    @staticmethod
+    def fingerprint(element: dict, finished: dict):
+        fields = [element.get(k) for k in ElementSummaries.FINGERPRINT_FIELDS]
+        fields.append(finished.get(element.get("team"), []))
+        return hashlib.sha1(json.dumps(fields).encode()).hexdigest()[:16]
+
+    def path(self, pid: int):
+        return os.path.join(self.directory, f"{pid}.json")
+
+    def stale(self, elements: list, fixtures: FixtureMatrix):
+        """
+        Players of the bootstrap whose summary is missing or out of date, in
+        memory or on disk. Up to date ones found on disk are loaded
+        returns: player id -> fingerprint
+        """
+        stale, finished = {}, ElementSummaries.finished(fixtures)
+        for element in elements:
+            pid = element["id"]
+            fingerprint = ElementSummaries.fingerprint(element, finished)
+            if self.fingerprints.get(pid) == fingerprint:
+                continue
+            try:
+                with open(self.path(pid)) as f:
+                    record = json.load(f)
+            except (OSError, ValueError):
+                record = None
+            if record is not None and record["fingerprint"] == fingerprint:
+                self.set(pid, record)
+            else:
+                stale[pid] = fingerprint
+        return stale
+
+    def set(self, pid: int, record: dict):
+        self.fingerprints[pid] = record["fingerprint"]
+        self.past[pid] = record["history_past"]
+        self._baselines = None
+
+    def add(self, pid: int, fingerprint: str, data: dict):
+        """
+        Keep the parts of a fetched summary the views use and write them to
+        the player's file
+        """
+        record = {
+            "fingerprint": fingerprint,
+            "history_past": [
+                {k: x.get(k) for k in ElementSummaries.PAST_FIELDS}
+                for x in data.get("history_past", [])
+            ],
+        }
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.path(pid) + ".tmp", "w") as f:
+            json.dump(record, f)
+        os.replace(self.path(pid) + ".tmp", self.path(pid))
+        self.set(pid, record)
+
+    def retain(self, ids):
+        """
+        Drop players no longer in the bootstrap
+        """
+        ids = set(ids)
+        for store in (self.fingerprints, self.past):
+            for pid in [pid for pid in store if pid not in ids]:
+                del store[pid]
+        self._baselines = None
+
+    def baselines(self):
+        """
+        Last season's totals and per 90 rates per player id, NaN for players
+        without one
+        """
+        if self._baselines is not None:
+            return self._baselines
+        ids = np.fromiter(self.past.keys(), dtype=np.int32, count=len(self.past))
+        last = [
+            seasons[-1] if len(seasons) > 0 else {} for seasons in self.past.values()
+        ]
+
+        def column(field):
+            return np.array(
+                [float(x.get(field) or 0) if x else np.nan for x in last],
+                dtype=np.float64,
+            )
+
+        minutes = column("minutes")
+        per_90 = 90 / np.where(minutes > 0, minutes, np.nan)
+        self._baselines = pd.DataFrame(
+            {
+                "Last Season Pts": column("total_points"),
+                "Last Season Pts/90": np.round(column("total_points") * per_90, 2),
+                "Last Season xGI/90": np.round(
+                    column("expected_goal_involvements") * per_90, 2
+                ),
+                "Last Season Minutes": minutes,
+            },
+            index=pd.Index(ids, name="id"),
+        )
+        return self._baselines
@@ -0,0 +1,189 @@
+import os, sqlite3, threading, time
+import numpy as np, pandas as pd
+
+
+class TrendStore:
+    """
+    Append-only history of the bootstrap fields that move between GWs, one
+    SQLite file per season. Each append stores only the (player, field)
+    values that changed since the last one, keyed by (field, player, time)
+    so a player's series is one index range and the value at any time one
+    index seek
+    """
+
+    FIELDS = (
+        "now_cost",
+        "selected_by_percent",
+        "transfers_in_event",
+        "transfers_out_event",
+        "status",
+        "news",
+    )
+
+    _stores = {}
+    _stores_lock = threading.Lock()
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS changes (
+                field INTEGER NOT NULL,
+                player INTEGER NOT NULL,
+                at INTEGER NOT NULL,
+                value,
+                PRIMARY KEY (field, player, at)
+            ) WITHOUT ROWID
+            """)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS appends (
+                at INTEGER PRIMARY KEY,
+                changes INTEGER NOT NULL
+            )
+            """)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS players (player INTEGER PRIMARY KEY)"
+        )
+        self._db.commit()
+        # Latest value per field and player, to diff the next append against
+        self.state = {
+            field: self.at(fields=[field])[field].to_dict()
+            for field in TrendStore.FIELDS
+        }
+
+    @staticmethod
+    def open(path: str):
+        """
+        The store at path, shared by every caller in the process
+        """
+        with TrendStore._stores_lock:
+            if path not in TrendStore._stores:
+                TrendStore._stores[path] = TrendStore(path)
+            return TrendStore._stores[path]
+
+    @staticmethod
+    def seconds(when):
+        """
+        Epoch seconds of a number, datetime or date string
+        """
+        if isinstance(when, (int, float, np.number)):
+            return int(when)
+        when = pd.Timestamp(when)
+        if when.tzinfo is None:
+            when = when.tz_localize("UTC")
+        return int(when.timestamp())
+
+    def append(self, elements: list, at=None):
+        """
+        Record the fields of the bootstrap elements that changed since the
+        last append. Players that left the bootstrap get None
+        returns: number of values written
+        """
+        at = int(time.time()) if at is None else TrendStore.seconds(at)
+        current = {element["id"]: element for element in elements}
+        rows = []
+        for code, field in enumerate(TrendStore.FIELDS):
+            known = self.state[field]
+            for pid, element in current.items():
+                value = element.get(field)
+                if value is None and pid not in known:
+                    continue
+                if pid not in known or known[pid] != value:
+                    rows.append((code, pid, at, value))
+            rows += [(code, pid, at, None) for pid in known if pid not in current]
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO changes VALUES (?, ?, ?, ?)", rows
+            )
+            self._db.executemany(
+                "INSERT OR IGNORE INTO players VALUES (?)",
+                [(pid,) for pid in current],
+            )
+            self._db.execute(
+                "INSERT OR REPLACE INTO appends VALUES (?, ?)", (at, len(rows))
+            )
+            self._db.commit()
+            for code, pid, _, value in rows:
+                field = TrendStore.FIELDS[code]
+                if value is None:
+                    self.state[field].pop(pid, None)
+                else:
+                    self.state[field][pid] = value
+        return len(rows)
+
+    def times(self):
+        """
+        Times of every append, oldest first
+        """
+        with self._lock:
+            rows = self._db.execute("SELECT at FROM appends ORDER BY at").fetchall()
+        return pd.to_datetime([at for (at,) in rows], unit="s", utc=True)
+
+    def at(self, when=None, fields=None):
+        """
+        Value of fields (all by default) for every player as of when (the
+        latest by default)
+        returns: DataFrame indexed by player id, NaN where unknown
+        """
+        fields = TrendStore.FIELDS if fields is None else fields
+        when = 2**62 if when is None else TrendStore.seconds(when)
+        columns = {}
+        with self._lock:
+            for field in fields:
+                rows = self._db.execute(
+                    "SELECT player, (SELECT value FROM changes WHERE field = ? "
+                    "AND player = players.player AND at <= ? "
+                    "ORDER BY at DESC LIMIT 1) FROM players",
+                    (TrendStore.FIELDS.index(field), when),
+                ).fetchall()
+                columns[field] = {
+                    pid: value for pid, value in rows if value is not None
+                }
+        frame = pd.DataFrame(columns, columns=list(fields))
+        frame.index = frame.index.astype(np.int32).rename("id")
+        return frame.sort_index()
+
+    def series(self, pid: int, field: str, start=None, end=None):
+        """
+        Values of one field of a player from start to end: the value as of
+        start followed by every change up to end
+        returns: Series indexed by time (UTC)
+        """
+        code = TrendStore.FIELDS.index(field)
+        start = 0 if start is None else TrendStore.seconds(start)
+        end = 2**62 if end is None else TrendStore.seconds(end)
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT at, value FROM (SELECT at, value FROM changes "
+                "WHERE field = ? AND player = ? AND at <= ? "
+                "ORDER BY at DESC LIMIT 1) "
+                "UNION ALL SELECT at, value FROM changes "
+                "WHERE field = ? AND player = ? AND at > ? AND at <= ? ORDER BY at",
+                (code, pid, start, code, pid, start, end),
+            ).fetchall()
+        index = pd.to_datetime([max(at, start) for at, _ in rows], unit="s", utc=True)
+        return pd.Series([value for _, value in rows], index=index, name=field)
+
+    def changes(self, field: str, start=None, end=None):
+        """
+        Every change of field between start and end across players, with
+        the value before it, e.g. price rises and falls
+        returns: DataFrame of id, at, before, after
+        """
+        code = TrendStore.FIELDS.index(field)
+        start = 0 if start is None else TrendStore.seconds(start)
+        end = 2**62 if end is None else TrendStore.seconds(end)
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT player, at, before, value FROM (SELECT player, at, value, "
+                "LAG(value) OVER (PARTITION BY player ORDER BY at) AS before "
+                "FROM changes WHERE field = ? AND at <= ?) "
+                "WHERE at > ? AND before IS NOT NULL ORDER BY at, player",
+                (code, end, start),
+            ).fetchall()
+        frame = pd.DataFrame(rows, columns=["id", "at", "before", "after"])
+        frame["at"] = pd.to_datetime(frame["at"], unit="s", utc=True)
+        return frame
@@ -0,0 +1,199 @@
+from collections import OrderedDict
+import threading
+import numpy as np, pandas as pd
+from src.data import FPLData
+from src.form import FormEngine
+from src.optimiser import SquadOptimiser
+from src.projection import ProjectionEngine
+from src.querier import FPLQuerier
+from src.screener import PlayerScreener, ScreenerQuery
+
+
+class FPLViews:
+    """
+    Tables behind the dashboard sections, computed from a snapshot without
+    any UI so scripts and workers can build them too
+    """
+
+    FRAMES = 4
+    _frames = OrderedDict()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def metrics(table, fixtures):
+        """
+        Top players metrics of a snapshot joined with the projections, built
+        once per snapshot, and the row of each name in it
+        returns: frame, name -> row
+        """
+        key = (table.version, fixtures.version)
+        with FPLViews._lock:
+            if key in FPLViews._frames:
+                FPLViews._frames.move_to_end(key)
+                return FPLViews._frames[key]
+        projected = ProjectionEngine.frame(table, fixtures)
+        frame = table.metrics.join(projected.reindex(table.metrics.index))
+        rows = {name: row for row, name in enumerate(table.metric_names)}
+        with FPLViews._lock:
+            FPLViews._frames[key] = frame, rows
+            if len(FPLViews._frames) > FPLViews.FRAMES:
+                FPLViews._frames.popitem(last=False)
+        return frame, rows
+
+    @staticmethod
+    def rows(fpl: FPLData, players: list):
+        """
+        Rows of the named players in the top players metrics, in their order
+        """
+        names = FPLViews.metrics(fpl.table, fpl.fixtures)[1]
+        return np.unique(
+            np.fromiter((names[name] for name in players if name in names), np.intp)
+        )
+
+    @staticmethod
+    def top_players(
+        fpl: FPLData, players: list, form_window=None, query: ScreenerQuery = None
+    ):
+        """
+        Top players metrics of the named players matching query (all without
+        one) with projected points, Form and Form/Cost over the last
+        form_window GWs (None for the season), last season's baselines once
+        the element summaries are in and the league columns once a league is
+        loaded
+        """
+        table = fpl.table
+        frame = FPLViews.metrics(table, fpl.fixtures)[0]
+        named = np.zeros(len(frame), dtype=bool)
+        named[FPLViews.rows(fpl, players)] = True
+        if query is None:
+            rows = np.flatnonzero(named)
+        else:
+            # Screened without the names or top, so reruns share the result
+            ids = PlayerScreener.screen(table, query._replace(top=None))
+            rows = frame.index.get_indexer(ids)
+            rows = rows[named[rows]][: query.top]
+        df = frame.iloc[rows]
+        if form_window is not None:
+            form = FormEngine.window(fpl.history, table, form_window)
+            df = df.assign(
+                **{
+                    "Form": form["points_per_game"].reindex(df.index).to_numpy(),
+                    "Form/Cost": form["points_per_cost"].reindex(df.index).to_numpy(),
+                }
+            )
+        if fpl.summaries is not None:
+            df = df.join(fpl.summaries.baselines().reindex(df.index))
+        if fpl.ownership is not None:
+            mine = {
+                int(x["element"]): x.get("multiplier", 1)
+                for x in (fpl.manager_team or {}).get("team", [])
+            }
+            points = table.players["points_per_game"].to_numpy()
+            ownership = fpl.ownership.frame(mine, points)
+            df = df.join(ownership.reindex(df.index))
+        return df
+
+    @staticmethod
+    def scores(fpl: FPLData, metric: str, form_window=None):
+        """
+        A top players metric or projection per player id, to optimise on.
+        Form and Form/Cost are over the last form_window GWs if given
+        """
+        table = fpl.table
+        if metric in ("Form", "Form/Cost") and form_window is not None:
+            form = FormEngine.window(fpl.history, table, form_window)
+            column = "points_per_game" if metric == "Form" else "points_per_cost"
+            return form[column].reindex(table.metrics.index).fillna(0)
+        if metric in table.metrics:
+            return table.metrics[metric]
+        projected = ProjectionEngine.frame(table, fpl.fixtures)
+        return projected[metric].reindex(table.metrics.index)
+
+    @staticmethod
+    def field_ownership(fpl: FPLData, min_ownership=0.05):
+        """
+        Mean multiplier per player id of the managers to beat: the loaded
+        league's, else overall selection counted for the 11 of 15 players who
+        start (without captaincy). Players under min_ownership are left out
+        """
+        if fpl.ownership is not None:
+            ownership = fpl.ownership
+            effective = pd.Series(
+                ownership.effective / max(ownership.managers, 1), ownership.ids
+            )
+        else:
+            selected = fpl.table.players["selected_by_percent"] / 100
+            effective = selected * 11 / sum(SquadOptimiser.QUOTAS)
+        return effective[effective >= min_ownership]
+
+    @staticmethod
+    def trends(fpl: FPLData, pid: int, start=None, end=None):
+        """
+        Price and ownership of a player from start to end, one row per
+        change of either
+        """
+        store = FPLQuerier.get_trends(fpl.data)
+        price = pd.to_numeric(store.series(pid, "now_cost", start, end)) / 10.0
+        owned = pd.to_numeric(store.series(pid, "selected_by_percent", start, end))
+        df = pd.concat([price.rename("Price"), owned.rename("Selected By")], axis=1)
+        return df.sort_index().ffill()
+
+    @staticmethod
+    def current_gw(fpl: FPLData):
+        """
+        The GW in progress or last played, 0 before the season starts. The
+        snapshot's curr_gw is the first GW without live data, 0 once all have
+        """
+        if fpl.curr_gw > 0:
+            return fpl.curr_gw - 1
+        return len(fpl.data.get("events", []))
+
+    @staticmethod
+    def total_xpoints(fpl: FPLData, players: list):
+        rows = FPLViews.rows(fpl, players)
+        return fpl.table.metrics["xPoints"].iloc[rows].sum()
+
+    @staticmethod
+    def teams(fpl: FPLData):
+        """
+        Strength, fixture score and goals per team
+        """
+        columns = [
+            "Name",
+            "Strength Home",
+            "Strength Away",
+            "Fixture Score",
+            "Goals Scored",
+            "Goals Conceded",
+        ]
+        results = []
+        for t1, info in fpl.teams_by_name.items():
+            results.append(
+                [
+                    t1,
+                    info["strength_home"],
+                    info["strength_away"],
+                    info["fixture_score"],
+                    info["goals_scored"],
+                    info["goals_conceded"],
+                ]
+            )
+        return pd.DataFrame(results, columns=columns).sort_values(
+            by=["Name"], ascending=False
+        )
+
+    @staticmethod
+    def bench_boost(fpl: FPLData, teams: list):
+        """
+        Upcoming GWs by the summed difficulty of the named teams, easiest first
+        returns: list of (gw, difficulty)
+        """
+        upcoming = fpl.fixtures.upcoming([fpl.teams_by_name[t]["id"] for t in teams])
+        totals = np.nansum(upcoming, axis=0)
+        return sorted(
+            [
+                (int(gw) + 1, round(float(totals[gw]), 2))
+                for gw in np.flatnonzero(~np.isnan(upcoming).all(axis=0))
+            ],
+            key=lambda x: x[1],
+        )
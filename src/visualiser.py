@@ -1,6 +1,17 @@
-import streamlit as st, pandas as pd
+import streamlit as st, pandas as pd, numpy as np
+import os
+from src import metrics
 from src.querier import FPLQuerier
 from src.data import FPLData
+from src.league import LeagueTable
+from src.live import LiveGameweek, LiveLeague
+from src.optimiser import SquadOptimiser
+from src.ownership import EffectiveOwnership
+from src.planner import TransferPlanner
+from src.screener import PlayerScreener
+from src.simulator import GameweekSimulator
+from src.snapshot import POSITIONS
+from src.views import FPLViews
 import plotly.graph_objects as go
 
 
@@ -18,6 +29,7 @@ def get_teams(fpl: FPLData):
 
 
 class FPLVisualiser:
+    @metrics.timed("view", section="top_players")
     def top_players(fpl: FPLData):
         """
         Generate table of top players
@@ -34,7 +46,6 @@ class FPLVisualiser:
             )
             else []
         )
-        results = []
         teams_by_name = fpl.teams_by_name
         selected_players = st.multiselect(
             "Select players", fpl.player_names, default_players
@@ -47,108 +58,25 @@ class FPLVisualiser:
         if len(selected_players) < 1:
             selected_players = fpl.player_names
         all_players = selected_players + compare_players
-        players = {k: v for k, v in fpl.players_by_name.items() if k in all_players}
-        columns = [
-            "Name",
-            "Team",
-            "Points",
-            "Minutes/Game",
-            "xPoints",
-            "xPoints/Cost",
-            "BPS",
-            "Selected By",
-            "Differential",
-            "Team Clean Sheets",
-            "Fixture Score",
-            "Position",
-            "Price",
-            "Bonus/Game",
-            "Bonus %",
-            "Goals",
-            "xG",
-            "Assists",
-            "xA",
-            "GI",
-            "xGI",
-            "Team Goals",
-            "Team GI %",
-            "ICT",
-            "Minutes",
-            "Minutes/xGI",
-            "Form",
-            "Form/Cost",
-            "Starts/Game",
-            "News",
-        ]
+        form_window = st.select_slider(
+            "Form window",
+            ["Season", 2, 3, 4, 5, 6, 8, 10],
+            value="Season",
+            help="Number of recent GWs Form and Form/Cost are averaged over",
+        )
+        total_xpoints = FPLViews.total_xpoints(fpl, selected_players)
+        total_xpoints_comp = FPLViews.total_xpoints(fpl, compare_players)
         # TODO: Filter on easy fixtures
-        total_xpoints = 0.0
-        total_xpoints_comp = 0.0
-        for player, info in players.items():
-            selected_by = float(info["stats"]["selected_by_percent"])
-            total_pts = info["stats"]["total_points"]
-            differential = total_pts * (1 - (selected_by / 100.0))
-            cost = round(info["stats"]["now_cost"] / 10.0, 3)
-            points_per_min = (
-                total_pts / info["stats"]["minutes"]
-                if info["stats"]["minutes"] > 0
-                else 0
-            )
-            minutes_per_game = round(float(info["stats"]["minutes_per_game"]), 3)
-            xpoints = points_per_min * 38 * minutes_per_game
-            if player in selected_players:
-                total_xpoints += xpoints
-            if player in compare_players:
-                total_xpoints_comp += xpoints
-            values = [
-                info["name"],
-                info["team"]["name"],
-                total_pts,
-                minutes_per_game,
-                xpoints,
-                xpoints / cost,
-                info["stats"]["bps"],
-                selected_by,
-                differential,
-                info["team"]["clean_sheets"],
-                float(info["team"]["fixture_score"]),
-                info["position"],
-                cost,
-                round(float(info["stats"]["bonus_per_game"]), 2),
-                int(100 * info["stats"]["bonus_chance"]),
-                info["stats"]["goals_scored"],
-                info["stats"]["expected_goals"],
-                info["stats"]["assists"],
-                info["stats"]["expected_assists"],
-                info["stats"]["goals_scored"] + info["stats"]["assists"],
-                info["stats"]["expected_goal_involvements"],
-                info["team"]["goals_scored"],
-                round(100 * info["stats"]["gi_per_goal_scored"], 1),
-                round(float(info["stats"]["ict_index"]), 2),
-                info["stats"]["minutes"],
-                round(float(info["stats"]["minutes_per_xgi"]), 2),
-                float(info["stats"]["points_per_game"]),  # form
-                float(info["stats"]["form_per_cost"]),  # form
-                float(info["stats"]["starts_per_game"]),
-                info["stats"]["news"],
-            ]
-            results.append(values)
-        st.write(f"Total players: {len(results)}")
+        st.write(f"Total players: {len(FPLViews.rows(fpl, all_players))}")
         if selected_players:
             st.write(f"Total xPoints: {total_xpoints:.2f}")
         if compare_players:
             st.write(f"Total xPoints comp: {total_xpoints_comp:.2f}")
-        df = pd.DataFrame(results, columns=columns).sort_values(
-            by=["Name"], ascending=True
-        )
         col1, col2 = st.columns(2)
         selected_pos = col1.multiselect(
             "Select positions", ["GK", "DEF", "MID", "FWD"], []
         )
-        selected_pos = (
-            selected_pos if len(selected_pos) > 0 else ["GK", "DEF", "MID", "FWD"]
-        )
         selected_teams = col2.multiselect("Select teams", teams_by_name, [])
-        selected_teams = selected_teams if len(selected_teams) > 0 else teams_by_name
         col1, col2 = st.columns(2)
         selected_fscore = col1.slider(
             "Select fixture score",
@@ -185,28 +113,23 @@ class FPLVisualiser:
         col1, col2 = st.columns(2)
         selected_minutes = col1.slider("Minimum min/game", 0, 90, step=5, value=0)
         selected_bonus = col2.slider("Minimum bonus chance", 0, 100, step=5)
-        # st.write(f"Players matching criteria: {len(df)}")
-        # df = df[df["Position"].isin(selected_pos)]
-        # st.write(f"Players matching POSITION criteria: {len(df)}")
-        # df = df[df["Price"].between(selected_price[0], selected_price[1])]
-        # st.write(f"Players matching PRICE criteria: {len(df)}")
-        # df = df[df["Team GI %"].between(selected_team_gi, 100)]
-        # st.write(f"Players matching TEAM GI criteria: {len(df)}")
-        # df = df[df["Minutes/Game"].between(selected_minutes, 90)]
-        # st.write(f"Players matching MINUTES criteria: {len(df)}")
-        # df = df[df["Bonus/Game"].between(selected_bonus, 3.0)]
-        df = df[
-            df["Position"].isin(selected_pos)
-            & df["Price"].between(selected_price[0], selected_price[1])
-            & df["Team GI %"].between(selected_team_gi, 100)
-            & df["Fixture Score"].between(selected_fscore[0], selected_fscore[1])
-            & df["Minutes/Game"].between(selected_minutes, 90)
-            & df["Bonus %"].between(selected_bonus, 100)
-            & df["Team"].isin(selected_teams)
-            & df["Minutes/xGI"].between(
-                selected_min_per_xgi[0], selected_min_per_xgi[1]
-            )
-        ]
+        query = PlayerScreener.query(
+            ranges={
+                "Price": selected_price,
+                "Team GI %": (selected_team_gi, 100),
+                "Fixture Score": selected_fscore,
+                "Minutes/Game": (selected_minutes, 90),
+                "Bonus %": (selected_bonus, 100),
+                "Minutes/xGI": selected_min_per_xgi,
+            },
+            members={
+                "Position": selected_pos or None,
+                "Team": selected_teams or None,
+            },
+        )
+        df = FPLViews.top_players(
+            fpl, all_players, None if form_window == "Season" else form_window, query
+        )
         unavailable = ["Name"]
         available = sorted(list(set(df.columns) - set(unavailable)))
         selected_columns = st.multiselect("Select columns", available, default=[])
@@ -216,6 +139,7 @@ class FPLVisualiser:
         )
         st.dataframe(filtered_df, width=1500, height=500)
 
+    @metrics.timed("view", section="fixture_for_player")
     def fixture_for_player(fpl: FPLData, player=None):
         players = fpl.players_by_name
         col1, col2 = st.columns(2)
@@ -224,48 +148,20 @@ class FPLVisualiser:
             f"Fixture Difficulty: {players[player]['team']['fixture_score']} / 10.0"
         )
         team = players[player]["team"]
-        fixtures = team["fixtures"]
-        upcoming_gws = sorted(
-            [x for x in fixtures.keys() if fixtures[x].get("done", None) == False]
-        )
-        cola, colb, colc, cold, cole = st.columns(5)
-        team_strength = players[player]["team"]["strength"]
-        if len(upcoming_gws) > 0:
-            cola.metric(
-                label=f"GW{upcoming_gws[0]}, {'Home' if fixtures[upcoming_gws[0]]['where'] == 'H' else 'Away'}",
-                value=fixtures[upcoming_gws[0]]["code"],
-                delta=fixtures[upcoming_gws[0]]["difficulty"] - team_strength,
-                delta_color="inverse",
-            )
-        if len(upcoming_gws) > 1:
-            colb.metric(
-                label=f"GW{upcoming_gws[1]}, {'Home' if fixtures[upcoming_gws[1]]['where'] == 'H' else 'Away'}",
-                value=fixtures[upcoming_gws[1]]["code"],
-                delta=fixtures[upcoming_gws[1]]["difficulty"] - team_strength,
-                delta_color="inverse",
-            )
-        if len(upcoming_gws) > 2:
-            colc.metric(
-                label=f"GW{upcoming_gws[2]}, {'Home' if fixtures[upcoming_gws[2]]['where'] == 'H' else 'Away'}",
-                value=fixtures[upcoming_gws[2]]["code"],
-                delta=fixtures[upcoming_gws[2]]["difficulty"] - team_strength,
-                delta_color="inverse",
-            )
-        if len(upcoming_gws) > 3:
-            cold.metric(
-                label=f"GW{upcoming_gws[3]}, {'Home' if fixtures[upcoming_gws[3]]['where'] == 'H' else 'Away'}",
-                value=fixtures[upcoming_gws[3]]["code"],
-                delta=fixtures[upcoming_gws[3]]["difficulty"] - team_strength,
-                delta_color="inverse",
-            )
-        if len(upcoming_gws) > 4:
-            cole.metric(
-                label=f"GW{upcoming_gws[4]}, {'Home' if fixtures[upcoming_gws[4]]['where'] == 'H' else 'Away'}",
-                value=fixtures[upcoming_gws[4]]["code"],
-                delta=fixtures[upcoming_gws[4]]["difficulty"] - team_strength,
+        matrix = fpl.fixtures
+        strength = int(matrix.strength[matrix.rows[team["id"]]])
+        for col, (gw, opponent, home) in zip(
+            st.columns(5), matrix.next_fixtures(team["id"])
+        ):
+            # Home when the opponent hosts, as the team fixture dicts read
+            col.metric(
+                label=f"GW{gw}, {'Away' if home else 'Home'}",
+                value=fpl.teams[opponent]["code"],
+                delta=int(matrix.strength[matrix.rows[opponent]]) - strength,
                 delta_color="inverse",
             )
 
+    @metrics.timed("view", section="player_metrics")
     def player_metrics(fpl: FPLData, player=None, player_comp=None):
         """
         Generate player metrics
@@ -387,44 +283,44 @@ class FPLVisualiser:
         if player_comp is not None:
             FPLVisualiser.fixture_for_player(fpl, player_comp)
 
+    @metrics.timed("view", section="player_charts")
     def player_charts(fpl: FPLData, player=None, player_comp=None):
         """
         Generate player KPI
         """
         # Generate figure
-        history = fpl.players_by_name[player]["history"]
-        comp_history = fpl.players_by_name.get(player_comp, {}).get("history", {})
-        columns = ["GW", "GI", "xGI"]
-        results = []
-        gws, gis, xgis, pts, bpts = [], [], [], [], []
-        comp_gis, comp_xgis, comp_pts, comp_bpts = [], [], [], []
+        history = fpl.history
+        pid = fpl.players_by_name[player]["id"]
+        comp_pid = fpl.players_by_name.get(player_comp, {}).get("id", None)
         team = fpl.players_by_name[player]["team"]
         team_fixtures = team.get("fixtures", {})
         comp_team = fpl.players_by_name.get(player_comp, {}).get("team", {})
         comp_fixtures = comp_team.get("fixtures", {})
-        for gw, info in history.items():
-            if gw not in team_fixtures:
-                continue
-            gws.append(
-                f"GW{gw}, {team['fixtures'][gw]['code']}"
-                + (
-                    f"/{comp_team['fixtures'][gw]['code']}"
-                    if gw in comp_fixtures
-                    else ""
-                )
-            )
-            gis.append(info["goals_scored"] + info["assists"])
-            xgis.append(info["expected_goal_involvements"])
-            pts.append(info["total_points"])
-            bpts.append(info["bonus"])
-            if player_comp is not None:
-                comp_info = comp_history.get(gw, {})
-                comp_gis.append(
-                    comp_info.get("goals_scored", 0) + comp_info.get("assists", 0)
-                )
-                comp_xgis.append(comp_info.get("expected_goal_involvements", 0))
-                comp_pts.append(comp_info.get("total_points", 0))
-                comp_bpts.append(comp_info.get("bonus", 0))
+        played = [int(gw) for gw in history.played(pid) if gw in team_fixtures]
+        gws = [
+            f"GW{gw}, {team['fixtures'][gw]['code']}"
+            + (f"/{comp_team['fixtures'][gw]['code']}" if gw in comp_fixtures else "")
+            for gw in played
+        ]
+        played = np.array(played, dtype=np.intp) - 1
+
+        def series(field, pid):
+            if pid is None:
+                return np.zeros(len(played))
+            return history.series(field, pid)[played]
+
+        gis = (series("goals_scored", pid) + series("assists", pid)).tolist()
+        xgis = series("expected_goal_involvements", pid).tolist()
+        pts = series("total_points", pid).tolist()
+        bpts = series("bonus", pid).tolist()
+        comp_gis, comp_xgis, comp_pts, comp_bpts = [], [], [], []
+        if player_comp is not None:
+            comp_gis = (
+                series("goals_scored", comp_pid) + series("assists", comp_pid)
+            ).tolist()
+            comp_xgis = series("expected_goal_involvements", comp_pid).tolist()
+            comp_pts = series("total_points", comp_pid).tolist()
+            comp_bpts = series("bonus", comp_pid).tolist()
         # form = list(map(lambda x: x['form'], kpi))
         fig_gis = go.Figure()
         fig_bonus = go.Figure()
@@ -473,7 +369,59 @@ class FPLVisualiser:
         st.plotly_chart(fig_gis)
         st.plotly_chart(fig_bonus)
         # Generate figure for form/price
+        trends = FPLViews.trends(fpl, pid)
+        if len(trends) < 2:
+            return
+        fig_trends = go.Figure()
+        fig_trends.add_trace(
+            go.Scatter(
+                x=trends.index,
+                y=trends["Price"],
+                mode="lines",
+                line_shape="hv",
+                name="Price",
+            )
+        )
+        fig_trends.add_trace(
+            go.Scatter(
+                x=trends.index,
+                y=trends["Selected By"],
+                mode="lines",
+                line_shape="hv",
+                name="Selected By %",
+                yaxis="y2",
+            )
+        )
+        if comp_pid is not None:
+            comp_trends = FPLViews.trends(fpl, comp_pid)
+            fig_trends.add_trace(
+                go.Scatter(
+                    x=comp_trends.index,
+                    y=comp_trends["Price"],
+                    mode="lines",
+                    line_shape="hv",
+                    name="Price comp",
+                )
+            )
+            fig_trends.add_trace(
+                go.Scatter(
+                    x=comp_trends.index,
+                    y=comp_trends["Selected By"],
+                    mode="lines",
+                    line_shape="hv",
+                    name="Selected By % comp",
+                    yaxis="y2",
+                )
+            )
+        fig_trends.update_layout(
+            yaxis=dict(title="£m"),
+            yaxis2=dict(title="%", overlaying="y", side="right"),
+            title="Price / Ownership",
+            hovermode="closest",
+        )
+        st.plotly_chart(fig_trends)
 
+    @metrics.timed("view", section="team_metrics")
     def team_metrics(fpl: FPLData):
         """
         Generate table of teams
@@ -493,42 +441,8 @@ class FPLVisualiser:
         selected_teams = st.multiselect(
             "Select a team", sorted(list(fpl.teams_by_name.keys())), default_teams
         )
-        gws = dict([(i + 1, None) for i in range(38)])
-        columns = [
-            "Name",
-            "Strength Home",
-            "Strength Away",
-            "Fixture Score",
-            "Goals Scored",
-            "Goals Conceded",
-        ]
-        results = []
-        teams_by_name = fpl.teams_by_name
-        for t1, info in teams_by_name.items():
-            results.append(
-                [
-                    t1,
-                    info["strength_home"],
-                    info["strength_away"],
-                    info["fixture_score"],
-                    info["goals_scored"],
-                    info["goals_conceded"],
-                ]
-            )
-            if t1 in selected_teams:
-                for gw, gw_info in info["fixtures"].items():
-                    if gw_info["done"] is True:
-                        continue
-                    diff = gw_info["difficulty"]
-                    if gws[gw] is None:
-                        gws[gw] = 0
-                    gws[gw] += diff
-        gws = sorted(
-            list(filter(lambda x: x[1] is not None, gws.items())), key=lambda x: x[1]
-        )
-        df = pd.DataFrame(results, columns=columns).sort_values(
-            by=["Name"], ascending=False
-        )
+        df = FPLViews.teams(fpl)
+        gws = FPLViews.bench_boost(fpl, selected_teams)
         if len(gws) > 0:
             st.write("Best Bench Boost")
             cols = st.columns(len(gws) if len(gws) < 5 else 5)
@@ -536,6 +450,237 @@ class FPLVisualiser:
                 cols[i].metric("GW" + str(gws[i][0]), gws[i][1])
         st.dataframe(df, width=1500, height=500)
 
+    @metrics.timed("view", section="squad_optimiser")
+    def squad_optimiser(fpl: FPLData):
+        """
+        Generate best squads under budget
+        """
+        st.header("Squad Optimiser")
+        table = fpl.table
+        names = table.metric_names
+        col1, col2, col3 = st.columns(3)
+        metric = col1.selectbox(
+            "Maximise", ["xPts Next 5", "xPoints", "Points", "Form", "xGI"]
+        )
+        budget = col2.slider("Budget", 80.0, 110.0, 100.0, step=0.5)
+        k = col3.slider("Number of squads", 1, 5, 1)
+        form_window = st.select_slider(
+            "Form window",
+            ["Season", 2, 3, 4, 5, 6, 8, 10],
+            value="Season",
+            help="Number of recent GWs Form is averaged over",
+            disabled=metric != "Form",
+        )
+        col1, col2 = st.columns(2)
+        locked = col1.multiselect("Must include", fpl.player_names, [])
+        excluded = col2.multiselect("Exclude", fpl.player_names, [])
+        if not st.button("Optimise"):
+            return
+        scores = FPLViews.scores(
+            fpl, metric, None if form_window == "Season" else form_window
+        )
+        squads = SquadOptimiser.solve(
+            table,
+            scores,
+            budget=int(round(budget * 10)),
+            locked=names.index[names.isin(locked)],
+            excluded=names.index[names.isin(excluded)],
+            k=k,
+        )
+        if len(squads) < 1:
+            st.write("No squad satisfies the constraints")
+        for i, squad in enumerate(squads, 1):
+            st.write(
+                f"Squad {i}: {squad['score']:.2f} {metric} for £{squad['cost'] / 10}"
+            )
+            df = table.metrics.loc[squad["ids"]].assign(**{metric: scores})
+            st.dataframe(
+                df.sort_values(
+                    by=["Position", metric],
+                    ascending=[True, False],
+                    key=lambda c: c.map(POSITIONS.index) if c.name == "Position" else c,
+                )
+            )
+
+    @metrics.timed("view", section="transfer_planner")
+    def transfer_planner(fpl: FPLData):
+        """
+        Generate transfer plan for the manager's squad
+        """
+        st.header("Transfer Planner")
+        manager = fpl.manager_team or {}
+        picks = [int(x["element"]) for x in manager.get("team", [])]
+        if len(picks) != sum(SquadOptimiser.QUOTAS):
+            st.write("Enter a manager ID with a full squad to plan transfers")
+            return
+        col1, col2, col3, col4 = st.columns(4)
+        horizon = col1.slider("Gameweeks ahead", 1, 6, 4)
+        per_gw = col2.slider("Max transfers per GW", 1, 2, 1)
+        free = col3.number_input("Free transfers", 0, TransferPlanner.MAX_FREE, 1)
+        pool = col4.slider(
+            "Targets per position",
+            1,
+            8,
+            4,
+            help="Only the best players per position by projected points are"
+            " considered as transfers in. More finds more plans, but is slower",
+        )
+        if not st.button("Plan"):
+            return
+        if fpl.curr_gw < 1:
+            st.write("The season is over")
+            return
+        # curr_gw is the first GW without live data, so the next deadline's
+        first_gw = fpl.curr_gw
+        points = TransferPlanner.projections(fpl.table, fpl.fixtures, first_gw, horizon)
+        planner = TransferPlanner(fpl.table, points, picks, pool, per_gw)
+        result = planner.plan(manager.get("bank", 0), free)
+        names = fpl.table.metric_names
+        st.write(
+            f"Projected {result['score']:.1f} points,"
+            f" {result['score'] - result['hold']:+.1f} on keeping the squad"
+        )
+        for gw, (out, new, hit) in enumerate(result["transfers"], first_gw):
+            if len(out) < 1:
+                st.write(f"GW{gw}: no transfers")
+                continue
+            st.write(
+                f"GW{gw}: {', '.join(names[out])} → {', '.join(names[new])}"
+                + (f" (-{hit} points)" if hit > 0 else "")
+            )
+        st.caption(
+            f"{result['nodes']} nodes explored, {100 * result['hit_rate']:.1f} %"
+            f" cache hits, {result['seconds']:.2f} s"
+        )
+
+    @metrics.timed("view", section="gameweek_simulator")
+    def gameweek_simulator(fpl: FPLData):
+        """
+        Simulate the manager's XI in the next GW for every captain choice
+        """
+        st.header("Gameweek Simulator")
+        picks = (fpl.manager_team or {}).get("team", [])
+        xi = [int(x["element"]) for x in picks if x.get("position", 99) <= 11]
+        if len(xi) != 11:
+            st.write("Enter a manager ID with a full squad to simulate")
+            return
+        col1, col2, col3 = st.columns(3)
+        trials = col1.select_slider(
+            "Trials", [10_000, 50_000, 100_000, 200_000], 100_000
+        )
+        target = col2.number_input("Target points", 0, 200, 60)
+        processes = col3.number_input("Processes", 1, os.cpu_count() or 1, 1)
+        if not st.button("Simulate"):
+            return
+        field = FPLViews.field_ownership(fpl)
+        simulator = GameweekSimulator(
+            fpl.table, fpl.fixtures, fpl.history, pd.Index(xi).union(field.index)
+        )
+        df = simulator.captaincy(
+            xi, field, trials, processes=processes, targets=(target,)
+        )
+        st.write(
+            f"GW{simulator.gw}: best captain {fpl.table.metric_names[df.index[0]]},"
+            f" {df['xGain'].iloc[0]:+.2f} points on the"
+            f" {'league' if fpl.ownership is not None else 'overall'} field"
+        )
+        st.dataframe(df.set_index(fpl.table.metric_names[df.index].to_numpy()))
+
+    @metrics.timed("view", section="mini_league")
+    def mini_league(fpl: FPLData):
+        """
+        Generate table of a classic league's managers
+        """
+        st.header("Mini-league")
+        col1, col2 = st.columns(2)
+        league_id = col1.text_input("League ID", "")
+        limit = col2.number_input("Max managers", 50, 10000, 1000, step=50)
+        gw = FPLViews.current_gw(fpl)
+        if gw < 1:
+            st.write("No gameweek has started yet")
+            return
+        if league_id.isdigit() and st.button("Load league"):
+            league, standings = FPLQuerier.get_league_standings(int(league_id), limit)
+            entries = [r["entry"] for r in standings]
+            # Reloading the same league only adjusts the managers whose picks changed
+            reload = (
+                fpl.ownership is not None
+                and fpl.league.league.get("id") == league.get("id")
+                and fpl.league.entries.tolist() == entries
+                and fpl.ownership.ids.equals(fpl.table.players.index)
+            )
+            if not reload:
+                fpl.league, fpl.ownership = LeagueTable(league, standings), None
+            progress = st.progress(0.0, f"Loading {len(fpl.league)} managers")
+            final = fpl.data["events"][gw - 1].get("data_checked", False)
+            add = fpl.ownership.update if reload else None
+            stream = FPLQuerier.stream_league(fpl.league, gw, final, add)
+            for i, _ in enumerate(stream, 1):
+                if i % 25 == 0 or i == len(fpl.league):
+                    progress.progress(i / len(fpl.league), f"{i}/{len(fpl.league)}")
+            if not reload:
+                fpl.ownership = EffectiveOwnership(fpl.league, fpl.table.players.index)
+        if fpl.league is None:
+            return
+        st.write(
+            f"{fpl.league.league.get('name', '')}: {int(fpl.league.loaded.sum())}"
+            f"/{len(fpl.league)} managers loaded"
+        )
+        st.dataframe(fpl.league.managers, width=1500, height=500)
+
+    @metrics.timed("view", section="live_gameweek")
+    def live_gameweek(fpl: FPLData):
+        """
+        Live points of the current GW's players, teams and loaded league,
+        polled while shown and updated from the changed rows only
+        """
+        st.header("Live Gameweek")
+        gw = FPLViews.current_gw(fpl)
+        if gw < 1:
+            st.write("The season has not started yet")
+            return
+        # Every GW has data once the season is over, so the last one is final
+        over = fpl.curr_gw == 0
+        live = LiveGameweek.shared(gw, fpl.table)
+        if (
+            fpl.live is None
+            or fpl.live.live is not live
+            or fpl.live.ownership is not fpl.ownership
+        ):
+            fpl.live = LiveLeague(live, fpl.ownership)
+
+        @st.fragment(run_every=None if over else LiveGameweek.POLL_INTERVAL)
+        def render():
+            live.poll()
+            fpl.live.update()
+            st.caption(
+                f"GW{live.gw}, final, the season is over"
+                if over
+                else f"GW{live.gw}, update {live.version}"
+            )
+            col1, col2 = st.columns([3, 2])
+            col1.dataframe(
+                fpl.live.players.set_index("Name").sort_values(
+                    by=["Live Points"], ascending=False
+                ),
+                height=500,
+            )
+            col2.dataframe(
+                fpl.live.teams.set_index("Team").sort_values(
+                    by=["Live Points"], ascending=False
+                ),
+                height=500,
+            )
+            if fpl.live.managers is not None:
+                st.dataframe(
+                    fpl.live.managers.sort_values(by=["Live Total"], ascending=False),
+                    width=1500,
+                    height=500,
+                )
+
+        render()
+
+    @metrics.timed("view", section="player_section")
     def player_section(fpl: FPLData):
         """
         Generate player section
@@ -557,3 +702,33 @@ class FPLVisualiser:
             FPLVisualiser.player_metrics(fpl, player=player, player_comp=player_comp)
         with colb:
             FPLVisualiser.player_charts(fpl, player=player, player_comp=player_comp)
+
+    def metrics_panel():
+        """
+        Span histograms of this process, largest total time first
+        """
+        rows = [
+            {
+                "Span": h["name"],
+                "Labels": ", ".join(f"{k}={v}" for k, v in h["labels"].items()),
+                "Count": h["count"],
+                "Mean ms": rnd(1000 * h["sum"] / h["count"]),
+                "p95 ms": rnd(1000 * h["p95"]),
+                "Max ms": rnd(1000 * h["max"]),
+                "Total s": rnd(h["sum"]),
+            }
+            for h in metrics.dump()["histograms"]
+        ]
+        with st.expander("Timings"):
+            if len(rows) == 0:
+                st.write("No spans recorded yet")
+                return
+            st.dataframe(
+                pd.DataFrame(rows).sort_values(by=["Total s"], ascending=False),
+                hide_index=True,
+            )
+            col1, col2, col3 = st.columns(3)
+            col1.download_button("Prometheus", metrics.prometheus(), "metrics.txt")
+            col2.download_button("JSON", metrics.to_json(), "metrics.json")
+            if col3.button("Reset"):
+                metrics.reset()
@@ -0,0 +1,66 @@
+import itertools, types
+import pytest
+from benchmarks.standin import StandIn, SyntheticAPI
+from src import cache as cache_module
+from src.cache import FPLCache
+from src.fetcher import FPLFetcher
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    A cache clock ticking one second per reading
+    """
+    ticks = itertools.count(1000)
+    monkeypatch.setattr(
+        cache_module, "time", types.SimpleNamespace(time=lambda: float(next(ticks)))
+    )
+
+
+def test_unchanged_response_is_revalidated(tmp_path):
+    source = SyntheticAPI(players=60, managers=0, curr_gw=3)
+    standin = StandIn(source)
+    url = standin.start().rstrip("/") + "/fixtures/"
+    fetcher = FPLFetcher(cache=FPLCache(str(tmp_path / "c.sqlite")))
+    try:
+        assert fetcher._body(url)[1] == "miss"
+        assert fetcher._body(url)[1] == "hit"
+        fetched = fetcher.cache.get(url)["fetched_at"]
+        body, outcome = fetcher._body(url, max_age=0)
+        assert outcome == "revalidated"
+        assert standin.stats["not_modified"] == 1
+        assert body == fetcher.cache.get(url)["body"]
+        assert fetcher.cache.get(url)["fetched_at"] > fetched
+        assert fetcher.poll(url) is None
+        source.payloads["fixtures/"][0]["team_h_score"] = 9
+        assert fetcher.poll(url)[0]["team_h_score"] == 9
+    finally:
+        standin.stop()
+
+
+def test_eviction_drops_least_recently_used(tmp_path, clock):
+    cache = FPLCache(str(tmp_path / "c.sqlite"), max_bytes=3000)
+    for url in "abc":
+        cache.put(url, b"x" * 1000)
+    # The hit on a is only written with the next put, before evicting
+    assert cache.get("a") is not None
+    cache.put("d", b"x" * 1000)
+    assert [url for url in "abcd" if cache.get(url) is not None] == ["a", "c", "d"]
+
+
+def test_hits_are_written_in_batches(tmp_path, clock, monkeypatch):
+    monkeypatch.setattr(FPLCache, "TOUCHES", 2)
+    cache = FPLCache(str(tmp_path / "c.sqlite"))
+    cache.put("a", b"x")
+    cache.put("b", b"x")
+
+    def accessed(url):
+        return cache._db.execute(
+            "SELECT accessed_at FROM responses WHERE url = ?", (url,)
+        ).fetchone()[0]
+
+    before = accessed("a")
+    cache.get("a")
+    assert accessed("a") == before
+    cache.get("b")
+    assert accessed("a") > before
@@ -0,0 +1,50 @@
+import gc, glob, os, pickle
+import numpy as np
+from benchmarks import synthetic
+from src.history import HistoryTensor
+
+
+def versions(directory):
+    return sorted(glob.glob(os.path.join(str(directory), "history-s-*.mask.npy")))
+
+
+def test_build_load_round_trip(tmp_path):
+    live = synthetic.live(50, 6)
+    ids = list(live[1]["id"])
+    history = HistoryTensor.build(ids, live, "s", str(tmp_path))
+    loaded = pickle.loads(pickle.dumps(history))
+    assert loaded.version == history.version
+    assert np.array_equal(loaded.values, history.values)
+    assert loaded.played(ids[0]).tolist() == sorted(live)
+    minutes = loaded.series("minutes")[:, : len(live)]
+    assert np.array_equal(minutes, np.stack([live[gw]["minutes"] for gw in live], 1))
+    # A refresh keeping finished GWs from the previous tensor changes nothing
+    rebuilt = HistoryTensor.build(ids, {}, "s", str(tmp_path), history, len(live))
+    assert rebuilt.version == history.version
+    assert len(versions(tmp_path)) == 1
+
+
+def test_prune_keeps_pinned_and_recent_versions(tmp_path):
+    live = synthetic.live(50, 6)
+    ids = list(live[1]["id"])
+    directory = str(tmp_path)
+    tensors = [
+        HistoryTensor.build(ids, dict(list(live.items())[:gws]), "s", directory)
+        for gws in range(1, 6)
+    ]
+    assert len(versions(tmp_path)) == 5
+    pinned = pickle.dumps(tensors[0])
+    # Built long ago, the first one oldest
+    for i, tensor in enumerate(tensors):
+        path = os.path.join(directory, tensor.meta["file"] + ".mask.npy")
+        os.utime(path, (i, i))
+    del tensors[1:], tensor
+    gc.collect()
+    HistoryTensor.prune(directory, "s", keep="")
+    # The pinned one is still open, two more are the newest kept
+    assert len(versions(tmp_path)) == 3
+    assert pickle.loads(pinned).played(ids[0]).tolist() == [1]
+    del tensors
+    gc.collect()
+    HistoryTensor.prune(directory, "s", keep="", versions=0, grace=0)
+    assert versions(tmp_path) == []
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from benchmarks import synthetic
+from benchmarks.standin import StandIn, SyntheticAPI
+from src.cache import FPLCache
+from src.fetcher import FPLFetcher
+from src.querier import FPLQuerier
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    source = SyntheticAPI(players=120, managers=130, curr_gw=10)
+    standin = StandIn(source)
+    base_url = FPLQuerier.BASE_URL
+    FPLQuerier.configure(standin.start())
+    monkeypatch.setattr(FPLQuerier, "clients", {})
+    FPLQuerier.use(
+        league_fetcher=FPLFetcher(workers=8, cache=FPLCache(str(tmp_path / "c.sqlite")))
+    )
+    yield source, standin
+    FPLQuerier.configure(base_url)
+    standin.stop()
+
+
+def test_league_picks_match_each_manager(api):
+    source, standin = api
+    table = FPLQuerier.get_league(1, 9, final=True)
+    assert len(table) == 130 and table.loaded.all()
+    assert table.entries.tolist() == list(range(1, 131))
+    for entry in (1, 64, 130):
+        picks = synthetic.picks(source.elements, entry, 9)["picks"]
+        row = table.rows[entry]
+        assert table.picks[row].tolist() == [p["element"] for p in picks]
+        assert table.multipliers[row].tolist() == [p["multiplier"] for p in picks]
+    # Picks of a final GW and fresh standings come from the cache
+    requests = standin.stats["requests"]
+    again = FPLQuerier.get_league(1, 9, final=True)
+    assert standin.stats["requests"] == requests
+    assert np.array_equal(again.picks, table.picks)
+
+
+def test_league_limit_stops_paging(api):
+    _, standin = api
+    table = FPLQuerier.get_league(1, 9, limit=60)
+    assert len(table) == 60 and table.loaded.all()
+    # Pages are fetched a few at a time, not past the limit's batch
+    assert standin.stats["requests"] == FPLQuerier.LEAGUE_PAGES_AHEAD + 60
@@ -0,0 +1,117 @@
+import numpy as np, pandas as pd
+import pytest
+from benchmarks import synthetic
+from benchmarks.live import league
+from src.live import LiveGameweek, LiveLeague
+from src.ownership import EffectiveOwnership
+from src.snapshot import PlayerTable
+
+
+@pytest.fixture(scope="module")
+def table():
+    return synthetic.build(200, 10, 0)[2]
+
+
+def element(pid, fixtures, goals=0):
+    """
+    A live element playing fixtures (fixture -> (minutes, bps, bonus))
+    """
+    explain = [
+        {
+            "fixture": fixture,
+            "stats": [
+                {"identifier": "minutes", "value": minutes, "points": 2},
+                {"identifier": "bps", "value": bps, "points": 0},
+            ]
+            + ([{"identifier": "bonus", "value": bonus}] if bonus else []),
+        }
+        for fixture, (minutes, bps, bonus) in fixtures.items()
+    ]
+    minutes, bps, bonus = np.sum(list(fixtures.values()), axis=0).tolist()
+    points = 2 * len(fixtures) + 5 * goals + bonus
+    return {
+        "id": pid,
+        "stats": {
+            "minutes": minutes,
+            "goals_scored": goals,
+            "bps": bps,
+            "bonus": bonus,
+            "total_points": points,
+        },
+        "explain": explain,
+    }
+
+
+def bonus(gameweek, pids):
+    return gameweek.bonus[gameweek.ids.get_indexer(pids)].tolist()
+
+
+def test_provisional_bonus_shares_ties(table):
+    pids = table.players.index[:5].tolist()
+    gameweek = LiveGameweek(10, table)
+    bps = [30, 30, 20, 10, 0]
+    gameweek.apply([element(pid, {1: (90, b, 0)}) for pid, b in zip(pids, bps)])
+    assert bonus(gameweek, pids) == [3, 3, 1, 0, 0]
+    assert gameweek.points[gameweek.ids.get_indexer(pids)].tolist() == [5, 5, 3, 2, 2]
+    # Confirmed bonus replaces the provisional one
+    confirmed = [element(pids[0], {1: (90, 30, 3)})]
+    confirmed += [element(pid, {1: (90, b, 0)}) for pid, b in zip(pids[1:], bps[1:])]
+    gameweek.apply(confirmed)
+    assert bonus(gameweek, pids) == [0, 0, 0, 0, 0]
+    assert gameweek.points[gameweek.ids.get_indexer(pids)].tolist() == [5, 2, 2, 2, 2]
+
+
+def test_provisional_bonus_per_fixture_in_double_gw(table):
+    pids = table.players.index[:5].tolist()
+    gameweek = LiveGameweek(10, table)
+    # The first player plays both fixtures: top BPS in one, third in the other
+    gameweek.apply(
+        [
+            element(pids[0], {1: (90, 25, 0), 2: (90, 5, 0)}),
+            element(pids[1], {1: (90, 20, 0)}),
+            element(pids[2], {1: (90, 15, 0)}),
+            element(pids[3], {2: (90, 28, 0)}),
+            element(pids[4], {2: (90, 27, 0)}),
+        ]
+    )
+    assert gameweek.provisional[1] == {0: 3, 1: 2, 2: 1}
+    assert gameweek.provisional[2] == {3: 3, 4: 2, 0: 1}
+    assert bonus(gameweek, pids) == [4, 2, 1, 3, 2]
+
+
+def test_diff_reports_changed_rows_and_manager_totals(table):
+    pids = table.players.index[:40].tolist()
+    gameweek = LiveGameweek(10, table)
+    elements = [element(pid, {1 + i % 4: (90, i, 0)}) for i, pid in enumerate(pids)]
+    gameweek.apply(elements)
+    ownership = EffectiveOwnership(league(50, table.players.index.to_numpy()), pids)
+    session = LiveLeague(gameweek, ownership)
+    session.update()
+    version = gameweek.version
+    # A goal for a player out of the bonus places moves only their row
+    elements[0] = element(pids[0], {1: (90, 0, 0)}, goals=1)
+    gameweek.apply(elements)
+    _, players, teams, rows, _ = gameweek.since(version)
+    assert players.index.tolist() == [pids[0]]
+    assert teams.index.tolist() == [table.players.loc[pids[0], "team"]]
+    assert teams["Goals"].iloc[0] == 1
+    session.update()
+    points = pd.Series(gameweek.points, gameweek.ids)
+    picks = ownership.league.picks
+    expected = (
+        points.reindex(picks.ravel()).fillna(0).to_numpy().reshape(picks.shape)
+        * ownership.league.multipliers
+    ).sum(axis=1)
+    assert session.managers["Live GW"].tolist() == expected.tolist()
+
+
+def test_shared_follows_the_snapshot(table):
+    gameweek = LiveGameweek.shared(10, table)
+    assert LiveGameweek.shared(10, table) is gameweek
+    players = table.players.copy()
+    players["now_cost"] += 1
+    newer = PlayerTable(players, table.teams)
+    assert newer.version != table.version
+    assert LiveGameweek.shared(10, newer) is not gameweek
+    assert LiveGameweek.shared(10, table) is gameweek
+    assert LiveGameweek.shared(11, newer) is not LiveGameweek.shared(10, newer)
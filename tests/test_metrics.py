@@ -0,0 +1,60 @@
+import pytest
+from src import metrics
+
+
+@pytest.fixture
+def recording():
+    on = metrics.enabled()
+    metrics.reset()
+    metrics.enable()
+    yield
+    metrics.enable(on)
+    metrics.reset()
+
+
+def test_spans_and_counters_are_exported(recording):
+    @metrics.timed("stage", stage="work")
+    def work(fail=False):
+        if fail:
+            raise ValueError
+        return 1
+
+    assert work() == 1
+    with pytest.raises(ValueError):
+        work(fail=True)
+    with metrics.span("fetch", {"url": "u"}, endpoint="/x/") as span:
+        span.set(cache="hit")
+        span.note(bytes=10)
+    metrics.count("fetch_bytes", 10, endpoint="/x/")
+    metrics.count("fetch_bytes", 5, endpoint="/x/")
+    data = metrics.dump()
+    counts = {
+        (h["name"], tuple(sorted(h["labels"].items()))): h["count"]
+        for h in data["histograms"]
+    }
+    assert counts == {
+        ("fetch", (("cache", "hit"), ("endpoint", "/x/"))): 1,
+        ("stage", (("error", "ValueError"), ("stage", "work"))): 1,
+        ("stage", (("stage", "work"),)): 1,
+    }
+    assert data["counters"][0]["value"] == 15
+    assert data["recent"][0]["url"] == "u" and data["recent"][0]["bytes"] == 10
+    text = metrics.prometheus()
+    assert "# TYPE fantapy_stage_seconds histogram" in text
+    assert 'fantapy_stage_seconds_count{stage="work"} 1' in text
+    assert 'fantapy_stage_seconds_bucket{stage="work",le="+Inf"} 1' in text
+    assert 'fantapy_fetch_bytes_total{endpoint="/x/"} 15' in text
+
+
+def test_nothing_is_recorded_when_off(recording):
+    metrics.enable(False)
+    with metrics.span("fetch", endpoint="/x/"):
+        pass
+    metrics.timed("stage")(lambda: None)()
+    metrics.count("fetch_bytes", 1)
+    assert metrics.dump() == {"histograms": [], "counters": [], "recent": []}
+
+
+def test_endpoints_drop_hosts_and_ids():
+    url = "https://fantasy.premierleague.com/api/entry/123/event/7/picks/"
+    assert metrics.endpoint(url) == "/api/entry/{}/event/{}/picks/"
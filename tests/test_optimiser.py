@@ -0,0 +1,26 @@
+import numpy as np, pandas as pd
+import pytest
+from benchmarks import synthetic
+from src.optimiser import SquadOptimiser
+from src.snapshot import PlayerTable
+
+
+@pytest.mark.parametrize("budget", [620, 650, 700, 1000])
+def test_pruning_keeps_tied_players(budget, monkeypatch):
+    _, _, table, _ = synthetic.build(300, 10, 0)
+    rng = np.random.default_rng(1)
+    players = table.players.copy()
+    players["now_cost"] = rng.choice([40, 45, 50], len(players)).astype(
+        players["now_cost"].dtype
+    )
+    table = PlayerTable(players, table.teams)
+    scores = pd.Series(rng.choice([1.0, 2.0], len(players)), index=players.index)
+    pruned = SquadOptimiser.solve(table, scores, budget, k=3)
+    monkeypatch.setattr(
+        SquadOptimiser,
+        "dominated",
+        staticmethod(lambda table, values, locked, k=1: np.zeros(len(values), bool)),
+    )
+    full = SquadOptimiser.solve(table, scores, budget, k=3)
+    assert len(full) == 3
+    assert [s["score"] for s in pruned] == [s["score"] for s in full]
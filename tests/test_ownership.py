@@ -0,0 +1,32 @@
+import copy, random
+import numpy as np
+from benchmarks import synthetic
+from src.league import LeagueTable
+from src.ownership import EffectiveOwnership
+
+
+def test_updates_match_a_full_rebuild():
+    bootstrap, _, _ = synthetic.season(120, 10)
+    elements = bootstrap["elements"]
+    ids = [element["id"] for element in elements]
+    table = LeagueTable(
+        {"id": 1, "name": "Test"},
+        [{"entry": entry, "total": 0} for entry in range(1, 41)],
+    )
+    # A few managers are only loaded later
+    for entry in range(1, 36):
+        table.add(entry, synthetic.picks(elements, entry, 10))
+    ownership = EffectiveOwnership(copy.deepcopy(table), ids)
+    rnd = random.Random(0)
+    for entry in rnd.sample(range(1, 41), 20) + [36, 36, 40]:
+        ownership.update(entry, synthetic.picks(elements, entry, rnd.randint(1, 38)))
+    ownership.update(1, synthetic.picks(elements, 1, 10))
+    ownership.update(2, None)
+    assert ownership.version > 0
+    rebuilt = EffectiveOwnership(copy.deepcopy(ownership.league), ids)
+    assert ownership.managers == rebuilt.managers == ownership.league.loaded.sum()
+    for totals in ("owners", "captains", "effective"):
+        assert np.array_equal(getattr(ownership, totals), getattr(rebuilt, totals))
+    mine = {ids[0]: 2, ids[1]: 1}
+    points = np.linspace(0, 8, len(ids))
+    assert ownership.frame(mine, points).equals(rebuilt.frame(mine, points))
@@ -0,0 +1,22 @@
+import numpy as np, pandas as pd
+import pytest
+from benchmarks import synthetic
+from src.optimiser import SquadOptimiser
+from src.planner import TransferPlanner
+
+
+@pytest.mark.parametrize("horizon, transfers, free", [(2, 2, 1), (3, 1, 0)])
+def test_bounds_keep_the_best_plan(horizon, transfers, free, monkeypatch):
+    _, _, table, fixtures = synthetic.build(300, 10, 0)
+    rng = np.random.default_rng(2)
+    points = TransferPlanner.projections(table, fixtures, 11, horizon)
+    points = points * rng.uniform(0.5, 1.5, points.shape)
+    scores = pd.Series(rng.random(len(table.players)), table.players.index)
+    squad = SquadOptimiser.solve(table, scores, budget=900)[0]["ids"]
+    pruned = TransferPlanner(table, points, squad, 3, transfers).plan(20, free)
+    unbounded = lambda self, squads, gw, free=None: np.inf
+    monkeypatch.setattr(TransferPlanner, "bound", unbounded)
+    monkeypatch.setattr(TransferPlanner, "refine", unbounded)
+    full = TransferPlanner(table, points, squad, 3, transfers).plan(20, free)
+    assert full["nodes"] > pruned["nodes"]
+    assert pruned["score"] == pytest.approx(full["score"])
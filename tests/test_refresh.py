@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from benchmarks.standin import StandIn, SyntheticAPI
+from src.cache import FPLCache
+from src.data import FPLSnapshot
+from src.fetcher import FPLFetcher
+from src.querier import FPLQuerier
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    """
+    A synthetic season at GW 10 served locally, with every cache and store
+    under tmp_path
+    """
+    source = SyntheticAPI(players=120, managers=0, curr_gw=10)
+    standin = StandIn(source)
+    base_url = FPLQuerier.BASE_URL
+    FPLQuerier.configure(standin.start())
+    monkeypatch.setattr(FPLCache, "DEFAULT_DIR", str(tmp_path))
+    monkeypatch.setattr(FPLQuerier, "clients", {})
+    FPLQuerier.use(fetcher=FPLFetcher(cache=FPLCache(str(tmp_path / "a.sqlite"))))
+    yield source
+    FPLQuerier.configure(base_url)
+    standin.stop()
+
+
+def finish_gw(source: SyntheticAPI, gw: int):
+    """
+    Move gw from current to finished, confirming bonus of a few players
+    """
+    bootstrap = source.payloads["bootstrap-static/"]
+    for event in bootstrap["events"]:
+        if event["id"] == gw:
+            event.update(finished=True, data_checked=True, is_current=False)
+        elif event["id"] == gw + 1:
+            event.update(is_current=True, is_next=False)
+    for fixture in source.payloads["fixtures/"]:
+        if fixture["event"] == gw and not fixture["finished"]:
+            fixture.update(
+                started=True,
+                finished=True,
+                finished_provisional=True,
+                team_h_score=1,
+                team_a_score=0,
+            )
+    for element in source.payloads[f"event/{gw}/live/"]["elements"][:10]:
+        element["stats"]["bonus"] += 1
+        element["stats"]["total_points"] += 1
+    for element in bootstrap["elements"][:10]:
+        element["bonus"] += 1
+        element["total_points"] += 1
+
+
+def test_refresh_matches_full_rebuild(api, tmp_path, monkeypatch):
+    previous = FPLSnapshot(*FPLQuerier.build())
+    finish_gw(api, previous.curr_gw - 1)
+    refreshed = FPLQuerier.refresh(previous)
+    FPLQuerier.use(fetcher=FPLFetcher(cache=FPLCache(str(tmp_path / "b.sqlite"))))
+    rebuilt = FPLQuerier.run()
+    assert refreshed[4] != previous.players
+    assert refreshed[0] == rebuilt[0]
+    assert refreshed[1] == rebuilt[1]
+    assert refreshed[2] == rebuilt[2]
+    assert refreshed[4] == rebuilt[4]
+    table, full_table = refreshed[6], rebuilt[6]
+    assert table.version == full_table.version
+    assert table.players.equals(full_table.players)
+    assert table.teams.equals(full_table.teams)
+    history, full_history = refreshed[8], rebuilt[8]
+    assert np.array_equal(history.ids, full_history.ids)
+    assert np.array_equal(history.values, full_history.values, equal_nan=True)
+    assert np.array_equal(history.mask, full_history.mask)
@@ -0,0 +1,54 @@
+from datetime import datetime, timezone
+import pytest
+from benchmarks import synthetic
+from src.querier import FPLQuerier
+from src.scheduler import RefreshScheduler
+
+
+def calendar(settling=False, kickoffs=True):
+    """
+    The synthetic season at GW 10, optionally with GW 9 not yet checked and
+    with its kickoff times unset
+    """
+    bootstrap, fixtures, _ = synthetic.season(60, 10)
+    for fixture in fixtures:
+        if fixture["event"] == 9 and not kickoffs:
+            fixture["kickoff_time"] = None
+    bootstrap["events"][8]["data_checked"] = not settling
+    return bootstrap, FPLQuerier.get_teams(bootstrap, fixtures)[2]
+
+
+def epoch(*args):
+    return datetime(*args, tzinfo=timezone.utc).timestamp()
+
+
+def test_polls_every_minute_during_matches():
+    data, fixtures = calendar()
+    now = epoch(2023, 10, 13, 20)  # GW 10 kicked off at 19:00
+    assert RefreshScheduler.next_run(data, fixtures, now) == (now + 60, "live")
+
+
+def test_plans_the_deadline_then_the_first_kickoff():
+    data, fixtures = calendar()
+    now = epoch(2023, 10, 13, 12)
+    assert RefreshScheduler.plan(data, fixtures, now, count=3) == [
+        (epoch(2023, 10, 13, 17, 32), "deadline"),
+        (epoch(2023, 10, 13, 19), "kickoff"),
+        (epoch(2023, 10, 13, 19, 1), "live"),
+    ]
+
+
+def test_settles_a_finished_gw_until_checked():
+    data, fixtures = calendar(settling=True)
+    now = epoch(2023, 10, 7, 18)  # after GW 9's last match
+    assert RefreshScheduler.next_run(data, fixtures, now) == (now + 900, "settle")
+
+
+@pytest.mark.filterwarnings("error")
+def test_gw_without_kickoffs_waits_for_prices():
+    data, fixtures = calendar(settling=True, kickoffs=False)
+    now = epoch(2023, 10, 7, 18)
+    assert RefreshScheduler.next_run(data, fixtures, now) == (
+        epoch(2023, 10, 8, 1, 45),
+        "prices",
+    )
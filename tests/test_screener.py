@@ -0,0 +1,61 @@
+import random
+import numpy as np
+import pytest
+from benchmarks import synthetic
+from src.screener import PlayerScreener
+
+
+def masked(frame, query):
+    """
+    The query as boolean masks over the whole frame, as the views filtered
+    before the screener
+    """
+    keep = np.ones(len(frame), dtype=bool)
+    for column, low, high in query.ranges:
+        values = frame[column]
+        keep &= values.notna().to_numpy()
+        if low is not None:
+            keep &= (values >= low).to_numpy()
+        if high is not None:
+            keep &= (values <= high).to_numpy()
+    for column, allowed in query.members:
+        keep &= frame[column].isin(allowed).to_numpy()
+    if query.ids is not None:
+        keep &= frame.index.isin(query.ids)
+    result = frame[keep]
+    if query.sort:
+        result = result.sort_values(
+            by=[column for column, _ in query.sort],
+            ascending=[ascending for _, ascending in query.sort],
+            kind="stable",
+            na_position="last",
+        )
+    return result.index[: query.top].tolist()
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_matches_boolean_masks(seed):
+    table = synthetic.build(300, 10, seed)[2]
+    frame = table.metrics
+    rnd = random.Random(seed)
+    numeric = ["Price", "Points", "Minutes/Game", "Bonus %", "xG", "Minutes/xGI"]
+    for _ in range(100):
+        ranges = {}
+        for column in rnd.sample(numeric, rnd.randint(0, 3)):
+            low, high = sorted(rnd.sample(frame[column].dropna().tolist(), 2))
+            ranges[column] = rnd.choice([(low, high), (low, None), (None, high)])
+        members = {
+            "Position": rnd.choice([None, ["GK"], ["MID", "FWD"]]),
+            "Team": rnd.choice([None, rnd.sample(list(frame["Team"].unique()), 4)]),
+        }
+        ids = rnd.choice([None, rnd.sample(frame.index.tolist(), 100)])
+        sort = rnd.choice([None, "Points", ["Price", "xG"], "Name"])
+        query = PlayerScreener.query(
+            ranges,
+            members,
+            ids,
+            sort,
+            ascending=rnd.random() < 0.5,
+            top=rnd.choice([None, 1, 10]),
+        )
+        assert PlayerScreener.screen(table, query).tolist() == masked(frame, query)
@@ -0,0 +1,54 @@
+import pytest
+from benchmarks.standin import StandIn, SyntheticAPI
+from src.fetcher import FPLFetcher
+from src.querier import FPLQuerier
+
+
+@pytest.fixture
+def api(monkeypatch):
+    source = SyntheticAPI(players=60, managers=0, curr_gw=3)
+    standin = StandIn(source)
+    base_url = FPLQuerier.BASE_URL
+    FPLQuerier.configure(standin.start())
+    monkeypatch.setattr(FPLQuerier, "clients", {})
+    FPLQuerier.use(summary_fetcher=FPLFetcher())
+    yield source, standin
+    FPLQuerier.configure(base_url)
+    standin.stop()
+
+
+def summaries(source, previous, directory):
+    """
+    The summaries of the source's current bootstrap and fixtures
+    """
+    data = source.payloads["bootstrap-static/"]
+    _, _, fixtures = FPLQuerier.get_teams(data, source.payloads["fixtures/"])
+    return FPLQuerier.get_summaries(data, fixtures, previous, str(directory))
+
+
+def test_only_stale_players_are_fetched_again(api, tmp_path):
+    source, standin = api
+    elements = source.payloads["bootstrap-static/"]["elements"]
+    first = summaries(source, None, tmp_path)
+    assert standin.stats["requests"] == len(elements) == len(first)
+    # Points and minutes move during a GW, without refetching anyone
+    for element in elements:
+        element["total_points"] += 3
+        element["minutes"] += 90
+    assert summaries(source, first, tmp_path) is first
+    assert standin.stats["requests"] == len(elements)
+    elements[0]["news"] = "Knock"
+    second = summaries(source, first, tmp_path)
+    assert second is not first and second.version == first.version + 1
+    assert standin.stats["requests"] == len(elements) + 1
+    # Finishing a fixture refetches the players of both its teams
+    fixture = next(f for f in source.payloads["fixtures/"] if not f["finished"])
+    fixture.update(started=True, finished=True, team_h_score=0, team_a_score=0)
+    teams = {fixture["team_h"], fixture["team_a"]}
+    playing = sum(element["team"] in teams for element in elements)
+    summaries(source, second, tmp_path)
+    assert standin.stats["requests"] == len(elements) + 1 + playing
+    # A new process finds the up to date summaries on disk
+    requests = standin.stats["requests"]
+    assert len(summaries(source, None, tmp_path)) == len(elements)
+    assert standin.stats["requests"] == requests
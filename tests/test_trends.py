@@ -0,0 +1,81 @@
+import copy, random
+import pandas as pd
+from benchmarks import synthetic
+from src.trends import TrendStore
+
+
+def snapshots():
+    """
+    Bootstrap elements at three times, a few prices and ownerships moving
+    between them and the last player leaving at the end
+    """
+    bootstrap, _, _ = synthetic.season(40, 5)
+    elements = bootstrap["elements"]
+    rnd, result = random.Random(3), []
+    for at in (100, 200, 300):
+        result.append((at, copy.deepcopy(elements)))
+        for element in rnd.sample(elements, 5):
+            element["now_cost"] += rnd.choice([-1, 1])
+            element["selected_by_percent"] = str(rnd.randint(0, 500) / 10)
+        if at == 200:
+            elements = elements[:-1]
+    return result
+
+
+def frame(elements):
+    frame = pd.DataFrame(elements).set_index("id")[list(TrendStore.FIELDS)]
+    frame.index = frame.index.astype("int32").rename("id")
+    return frame.sort_index()
+
+
+def test_appends_store_only_changes(tmp_path):
+    store = TrendStore(str(tmp_path / "trends.sqlite"))
+    written = [store.append(elements, at) for at, elements in snapshots()]
+    fields = len(TrendStore.FIELDS)
+    assert written[0] == sum(
+        element.get(field) is not None
+        for element in snapshots()[0][1]
+        for field in TrendStore.FIELDS
+    )
+    assert 0 < written[1] <= 10 and 0 < written[2] <= 10 + fields
+    assert store.append(snapshots()[-1][1], 400) == 0
+    assert (
+        store.times().tolist()
+        == pd.to_datetime([100, 200, 300, 400], unit="s", utc=True).tolist()
+    )
+
+
+def test_point_in_time_reads(tmp_path):
+    path = str(tmp_path / "trends.sqlite")
+    store = TrendStore(path)
+    history = snapshots()
+    for at, elements in history:
+        store.append(elements, at)
+    for at, elements in history:
+        for when in (at, at + 50):
+            expected = frame(elements)
+            actual = store.at(when).reindex(expected.index)
+            assert actual.astype(object).equals(expected.astype(object))
+    assert store.at(50).empty
+    left = history[0][1][-1]["id"]
+    assert left not in store.at(300).index
+    pid = history[0][1][0]["id"]
+    prices = [frame(elements).loc[pid, "now_cost"] for _, elements in history]
+    series = store.series(pid, "now_cost")
+    assert series.tolist() == [
+        price for i, price in enumerate(prices) if i == 0 or price != prices[i - 1]
+    ]
+    expected = []
+    for (_, before), (at, after) in zip(history, history[1:]):
+        after = {element["id"]: element["now_cost"] for element in after}
+        expected += sorted(
+            (element["id"], at, element["now_cost"], after.get(element["id"]))
+            for element in before
+            if after.get(element["id"]) != element["now_cost"]
+        )
+    changes = store.changes("now_cost", start=100)
+    changes["at"] = changes["at"].map(lambda at: int(at.timestamp()))
+    rows = changes.astype(object).where(changes.notna(), None)
+    assert [tuple(row) for row in rows.itertuples(index=False)] == expected
+    # A reopened store diffs against what is on disk
+    assert TrendStore(path).append(history[-1][1], 400) == 0